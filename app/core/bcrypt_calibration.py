@@ -0,0 +1,70 @@
+# Calibração do custo do bcrypt (BCRYPT_ROUNDS) para o hardware atual.
+# Mede o tempo de uma verificação de senha para cada custo e escolhe o maior cujo tempo não
+# excede o alvo. Deve ser executado na máquina (ou tipo de máquina) de produção.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m app.core.bcrypt_calibration --target-ms 250
+import argparse
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from passlib.hash import bcrypt
+
+# Limites do custo aceites pelo bcrypt (abaixo de 10 é considerado inseguro).
+CUSTO_MINIMO = 10
+CUSTO_MAXIMO = 20
+
+
+def medir(custo: int, repeticoes: int) -> float:
+    """
+    Mede o tempo mediano (ms) de uma verificação de senha com o custo indicado.
+    A verificação tem o mesmo custo que o hash, e é a operação feita em cada login.
+    """
+    hash_senha = bcrypt.using(rounds=custo).hash("calibracao")
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        bcrypt.verify("calibracao", hash_senha)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def calibrar(alvo_ms: float, minimo: int = CUSTO_MINIMO, maximo: int = CUSTO_MAXIMO, repeticoes: int = 3) -> Dict:
+    """
+    Escolhe o maior custo com tempo de verificação até 'alvo_ms'.
+    Como cada custo duplica o tempo do anterior, a medição para assim que o alvo é ultrapassado.
+
+    :return: Um dicionário com o custo escolhido ("rounds") e os tempos medidos por custo.
+    """
+    tempos: Dict[int, float] = {}
+    escolhido = minimo
+    for custo in range(minimo, maximo + 1):
+        tempos[custo] = medir(custo, repeticoes)
+        if tempos[custo] > alvo_ms:
+            break
+        escolhido = custo
+    return {"rounds": escolhido, "tempos_ms": tempos}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Escolhe o BCRYPT_ROUNDS adequado a este hardware.")
+    parser.add_argument("--target-ms", type=float, default=250,
+                        help="Tempo máximo de uma verificação de senha, em ms (padrão: 250).")
+    parser.add_argument("--min-rounds", type=int, default=CUSTO_MINIMO,
+                        help=f"Custo mínimo, usado mesmo que exceda o alvo (padrão: {CUSTO_MINIMO}).")
+    parser.add_argument("--max-rounds", type=int, default=CUSTO_MAXIMO,
+                        help=f"Custo máximo a experimentar (padrão: {CUSTO_MAXIMO}).")
+    parser.add_argument("--repeat", type=int, default=3, help="Medições por custo (padrão: 3).")
+    args = parser.parse_args(argv)
+
+    resultado = calibrar(args.target_ms, args.min_rounds, args.max_rounds, args.repeat)
+    for custo, tempo in resultado["tempos_ms"].items():
+        print(f"rounds={custo:2d}  {tempo:8.1f} ms")
+    if resultado["tempos_ms"][resultado["rounds"]] > args.target_ms:
+        print(f"Aviso: mesmo o custo mínimo ({args.min_rounds}) excede {args.target_ms:g} ms neste hardware.")
+    print(f"BCRYPT_ROUNDS={resultado['rounds']}")
+
+
+if __name__ == "__main__":
+    main()
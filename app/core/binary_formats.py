@@ -0,0 +1,167 @@
+# Formatos binários das respostas de leitura em volume (GET /empresas/ e GET /empresas/export),
+# para consumidores que processam muitas empresas (ex: ETL), onde o parsing de JSON domina:
+# - MessagePack: um mapa {campo: [valores]}, com os valores de cada coluna seguidos;
+# - Apache Arrow (formato IPC stream): um RecordBatch com uma coluna tipada por campo.
+# Ambos são colunares e construídos diretamente das linhas da consulta, sem um dicionário por linha.
+# As bibliotecas (msgpack, pyarrow) só são importadas quando um destes formatos é pedido.
+import importlib
+import io
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Table
+
+JSON = "json"
+MSGPACK = "msgpack"
+ARROW = "arrow"
+
+MEDIA_TYPES = {
+    MSGPACK: "application/msgpack",
+    ARROW: "application/vnd.apache.arrow.stream",
+}
+
+# Media types reconhecidos no cabeçalho Accept e o formato correspondente.
+_ACCEPT = {
+    "application/json": JSON,
+    "application/*": JSON,
+    "*/*": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+# Biblioteca necessária para cada formato binário.
+_MODULOS = {MSGPACK: "msgpack", ARROW: "pyarrow"}
+
+
+class FormatoIndisponivel(Exception):
+    """Levantada quando é pedido um formato cuja biblioteca não está instalada no servidor."""
+
+
+def negociar_formato(accept: Optional[str]) -> str:
+    """
+    Escolhe o formato da resposta a partir do cabeçalho Accept (o de maior 'q'; em caso de
+    empate, o primeiro). Sem cabeçalho, ou sem nenhum tipo reconhecido, a resposta é JSON,
+    tal como antes da existência dos formatos binários.
+
+    :param accept: O valor do cabeçalho Accept (ou None).
+    :return: JSON, MSGPACK ou ARROW.
+    """
+    if not accept:
+        return JSON
+    candidatos = []
+    for posicao, item in enumerate(accept.split(",")):
+        media_type, *parametros = item.split(";")
+        formato = _ACCEPT.get(media_type.strip().lower())
+        if formato is None:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            nome, _, valor = parametro.strip().partition("=")
+            if nome.strip() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            candidatos.append((-q, posicao, formato))
+    return min(candidatos)[2] if candidatos else JSON
+
+
+def verificar_disponivel(formato: str) -> None:
+    """
+    Garante que a biblioteca do formato está instalada, antes de começar a responder.
+    :raises FormatoIndisponivel: Se não estiver.
+    """
+    if formato in _MODULOS:
+        _importar(formato)
+
+
+def _importar(formato: str):
+    try:
+        return importlib.import_module(_MODULOS[formato])
+    except ImportError:
+        raise FormatoIndisponivel(f"O formato {MEDIA_TYPES[formato]} não está disponível neste servidor.")
+
+
+def _colunas(linhas: Sequence[Sequence], total: int) -> List[Sequence]:
+    """
+    Transpõe as linhas em colunas (apenas as 'total' primeiras; as restantes, como 'versao',
+    servem apenas o ETag e o cursor).
+    """
+    if not linhas:
+        return [()] * total
+    return list(zip(*linhas))[:total]
+
+
+def _msgpack_default(valor):
+    """As datas sem fuso (SQLite) estão em UTC; o msgpack só codifica datas com fuso (como Timestamp)."""
+    if isinstance(valor, datetime) and valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def encode_msgpack(campos: Sequence[str], linhas: Sequence[Sequence]) -> bytes:
+    """
+    Codifica as linhas em MessagePack, por colunas: {campo: [valor, ...]}.
+    As datas são codificadas com a extensão Timestamp do MessagePack.
+    """
+    msgpack = _importar(MSGPACK)
+    conteudo = dict(zip(campos, _colunas(linhas, len(campos))))
+    return msgpack.packb(conteudo, datetime=True, default=_msgpack_default)
+
+
+def arrow_schema(campos: Sequence[str], tabela: Table):
+    """
+    Schema Arrow dos campos, derivado dos tipos das colunas da tabela: o schema é o mesmo
+    em todas as respostas, mesmo numa página vazia ou com valores nulos.
+    """
+    pa = _importar(ARROW)
+    tipos = {int: pa.int64(), str: pa.string(), bool: pa.bool_(), float: pa.float64(), datetime: pa.timestamp("us", tz="UTC")}
+    return pa.schema([pa.field(campo, tipos[tabela.c[campo].type.python_type]) for campo in campos])
+
+
+def _record_batch(schema, linhas: Sequence[Sequence]):
+    pa = _importar(ARROW)
+    colunas = _colunas(linhas, len(schema))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, schema)], schema=schema
+    )
+
+
+def encode_arrow(campos: Sequence[str], linhas: Sequence[Sequence], tabela: Table) -> bytes:
+    """Codifica as linhas num stream Arrow IPC com um único RecordBatch."""
+    return b"".join(arrow_stream(campos, [linhas], tabela))
+
+
+def arrow_stream(campos: Sequence[str], lotes: Iterable[Sequence[Sequence]], tabela: Table) -> Iterator[bytes]:
+    """
+    Gera um stream Arrow IPC com um RecordBatch por lote de linhas (para respostas em streaming).
+    O primeiro bloco inclui o schema e o último a marca de fim do stream.
+    """
+    pa = _importar(ARROW)
+    schema = arrow_schema(campos, tabela)
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, schema) as writer:
+        for lote in lotes:
+            writer.write_batch(_record_batch(schema, lote))
+            yield _esvaziar(buffer)
+    yield _esvaziar(buffer)
+
+
+def msgpack_stream(campos: Sequence[str], lotes: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    """
+    Gera uma sequência de objetos MessagePack, um por lote de linhas, no mesmo formato de
+    encode_msgpack (lida, do lado do cliente, com msgpack.Unpacker).
+    """
+    for lote in lotes:
+        yield encode_msgpack(campos, lote)
+
+
+def _esvaziar(buffer: io.BytesIO) -> bytes:
+    """Devolve o conteúdo acumulado no buffer e esvazia-o."""
+    dados = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return dados
@@ -0,0 +1,166 @@
+# Cache em memória, limitada em tamanho e com tempo de vida (TTL), para dados lidos com muita
+# frequência e alterados raramente (ex: o utilizador autenticado em cada pedido).
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from .config import settings
+from .invalidation import CANAL_FACETAS, CANAL_USUARIO, invalidation_bus
+
+
+class TTLCache:
+    """
+    Cache LRU com expiração por tempo.
+
+    - Cada entrada expira 'ttl' segundos depois de ser gravada.
+    - Quando a cache atinge 'max_size' entradas, a menos usada recentemente é descartada.
+    - É segura para uso concorrente: os endpoints síncronos correm em várias threads do threadpool.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        :param max_size: Número máximo de entradas guardadas em simultâneo.
+        :param ttl: Tempo de vida de cada entrada, em segundos.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._dados: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: Hashable) -> Optional[Any]:
+        """
+        Obtém o valor associado a uma chave.
+        :param chave: A chave a procurar.
+        :return: O valor guardado, ou None se não existir ou tiver expirado.
+        """
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None:
+                return None
+            expira_em, valor = entrada
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return None
+            # Marca a entrada como a mais recentemente usada.
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave: Hashable, valor: Any) -> None:
+        """
+        Guarda um valor, descartando a entrada menos usada se a cache estiver cheia.
+        :param chave: A chave do valor.
+        :param valor: O valor a guardar.
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            # Cache desativada por configuração.
+            return
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_size:
+                self._dados.popitem(last=False)
+
+    def invalidate(self, chave: Hashable) -> None:
+        """
+        Remove explicitamente uma entrada (ex: quando o registo correspondente é alterado).
+        :param chave: A chave a remover.
+        """
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self) -> None:
+        """Remove todas as entradas da cache."""
+        with self._lock:
+            self._dados.clear()
+
+
+# Cache dos utilizadores autenticados, indexada pelo username ("sub" do token).
+# Evita uma consulta à base de dados em cada pedido a uma rota protegida.
+user_cache = TTLCache(max_size=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+# Com INVALIDATION_BUS, as alterações de utilizadores feitas noutros workers descartam a entrada.
+invalidation_bus.subscribe(CANAL_USUARIO, user_cache.invalidate, reset=user_cache.clear)
+
+
+class FacetCache:
+    """
+    Contagens de empresas por faceta (ex: cidade e ramo de atuação), mantidas em memória.
+
+    - É carregada uma vez com o resultado das consultas GROUP BY e, a partir daí, atualizada
+      incrementalmente a cada criação/remoção, pelo que a leitura não depende do tamanho da tabela.
+    - Alterações que não é possível aplicar incrementalmente (ex: importação em massa, mudança de
+      cidade) invalidam a cache, que é recarregada no pedido seguinte.
+    - Uma geração, incrementada em cada alteração, impede que um carregamento feito em paralelo
+      com uma escrita grave contagens que já não incluem essa escrita.
+    """
+
+    def __init__(self, ttl: float):
+        """
+        :param ttl: Tempo de vida, em segundos, das contagens carregadas (0 desativa a cache).
+        """
+        self.ttl = ttl
+        self._contagens: Optional[Dict[str, Counter]] = None
+        self._expira_em = 0.0
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def geracao(self) -> int:
+        """Geração atual; deve ser obtida antes da consulta cujo resultado será passado a 'carregar'."""
+        with self._lock:
+            return self._geracao
+
+    def get(self) -> Optional[Dict[str, Dict[Any, int]]]:
+        """
+        :return: Uma cópia das contagens por faceta ({faceta: {valor: total}}), ou None se a
+                 cache não estiver carregada ou tiver expirado.
+        """
+        with self._lock:
+            if self._contagens is None or self._expira_em < time.monotonic():
+                return None
+            return {faceta: dict(contagem) for faceta, contagem in self._contagens.items()}
+
+    def carregar(self, contagens: Dict[str, Dict[Any, int]], geracao: int) -> None:
+        """
+        Guarda as contagens obtidas da base de dados.
+        :param contagens: As contagens por faceta ({faceta: {valor: total}}).
+        :param geracao: O valor de geracao() obtido antes da consulta; se entretanto houve
+                        escritas, as contagens estão desatualizadas e não são guardadas.
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            self._contagens = {faceta: Counter(contagem) for faceta, contagem in contagens.items()}
+            self._expira_em = time.monotonic() + self.ttl
+
+    def ajustar(self, valores: Dict[str, Any], delta: int) -> None:
+        """
+        Aplica a criação (delta=1) ou remoção (delta=-1) de uma empresa às contagens.
+        :param valores: Os valores da empresa em cada faceta (ex: {"cidade": "Belém", ...}).
+        :param delta: A variação a aplicar.
+        """
+        with self._lock:
+            self._geracao += 1
+            if self._contagens is None:
+                return
+            for faceta, contagem in self._contagens.items():
+                valor = valores.get(faceta)
+                contagem[valor] += delta
+                if contagem[valor] <= 0:
+                    del contagem[valor]
+
+    def invalidate(self) -> None:
+        """Descarta as contagens, que serão recarregadas da base de dados no pedido seguinte."""
+        with self._lock:
+            self._geracao += 1
+            self._contagens = None
+
+
+# Cache das contagens por cidade e ramo de atuação de GET /empresas/stats.
+facet_cache = FacetCache(ttl=settings.FACET_CACHE_TTL_SECONDS)
+# Com INVALIDATION_BUS, as criações/remoções feitas noutros workers descartam as contagens.
+invalidation_bus.subscribe(CANAL_FACETAS, lambda _: facet_cache.invalidate(), reset=facet_cache.invalidate)
+
+# Cache das contagens aproximadas de listagens filtradas, indexada pelos filtros.
+count_cache = TTLCache(max_size=settings.COUNT_CACHE_MAX_SIZE, ttl=settings.COUNT_CACHE_TTL_SECONDS)
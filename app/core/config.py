@@ -20,7 +20,37 @@ class Settings:
     
     # URL de conexão com a base de dados PostgreSQL, lida da variável de ambiente.
     # Esta string contém todas as informações necessárias para o SQLAlchemy se conectar à BD.
+    # A engine só é criada no arranque do servidor (ver app/db/database.py), pelo que a
+    # aplicação pode ser importada sem base de dados nem .env (ex: testes, ferramentas).
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+
+    # Cria as tabelas, colunas e índices em falta no arranque do servidor (o mesmo que o
+    # comando 'python -m app.db.bootstrap'). Útil em desenvolvimento; em produção, o esquema
+    # deve ser preparado uma vez antes do deploy, e não por cada worker que arranca.
+    DB_BOOTSTRAP_ON_STARTUP: bool = os.getenv("DB_BOOTSTRAP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+    # Configuração do pool de conexões (ver app/db/database.py). Os valores padrão são os do SQLAlchemy.
+    # - DB_POOL_SIZE: conexões mantidas abertas no pool, por processo (worker).
+    # - DB_MAX_OVERFLOW: conexões extra que podem ser abertas temporariamente acima de DB_POOL_SIZE.
+    # - DB_POOL_TIMEOUT: segundos que um pedido espera por uma conexão livre antes de falhar.
+    # - DB_POOL_RECYCLE: idade máxima (segundos) de uma conexão antes de ser reaberta; -1 desativa.
+    # - DB_POOL_PRE_PING: testa cada conexão antes de a usar, descartando as que foram fechadas pelo servidor.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+    # Conexões abertas no arranque (aquecimento do pool), para que os primeiros pedidos não
+    # paguem o custo de estabelecer a conexão. Limitado a DB_POOL_SIZE.
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", os.getenv("DB_POOL_SIZE", "5")))
+
+    # Modo da camada de base de dados: síncrono (padrão) ou assíncrono (AsyncEngine/AsyncSession).
+    # Em modo assíncrono, os routers de autenticação e empresas usam a pilha assíncrona.
+    DB_ASYNC: bool = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+    # URL para a engine assíncrona (ex: "postgresql+asyncpg://..."). Se não for definida,
+    # é derivada de DATABASE_URL trocando o driver (asyncpg para PostgreSQL, aiosqlite para SQLite).
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL")
     
     # Chave secreta usada para assinar e verificar os tokens JWT (JSON Web Tokens).
     # É fundamental para a segurança da autenticação da API.
@@ -28,11 +58,108 @@ class Settings:
     
     # Algoritmo de hashing criptográfico usado na assinatura dos tokens JWT.
     # HS256 (HMAC using SHA-256) é um algoritmo simétrico comum para este fim.
-    ALGORITHM: str = os.getenv("ALGORITHM")
+    ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     
     # Tempo de vida do token de acesso, em minutos.
     # A variável é lida como string e convertida explicitamente para um inteiro.
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+    # Tempo de vida dos refresh tokens, em dias. Cada uso em POST /refresh devolve um novo
+    # refresh token (rotação) e revoga o anterior.
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+    # Intervalo, em segundos, entre sincronizações da lista de tokens revogados em memória
+    # (ver app/core/revocation.py). É o atraso máximo com que uma revogação feita noutro
+    # worker passa a ser respeitada por este.
+    REVOCATION_SYNC_SECONDS: float = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+
+    # Cache dos utilizadores autenticados (ver app/core/cache.py).
+    # Número máximo de utilizadores guardados e tempo de vida de cada entrada, em segundos.
+    # Um TTL de 0 desativa a cache.
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+    # Cache das contagens por cidade/ramo de GET /empresas/stats (ver app/core/cache.py).
+    # É atualizada pelas escritas do próprio processo; o TTL limita o atraso em relação às
+    # escritas feitas por outros workers. Um TTL de 0 desativa a cache.
+    FACET_CACHE_TTL_SECONDS: int = int(os.getenv("FACET_CACHE_TTL_SECONDS", "60"))
+
+    # Cache das contagens aproximadas de listagens filtradas (GET /empresas/?contagem=aproximada).
+    COUNT_CACHE_MAX_SIZE: int = int(os.getenv("COUNT_CACHE_MAX_SIZE", "1024"))
+    COUNT_CACHE_TTL_SECONDS: int = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+
+    # Se ativo, os tokens que incluem o ID do utilizador (claim "uid") são aceites sem consultar
+    # a base de dados. Mais rápido, mas um utilizador apagado continua com acesso até o token expirar.
+    AUTH_TRUST_TOKEN_CLAIMS: bool = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+    # Custo do bcrypt (log2 do número de iterações) usado nos novos hashes de senhas. Cada +1
+    # duplica o tempo de CPU de cada login. Use 'python -m app.core.bcrypt_calibration' para
+    # escolher o valor adequado ao hardware. As senhas com outro custo são convertidas
+    # automaticamente no login seguinte.
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+    # Pool de processos dedicado ao bcrypt (ver app/core/security.py).
+    # PASSWORD_HASH_WORKERS=0 usa um processo por núcleo de CPU.
+    # PASSWORD_HASH_MAX_PENDING limita as operações em espera; acima disso o pedido recebe 503.
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    # Máximo de verificações de senha (login) em curso em simultâneo no processo; acima disso o
+    # login recebe 429. 0 = duas por processo do pool de hashing.
+    PASSWORD_VERIFY_MAX_CONCURRENT: int = int(os.getenv("PASSWORD_VERIFY_MAX_CONCURRENT", "0"))
+
+    # Limites de pedidos a /login e /register (ver app/core/rate_limit.py), por IP do cliente e
+    # por nome de utilizador: rajada máxima e pedidos recuperados por minuto. 0 por minuto desativa.
+    # AUTH_RATE_LIMIT_MAX_KEYS limita a memória usada (IPs e utilizadores acompanhados por processo).
+    AUTH_RATE_LIMIT_IP_BURST: int = int(os.getenv("AUTH_RATE_LIMIT_IP_BURST", "20"))
+    AUTH_RATE_LIMIT_IP_PER_MINUTE: float = float(os.getenv("AUTH_RATE_LIMIT_IP_PER_MINUTE", "30"))
+    AUTH_RATE_LIMIT_USER_BURST: int = int(os.getenv("AUTH_RATE_LIMIT_USER_BURST", "5"))
+    AUTH_RATE_LIMIT_USER_PER_MINUTE: float = float(os.getenv("AUTH_RATE_LIMIT_USER_PER_MINUTE", "5"))
+    AUTH_RATE_LIMIT_MAX_KEYS: int = int(os.getenv("AUTH_RATE_LIMIT_MAX_KEYS", "100000"))
+
+    # Importação em massa de empresas (POST /empresas/bulk).
+    # Número de linhas validadas, verificadas e inseridas por transação, e máximo de erros devolvidos no relatório.
+    BULK_IMPORT_CHUNK_SIZE: int = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))
+    BULK_IMPORT_MAX_ERRORS: int = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+
+    # Group commit das criações de empresas (POST /empresas/), desativado por omissão.
+    # Os pedidos de criação simultâneos de um worker são agrupados durante até
+    # GROUP_COMMIT_WINDOW_MS milissegundos (ou até GROUP_COMMIT_MAX_ROWS empresas) e inseridos
+    # com um único INSERT de várias linhas, numa só transação (um só commit/fsync).
+    EMPRESA_GROUP_COMMIT: bool = os.getenv("EMPRESA_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+    GROUP_COMMIT_WINDOW_MS: float = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+    GROUP_COMMIT_MAX_ROWS: int = int(os.getenv("GROUP_COMMIT_MAX_ROWS", "100"))
+
+    # Feed de alterações de empresas (GET /empresas/changes e /empresas/changes/stream).
+    # CHANGES_POLL_SECONDS: intervalo entre consultas do stream SSE quando não há alterações novas.
+    # CHANGES_HEARTBEAT_SECONDS: intervalo dos comentários SSE enviados para manter a ligação aberta.
+    CHANGES_POLL_SECONDS: float = float(os.getenv("CHANGES_POLL_SECONDS", "1"))
+    CHANGES_HEARTBEAT_SECONDS: float = float(os.getenv("CHANGES_HEARTBEAT_SECONDS", "15"))
+
+    # Barramento de invalidação entre workers (ver app/core/invalidation.py), desativado por omissão.
+    # Com vários workers, cada escrita descarta as entradas correspondentes das caches em memória
+    # dos outros workers (utilizadores, contagens por faceta, tokens revogados), em vez de estas
+    # ficarem desatualizadas até ao fim do TTL. Em PostgreSQL usa LISTEN/NOTIFY; com outras bases
+    # de dados (ex: SQLite), sockets Unix em INVALIDATION_SOCKET_DIR, uma pasta partilhada pelos
+    # workers do mesmo servidor (vazio = uma pasta no diretório temporário do sistema).
+    INVALIDATION_BUS: bool = os.getenv("INVALIDATION_BUS", "false").lower() in ("1", "true", "yes")
+    INVALIDATION_SOCKET_DIR: str = os.getenv("INVALIDATION_SOCKET_DIR", "")
+
+    # Exportação em streaming (GET /empresas/export): linhas lidas do cursor e enviadas por bloco.
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Métricas (GET /metrics). Com vários workers do uvicorn, METRICS_DIR indica uma pasta
+    # partilhada onde cada processo grava as suas métricas a cada METRICS_FLUSH_SECONDS,
+    # para que /metrics devolva o total de todos os workers. Vazio = apenas o processo atual.
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS: float = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+    def missing(self) -> list:
+        """
+        Lista as configurações obrigatórias que não foram definidas.
+        É verificada no arranque do servidor (e não na importação), para que a falha seja clara
+        sem impedir a importação da aplicação por ferramentas que não precisam delas.
+        """
+        return [nome for nome in ("DATABASE_URL", "SECRET_KEY") if not getattr(self, nome)]
 
 # Cria uma instância única e global da classe Settings.
 # Este padrão (singleton) garante que as configurações sejam carregadas apenas uma vez
@@ -0,0 +1,86 @@
+# Utilitários para pedidos condicionais HTTP (ETag, If-None-Match e If-Match).
+# Os ETags são derivados da coluna 'versao' das empresas, pelo que podem ser calculados
+# sem serializar a resposta: um cliente cujo ETag ainda é válido recebe 304 Not Modified.
+import hashlib
+from typing import Iterable, Optional, Sequence, Tuple
+
+
+def _sufixo_campos(campos: Optional[Sequence[str]]) -> str:
+    """Identificador curto de uma seleção parcial de campos (?fields=), vazio para a representação completa."""
+    if not campos:
+        return ""
+    return hashlib.blake2b(",".join(campos).encode("ascii"), digest_size=4).hexdigest()
+
+
+def etag_empresa(empresa_id: int, versao: int, campos: Optional[Sequence[str]] = None) -> str:
+    """
+    Gera o ETag forte de uma empresa. Muda sempre que a empresa é atualizada.
+    :param empresa_id: O ID da empresa.
+    :param versao: A versão atual da empresa (coluna 'versao').
+    :param campos: Os campos devolvidos, se a resposta for parcial (?fields=); cada seleção
+                   é uma representação diferente e tem o seu próprio ETag.
+    :return: O ETag, já entre aspas (ex: '"42-3"' ou, numa resposta parcial, '"42-3.1a2b3c4d"').
+    """
+    sufixo = _sufixo_campos(campos)
+    return f'"{empresa_id}-{versao}.{sufixo}"' if sufixo else f'"{empresa_id}-{versao}"'
+
+
+def etag_lista(itens: Iterable[Tuple[int, int]], campos: Optional[Sequence[str]] = None, formato: Optional[str] = None) -> str:
+    """
+    Gera o ETag fraco de uma página de empresas a partir dos pares (id, versao) que a compõem.
+    É fraco porque identifica o conteúdo da página, não a representação byte a byte.
+    :param itens: Os pares (id, versao) das empresas da página, pela ordem devolvida.
+    :param campos: Os campos devolvidos, se a resposta for parcial (?fields=).
+    :param formato: O formato binário da resposta (ex: "msgpack"), ou None para JSON.
+    :return: O ETag fraco (ex: 'W/"3f2a..."').
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(_sufixo_campos(campos).encode("ascii"))
+    if formato:
+        digest.update(f"|{formato}".encode("ascii"))
+    for empresa_id, versao in itens:
+        digest.update(f"{empresa_id}-{versao};".encode("ascii"))
+    return f'W/"{digest.hexdigest()}"'
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """
+    Indica se o cabeçalho If-None-Match corresponde ao ETag atual (comparação fraca, RFC 9110).
+    :param header: O valor do cabeçalho If-None-Match recebido (ou None).
+    :param etag: O ETag atual do recurso.
+    :return: True se o cliente já tem esta versão e deve receber 304 Not Modified.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    atual = etag[2:] if etag.startswith("W/") else etag
+    for candidato in header.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == atual:
+            return True
+    return False
+
+
+def versao_de_if_match(header: Optional[str], empresa_id: int) -> Optional[int]:
+    """
+    Extrai a versão esperada do cabeçalho If-Match de um pedido de escrita sobre uma empresa.
+    :param header: O valor do cabeçalho If-Match recebido (ou None).
+    :param empresa_id: O ID da empresa alvo do pedido.
+    :return: A versão esperada, ou None se o pedido não for condicional (sem cabeçalho ou '*').
+    :raises ValueError: Se o ETag não for um ETag forte válido desta empresa (a pré-condição nunca se verifica).
+    """
+    if header is None or header.strip() == "*":
+        return None
+    # Aceita apenas um ETag forte; ETags fracos nunca satisfazem If-Match (RFC 9110).
+    valor = header.strip()
+    if not (valor.startswith('"') and valor.endswith('"')):
+        raise ValueError("ETag inválido.")
+    id_texto, _, versao_texto = valor[1:-1].partition("-")
+    # O ETag de uma resposta parcial (?fields=) identifica a mesma versão da empresa.
+    versao_texto = versao_texto.partition(".")[0]
+    if id_texto != str(empresa_id) or not versao_texto.isdigit():
+        raise ValueError("ETag inválido.")
+    return int(versao_texto)
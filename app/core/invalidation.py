@@ -0,0 +1,289 @@
+# Barramento de invalidação entre workers, para as caches em memória de cada processo
+# (utilizadores autenticados, contagens por faceta, tokens revogados).
+#
+# As escritas registam na sessão da base de dados as chaves alteradas (publicar); quando a
+# transação é confirmada, as chaves são enviadas aos outros workers, que descartam as entradas
+# correspondentes das suas caches. Uma transação desfeita não publica nada.
+#
+# Transportes:
+# - PostgreSQL: NOTIFY, enviado dentro da própria transação (o PostgreSQL só o entrega depois
+#   do commit) e recebido por LISTEN numa conexão dedicada de cada worker;
+# - restantes (ex: SQLite, num único servidor): um socket Unix de datagramas por worker, numa
+#   pasta partilhada (INVALIDATION_SOCKET_DIR), para o qual os outros workers enviam as chaves.
+import logging
+import os
+import select
+import socket
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+import orjson
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Canal do LISTEN/NOTIFY do PostgreSQL.
+CANAL_POSTGRES = "empresas_invalidacao"
+
+# Canais publicados pelas escritas (ver as subscrições em app/core/cache.py e app/core/revocation.py).
+CANAL_USUARIO = "usuario"        # chave: o username
+CANAL_FACETAS = "facetas"        # sem chave: as contagens por faceta mudaram
+CANAL_REVOGACAO = "revogacao"    # chave: "<jti> <timestamp de expiração>"
+
+# Chave de Session.info com as invalidações pendentes da transação.
+_PENDENTES = "invalidacoes_pendentes"
+
+# Tamanho máximo de uma mensagem (o NOTIFY aceita até 8000 bytes). Uma transação com mais
+# chaves publica um pedido para descartar tudo, em vez das chaves.
+_TAMANHO_MAXIMO = 7900
+
+# Intervalo, em segundos, com que as threads de receção verificam se devem terminar.
+_INTERVALO = 0.5
+
+Mensagens = Set[Tuple[str, str]]
+
+
+class InvalidationBus:
+    """
+    Barramento de invalidação do processo.
+
+    - subscribe: regista a função que descarta uma chave de um canal (ex: "usuario" -> username)
+      e, opcionalmente, a que descarta a cache inteira, usada quando se podem ter perdido
+      mensagens (ex: após uma falha da conexão de LISTEN).
+    - publicar: regista uma chave alterada na transação em curso da sessão; é enviada aos
+      outros workers no commit. Sem barramento ativo (INVALIDATION_BUS), não faz nada.
+    - As mensagens do próprio processo são ignoradas na receção: as suas caches já foram
+      atualizadas pela escrita.
+    """
+
+    def __init__(self):
+        self.origem = uuid4().hex
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._resets: List[Callable[[], None]] = []
+        self._transporte = None
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+
+    def subscribe(self, canal: str, handler: Callable[[str], None], reset: Optional[Callable[[], None]] = None) -> None:
+        """
+        :param canal: O nome do canal (ex: "usuario").
+        :param handler: Chamada com cada chave publicada por outro worker.
+        :param reset: Chamada quando é preciso descartar a cache inteira.
+        """
+        self._handlers.setdefault(canal, []).append(handler)
+        if reset is not None:
+            self._resets.append(reset)
+
+    def publicar(self, db: Session, canal: str, chave: str = "") -> None:
+        """
+        Regista uma invalidação, a enviar no commit da transação em curso da sessão.
+        Deve ser chamada antes do commit (ver _antes_do_commit).
+        """
+        if self._transporte is not None:
+            db.info.setdefault(_PENDENTES, set()).add((canal, chave))
+
+    def iniciar(self, engine: Engine) -> None:
+        """
+        Inicia o transporte adequado à base de dados e a thread que recebe as mensagens dos
+        outros workers. Chamado no arranque do servidor, com INVALIDATION_BUS ativo.
+        """
+        if self._transporte is not None:
+            return
+        if engine.dialect.name == "postgresql" and engine.driver == "psycopg2":
+            transporte = _PostgresTransport(engine)
+        else:
+            transporte = _SocketTransport(settings.INVALIDATION_SOCKET_DIR or os.path.join(tempfile.gettempdir(), "empresas_invalidacao"))
+        self._parar.clear()
+        self._transporte = transporte
+        self._thread = threading.Thread(target=transporte.escutar, args=(self._entregar, self._reiniciar, self._parar),
+                                        name="invalidation-bus", daemon=True)
+        self._thread.start()
+        logger.info("Barramento de invalidação ativo (%s).", type(transporte).__name__)
+
+    def parar(self) -> None:
+        """Termina a receção e liberta o transporte (encerramento do servidor)."""
+        if self._transporte is None:
+            return
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._transporte.fechar()
+        self._transporte = None
+        self._thread = None
+
+    def _codificar(self, mensagens: Mensagens) -> bytes:
+        """Codifica as mensagens de uma transação; se excederem o tamanho máximo, pede para descartar tudo."""
+        dados = orjson.dumps([self.origem, sorted(mensagens)])
+        if len(dados) > _TAMANHO_MAXIMO:
+            dados = orjson.dumps([self.origem, None])
+        return dados
+
+    def _entregar(self, dados: bytes) -> None:
+        """Aplica uma mensagem recebida às caches (na thread de receção)."""
+        try:
+            origem, mensagens = orjson.loads(dados)
+        except (orjson.JSONDecodeError, ValueError, TypeError):
+            logger.warning("Mensagem de invalidação inválida ignorada.")
+            return
+        if origem == self.origem:
+            return
+        if mensagens is None:
+            self._reiniciar()
+            return
+        for canal, chave in mensagens:
+            for handler in self._handlers.get(canal, ()):
+                try:
+                    handler(chave)
+                except Exception:
+                    logger.exception("Falha ao aplicar a invalidação %s:%s.", canal, chave)
+
+    def _reiniciar(self) -> None:
+        """Descarta todas as caches subscritas (quando se podem ter perdido mensagens)."""
+        for reset in self._resets:
+            try:
+                reset()
+            except Exception:
+                logger.exception("Falha ao descartar uma cache.")
+
+    # Eventos da sessão: registados para todas as sessões (síncronas e as das AsyncSession).
+
+    def _antes_do_commit(self, session: Session) -> None:
+        if session.in_nested_transaction() or not session.info.get(_PENDENTES):
+            return
+        if isinstance(self._transporte, _PostgresTransport):
+            # O NOTIFY faz parte da transação: só é entregue se o commit for bem-sucedido.
+            self._transporte.notificar(session, self._codificar(session.info.pop(_PENDENTES)))
+
+    def _depois_do_commit(self, session: Session) -> None:
+        if session.in_nested_transaction():
+            return
+        mensagens = session.info.pop(_PENDENTES, None)
+        if mensagens and self._transporte is not None:
+            self._transporte.enviar(self._codificar(mensagens))
+
+    def _fim_da_transacao(self, session: Session, transacao) -> None:
+        # Uma transação desfeita descarta as invalidações pendentes.
+        if transacao.parent is None:
+            session.info.pop(_PENDENTES, None)
+
+
+class _PostgresTransport:
+    """LISTEN/NOTIFY do PostgreSQL (driver psycopg2)."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def notificar(self, session: Session, dados: bytes) -> None:
+        session.execute(sql_select(func.pg_notify(CANAL_POSTGRES, dados.decode())))
+
+    def enviar(self, dados: bytes) -> None:
+        """As mensagens já foram enviadas com o commit (ver notificar)."""
+
+    def escutar(self, entregar: Callable[[bytes], None], reiniciar: Callable[[], None], parar: threading.Event) -> None:
+        """
+        Recebe as notificações numa conexão dedicada (fora do pool). Se a conexão falhar, volta
+        a ligar e descarta todas as caches, porque as notificações entretanto enviadas perderam-se.
+        """
+        primeira = True
+        while not parar.is_set():
+            conexao = None
+            try:
+                conexao = self.engine.raw_connection()
+                # A conexão deixa de pertencer ao pool: fica em LISTEN durante toda a vida do worker.
+                conexao.detach()
+                driver = conexao.driver_connection
+                driver.autocommit = True
+                with driver.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CANAL_POSTGRES}")
+                if not primeira:
+                    reiniciar()
+                primeira = False
+                while not parar.is_set():
+                    if select.select([driver], [], [], _INTERVALO)[0]:
+                        driver.poll()
+                        while driver.notifies:
+                            entregar(driver.notifies.pop(0).payload.encode())
+            except Exception:
+                logger.warning("Falha na conexão de LISTEN do barramento de invalidação; a religar.", exc_info=True)
+                parar.wait(1)
+            finally:
+                if conexao is not None:
+                    try:
+                        conexao.close()
+                    except Exception:
+                        pass
+
+    def fechar(self) -> None:
+        pass
+
+
+class _SocketTransport:
+    """
+    Um socket Unix de datagramas por worker, na pasta partilhada. O envio é feito para todos
+    os sockets da pasta; os de workers que já terminaram são apagados no primeiro envio falhado.
+    """
+
+    def __init__(self, pasta: str):
+        os.makedirs(pasta, exist_ok=True)
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, f"{os.getpid()}-{uuid4().hex[:8]}.sock")
+        self._rececao = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._rececao.bind(self.caminho)
+        self._rececao.settimeout(_INTERVALO)
+        self._envio = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # Um worker com a fila de receção cheia não pode atrasar o commit de quem escreve.
+        self._envio.setblocking(False)
+
+    def enviar(self, dados: bytes) -> None:
+        for nome in os.listdir(self.pasta):
+            caminho = os.path.join(self.pasta, nome)
+            if not nome.endswith(".sock") or caminho == self.caminho:
+                continue
+            try:
+                self._envio.sendto(dados, caminho)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket de um worker que já terminou.
+                try:
+                    os.unlink(caminho)
+                except OSError:
+                    pass
+            except OSError:
+                logger.warning("Invalidação não entregue a %s; a cache desse worker expira pelo TTL.", nome, exc_info=True)
+
+    def escutar(self, entregar: Callable[[bytes], None], reiniciar: Callable[[], None], parar: threading.Event) -> None:
+        while not parar.is_set():
+            try:
+                dados = self._rececao.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                if parar.is_set():
+                    return
+                logger.warning("Falha na receção do barramento de invalidação.", exc_info=True)
+                time.sleep(_INTERVALO)
+                continue
+            entregar(dados)
+
+    def fechar(self) -> None:
+        self._rececao.close()
+        self._envio.close()
+        try:
+            os.unlink(self.caminho)
+        except OSError:
+            pass
+
+
+# Instância única por processo.
+invalidation_bus = InvalidationBus()
+
+event.listen(Session, "before_commit", invalidation_bus._antes_do_commit)
+event.listen(Session, "after_commit", invalidation_bus._depois_do_commit)
+event.listen(Session, "after_transaction_end", invalidation_bus._fim_da_transacao)
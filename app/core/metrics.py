@@ -0,0 +1,226 @@
+# Métricas HTTP por endpoint (número de pedidos, pedidos em curso e histograma de latência),
+# expostas em GET /metrics no formato de texto do Prometheus.
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from .config import settings
+
+# Limites superiores (em segundos) dos intervalos do histograma de latência (os padrão do Prometheus).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rótulo usado para pedidos que não correspondem a nenhuma rota (ex: 404), para que caminhos
+# arbitrários não criem uma série nova cada um.
+ROTA_DESCONHECIDA = "__unmatched__"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Chave de cada série: (método, rota, código de estado).
+Serie = Tuple[str, str, str]
+
+
+class MetricsRegistry:
+    """
+    Métricas HTTP acumuladas do processo atual (worker).
+
+    Só é atualizado pelo middleware, que corre sempre na thread do event loop, pelo que não
+    precisa de locks: cada pedido custa apenas alguns incrementos num dicionário.
+    Cada série guarda [contagem, soma das latências, contagens por intervalo do histograma].
+    """
+
+    def __init__(self):
+        self.in_progress = 0
+        self.series: Dict[Serie, list] = {}
+
+    def observe(self, metodo: str, rota: str, estado: int, duracao: float) -> None:
+        """Regista um pedido terminado com a sua duração em segundos."""
+        chave = (metodo, rota, str(estado))
+        serie = self.series.get(chave)
+        if serie is None:
+            serie = self.series[chave] = [0, 0.0, [0] * (len(LATENCY_BUCKETS) + 1)]
+        serie[0] += 1
+        serie[1] += duracao
+        for indice, limite in enumerate(LATENCY_BUCKETS):
+            if duracao <= limite:
+                serie[2][indice] += 1
+                break
+        else:
+            serie[2][-1] += 1
+
+    def snapshot(self) -> dict:
+        """Cópia serializável em JSON das métricas atuais (usada na agregação entre workers)."""
+        return {
+            "in_progress": self.in_progress,
+            "series": [[*chave, contagem, soma, list(buckets)] for chave, (contagem, soma, buckets) in self.series.items()],
+        }
+
+
+# Instância única por processo.
+registry = MetricsRegistry()
+
+
+def _rota(scope) -> str:
+    """
+    Obtém o modelo da rota que tratou o pedido (ex: "/empresas/{empresa_id}"), e não o caminho
+    real, para limitar o número de séries. As rotas do FastAPI registam-se em scope["route"];
+    para as restantes (ex: /docs) procura-se a rota correspondente na aplicação.
+    """
+    rota = scope.get("route")
+    if rota is None and "endpoint" in scope:
+        from starlette.routing import Match
+        for candidata in scope["app"].router.routes:
+            if candidata.matches(scope)[0] == Match.FULL:
+                rota = candidata
+                break
+    return getattr(rota, "path", None) or ROTA_DESCONHECIDA
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada pedido HTTP, desde a receção até ao envio do último byte
+    da resposta (incluindo respostas em streaming). É um middleware ASGI puro, sem o custo
+    do BaseHTTPMiddleware do Starlette.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        async def send_com_estado(message):
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+
+        registry.in_progress += 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_com_estado)
+        finally:
+            # Exceções não tratadas contam como 500 (o estado por omissão).
+            registry.in_progress -= 1
+            registry.observe(scope["method"], _rota(scope), estado, time.perf_counter() - inicio)
+
+
+# --- Agregação entre workers ----------------------------------------------------------------
+
+def _ficheiro_worker() -> str:
+    """Caminho do ficheiro de métricas do processo atual em METRICS_DIR."""
+    return os.path.join(settings.METRICS_DIR, f"{os.getpid()}.json")
+
+
+def flush() -> None:
+    """
+    Grava as métricas do processo atual na pasta METRICS_DIR (um ficheiro por PID).
+    A escrita é atómica (ficheiro temporário + rename), para nunca ser lida a meio.
+    """
+    caminho = _ficheiro_worker()
+    temporario = caminho + ".tmp"
+    with open(temporario, "w") as ficheiro:
+        json.dump(registry.snapshot(), ficheiro)
+    os.replace(temporario, caminho)
+
+
+async def flush_periodicamente() -> None:
+    """Tarefa de fundo (iniciada no lifespan) que grava as métricas a cada METRICS_FLUSH_SECONDS."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    try:
+        while True:
+            flush()
+            await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+    finally:
+        # No encerramento, grava os totais finais (com 0 pedidos em curso).
+        flush()
+
+
+def _processo_ativo(pid: int) -> bool:
+    """Indica se existe um processo com este PID (o sinal 0 apenas verifica a sua existência)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # O processo existe, mas pertence a outro utilizador.
+        return True
+    return True
+
+
+def _snapshots() -> List[dict]:
+    """
+    As métricas de todos os workers (ou apenas do atual, sem METRICS_DIR).
+    Os contadores dos workers que já terminaram continuam a contar para os totais, mas os
+    seus pedidos em curso não: um worker que terminou abruptamente não chegou a gravar 0.
+    """
+    if not settings.METRICS_DIR:
+        return [registry.snapshot()]
+    # As métricas do worker que responde são gravadas antes, para estarem atualizadas.
+    flush()
+    snapshots = []
+    for nome in os.listdir(settings.METRICS_DIR):
+        if not nome.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, nome)) as ficheiro:
+                snapshot = json.load(ficheiro)
+            pid = int(nome[:-len(".json")])
+        except (OSError, ValueError):
+            # Ficheiro removido ou de outro formato: é ignorado.
+            continue
+        if pid != os.getpid() and not _processo_ativo(pid):
+            snapshot["in_progress"] = 0
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def _rotulos(metodo: str, rota: str, estado: str) -> str:
+    """Rótulos de uma série, com as aspas e barras da rota escapadas."""
+    rota = rota.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{metodo}",route="{rota}",status="{estado}"'
+
+
+def _limites() -> Iterable[str]:
+    """Os valores do rótulo 'le' dos intervalos do histograma, terminando em +Inf."""
+    return [repr(limite) for limite in LATENCY_BUCKETS] + ["+Inf"]
+
+
+def render() -> str:
+    """Gera o texto da resposta de /metrics (formato de exposição do Prometheus, versão 0.0.4)."""
+    in_progress = 0
+    series: Dict[Serie, list] = {}
+    for snapshot in _snapshots():
+        in_progress += snapshot["in_progress"]
+        for metodo, rota, estado, contagem, soma, buckets in snapshot["series"]:
+            total = series.setdefault((metodo, rota, estado), [0, 0.0, [0] * len(buckets)])
+            total[0] += contagem
+            total[1] += soma
+            total[2] = [a + b for a, b in zip(total[2], buckets)]
+
+    linhas: List[str] = [
+        "# HELP http_requests_in_progress Pedidos HTTP em curso.",
+        "# TYPE http_requests_in_progress gauge",
+        f"http_requests_in_progress {in_progress}",
+        "# HELP http_requests_total Pedidos HTTP terminados, por rota e código de estado.",
+        "# TYPE http_requests_total counter",
+    ]
+    ordenadas = sorted(series.items())
+    linhas += [f"http_requests_total{{{_rotulos(*chave)}}} {contagem}" for chave, (contagem, _, _) in ordenadas]
+    linhas += [
+        "# HELP http_request_duration_seconds Latência dos pedidos HTTP, por rota e código de estado.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for chave, (contagem, soma, buckets) in ordenadas:
+        rotulos = _rotulos(*chave)
+        acumulado = 0
+        for limite, valor in zip(_limites(), buckets):
+            acumulado += valor
+            linhas.append(f'http_request_duration_seconds_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+        linhas.append(f"http_request_duration_seconds_sum{{{rotulos}}} {soma}")
+        linhas.append(f"http_request_duration_seconds_count{{{rotulos}}} {contagem}")
+    return "\n".join(linhas) + "\n"
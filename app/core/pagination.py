@@ -0,0 +1,55 @@
+# Utilitários para paginação por cursor (keyset pagination).
+# Em vez de saltar N registos com OFFSET (o que obriga a base de dados a ler e descartar
+# todas as linhas anteriores), o cursor guarda a chave de ordenação do último registo
+# devolvido. A página seguinte começa imediatamente a seguir a essa chave, usando o índice,
+# pelo que o custo de cada página é o mesmo independentemente da profundidade.
+import base64
+import json
+from typing import Any, List, Tuple
+
+# Ordenações suportadas e as colunas (estáveis e indexadas) que compõem a chave de cada uma.
+# O 'id' entra sempre como desempate para garantir uma ordem total.
+ORDENACOES = {
+    "id": ("id",),
+    "nome": ("nome", "id"),
+}
+
+# Tipo esperado de cada coluna da chave, usado para validar cursores vindos do cliente.
+_TIPOS_CHAVE = {"id": int, "nome": str}
+
+
+def encode_cursor(ordenar_por: str, chave: Tuple[Any, ...]) -> str:
+    """
+    Gera um cursor opaco a partir da ordenação e da chave do último registo da página.
+
+    :param ordenar_por: O nome da ordenação usada (uma das chaves de ORDENACOES).
+    :param chave: Os valores das colunas de ordenação do último registo devolvido.
+    :return: Uma string base64 (segura para URLs) que o cliente deve reenviar tal como está.
+    """
+    payload = json.dumps({"o": ordenar_por, "k": list(chave)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    """
+    Descodifica um cursor gerado por encode_cursor.
+
+    :param cursor: O cursor recebido do cliente.
+    :return: Um tuplo (ordenar_por, chave).
+    :raises ValueError: Se o cursor estiver malformado ou não corresponder a uma ordenação conhecida.
+    """
+    try:
+        # Repõe o padding removido em encode_cursor antes de descodificar.
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        ordenar_por, chave = payload["o"], payload["k"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor inválido.")
+
+    if not isinstance(ordenar_por, str) or ordenar_por not in ORDENACOES or not isinstance(chave, list) or len(chave) != len(ORDENACOES[ordenar_por]):
+        raise ValueError("Cursor inválido.")
+    for coluna, valor in zip(ORDENACOES[ordenar_por], chave):
+        # bool é subclasse de int, mas nunca é uma chave válida.
+        if not isinstance(valor, _TIPOS_CHAVE[coluna]) or isinstance(valor, bool):
+            raise ValueError("Cursor inválido.")
+    return ordenar_por, chave
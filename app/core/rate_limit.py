@@ -0,0 +1,111 @@
+# Limitação da taxa de pedidos de autenticação (/login e /register), por utilizador e por IP.
+# Cada chave tem um "token bucket": aceita rajadas até 'capacidade' pedidos e recupera
+# 'por_minuto' pedidos por minuto. Protege o pool de hashing (bcrypt) de ataques de
+# credential stuffing e de força bruta sobre uma conta.
+import abc
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .config import settings
+
+
+class LimiteExcedido(Exception):
+    """Levantada quando uma chave esgotou o seu limite de pedidos."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        # Segundos até ser aceite um novo pedido (para o cabeçalho Retry-After).
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimitStore(abc.ABC):
+    """
+    Armazenamento do estado dos token buckets.
+    A interface é assíncrona para que possa ser substituída por um armazenamento partilhado
+    entre workers (ex: Redis) sem alterar quem a usa.
+    """
+
+    @abc.abstractmethod
+    async def consume(self, chave: str, capacidade: float, por_segundo: float) -> float:
+        """
+        Consome um pedido do bucket da chave.
+        :param chave: A chave limitada (ex: "ip:10.0.0.1").
+        :param capacidade: Número máximo de pedidos acumulados (rajada).
+        :param por_segundo: Pedidos recuperados por segundo.
+        :return: 0 se o pedido foi aceite, ou os segundos até haver um pedido disponível.
+        """
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Token buckets em memória, limitados a 'max_keys' chaves por processo.
+    Quando o limite é atingido, é descartada a chave usada há mais tempo. Essa chave volta a
+    ter o bucket cheio, o que é seguro: uma chave não usada há muito já o teria recuperado.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # chave -> (pedidos disponíveis, instante da última atualização)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def consume(self, chave: str, capacidade: float, por_segundo: float) -> float:
+        agora = time.monotonic()
+        with self._lock:
+            disponiveis, atualizado_em = self._buckets.get(chave, (capacidade, agora))
+            disponiveis = min(capacidade, disponiveis + (agora - atualizado_em) * por_segundo)
+            if disponiveis >= 1:
+                disponiveis -= 1
+                espera = 0.0
+            else:
+                espera = (1 - disponiveis) / por_segundo
+            self._buckets[chave] = (disponiveis, agora)
+            self._buckets.move_to_end(chave)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return espera
+
+    def clear(self) -> None:
+        """Remove o estado de todas as chaves."""
+        with self._lock:
+            self._buckets.clear()
+
+
+class AuthRateLimiter:
+    """
+    Limites dos endpoints de autenticação: um bucket por IP do cliente e outro por nome de
+    utilizador. O de IP trava um cliente que experimenta muitas contas; o de utilizador trava
+    ataques distribuídos (muitos IPs) a uma mesma conta.
+    """
+
+    def __init__(self, store: RateLimitStore):
+        """
+        :param store: O armazenamento do estado (substituível, ex: por um partilhado entre workers).
+        """
+        self.store = store
+
+    async def check(self, ip: Optional[str], username: Optional[str]) -> None:
+        """
+        Consome um pedido dos buckets do IP e do utilizador.
+        :raises LimiteExcedido: Se algum dos buckets estiver vazio.
+        """
+        limites = []
+        if ip and settings.AUTH_RATE_LIMIT_IP_PER_MINUTE > 0:
+            limites.append((f"ip:{ip}", settings.AUTH_RATE_LIMIT_IP_BURST, settings.AUTH_RATE_LIMIT_IP_PER_MINUTE))
+        if username and settings.AUTH_RATE_LIMIT_USER_PER_MINUTE > 0:
+            # Sem distinção de maiúsculas, para que "Admin" e "admin" partilhem o limite.
+            limites.append((f"user:{username.lower()}", settings.AUTH_RATE_LIMIT_USER_BURST, settings.AUTH_RATE_LIMIT_USER_PER_MINUTE))
+        for chave, capacidade, por_minuto in limites:
+            espera = await self.store.consume(chave, max(capacidade, 1), por_minuto / 60)
+            if espera:
+                # Os buckets seguintes não são consumidos: um pedido recusado pelo limite do
+                # IP não gasta o limite do utilizador atacado.
+                raise LimiteExcedido(espera)
+
+
+# Instância única por processo. Para partilhar os limites entre workers, basta substituir
+# 'auth_rate_limiter.store' por outra implementação de RateLimitStore.
+auth_rate_limiter = AuthRateLimiter(MemoryRateLimitStore(max_keys=settings.AUTH_RATE_LIMIT_MAX_KEYS))
@@ -0,0 +1,32 @@
+# Classe de resposta JSON rápida, usada pelos endpoints de leitura com muito volume (listagem de empresas).
+from typing import Any, Dict, Iterable, List, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse que serializa com o orjson, várias vezes mais rápido do que o módulo json.
+
+    Ao devolver esta resposta diretamente, o FastAPI não valida nem converte o conteúdo com o
+    response_model (que continua a descrever o formato na documentação OpenAPI). Deve por isso
+    ser usada apenas com dados já confiáveis, lidos da base de dados.
+    OPT_UTC_Z escreve as datas em UTC com o sufixo "Z", tal como o Pydantic.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def linhas_para_dicts(campos: Sequence[str], linhas: Iterable[Sequence]) -> List[Dict[str, Any]]:
+    """
+    Converte linhas de uma consulta (tuplos de colunas) em dicionários prontos a serializar.
+    As linhas podem ter colunas adicionais depois de 'campos' (ex: 'versao', usada no ETag),
+    que são descartadas pelo zip.
+
+    :param campos: Os nomes dos campos da resposta, pela ordem das primeiras colunas das linhas.
+    :param linhas: As linhas devolvidas pela consulta.
+    :return: Uma lista de dicionários {campo: valor}.
+    """
+    return [dict(zip(campos, linha)) for linha in linhas]
@@ -0,0 +1,83 @@
+# Lista de tokens revogados mantida em memória, para que a verificação feita em cada pedido
+# autenticado (deps.get_current_active_user) não precise de consultar a base de dados.
+# A tabela 'tokens_revogados' é a fonte de verdade; cada worker lê periodicamente apenas as
+# revogações novas (ver app/service/token_service.py).
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from .invalidation import CANAL_REVOGACAO, invalidation_bus
+
+
+def _timestamp(data: datetime) -> float:
+    """Converte uma data (com ou sem fuso; as datas sem fuso estão em UTC) num timestamp."""
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data.timestamp()
+
+
+def chave_revogacao(identificador: str, expira_em: datetime) -> str:
+    """Chave publicada no barramento de invalidação para uma revogação (ver RevocationSet.add_publicada)."""
+    return f"{identificador} {_timestamp(expira_em)}"
+
+
+class RevocationSet:
+    """
+    Conjunto dos identificadores (jti / família) revogados que ainda não expiraram.
+
+    - is_revoked é uma consulta a um dicionário, sem lock nem acesso à base de dados.
+    - merge acrescenta as revogações lidas da base de dados e regista o maior ID visto,
+      para que a sincronização seguinte leia apenas as linhas novas.
+    - As entradas expiradas são descartadas, pelo que a memória usada é proporcional ao
+      número de tokens revogados ainda válidos, e não ao histórico.
+    """
+
+    def __init__(self):
+        self._revogados: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.ultimo_id = 0
+
+    def is_revoked(self, *identificadores: Optional[str]) -> bool:
+        """
+        :param identificadores: O jti do token e a família (sessão) a que pertence.
+        :return: True se algum deles estiver revogado.
+        """
+        return any(identificador in self._revogados for identificador in identificadores if identificador)
+
+    def add(self, identificador: str, expira_em: datetime) -> None:
+        """Regista localmente uma revogação (já gravada na base de dados por este processo)."""
+        with self._lock:
+            self._revogados[identificador] = _timestamp(expira_em)
+
+    def add_publicada(self, chave: str) -> None:
+        """
+        Regista uma revogação publicada por outro worker no barramento de invalidação
+        (chave "<jti> <timestamp de expiração>"), sem esperar pela sincronização seguinte.
+        """
+        identificador, _, expira_em = chave.rpartition(" ")
+        with self._lock:
+            self._revogados[identificador] = float(expira_em)
+
+    def merge(self, linhas: Iterable[Tuple[int, str, datetime]]) -> None:
+        """
+        Acrescenta as revogações lidas da base de dados e descarta as expiradas.
+        :param linhas: Tuplos (id, jti, expira_em) da tabela 'tokens_revogados'.
+        """
+        agora = time.time()
+        with self._lock:
+            for linha_id, identificador, expira_em in linhas:
+                self._revogados[identificador] = _timestamp(expira_em)
+                self.ultimo_id = max(self.ultimo_id, linha_id)
+            # Cria um novo dicionário em vez de o alterar: as leituras concorrentes (sem lock)
+            # veem sempre um dicionário completo.
+            self._revogados = {chave: expira for chave, expira in self._revogados.items() if expira > agora}
+
+    def __len__(self) -> int:
+        return len(self._revogados)
+
+
+# Instância única por processo.
+revocation_set = RevocationSet()
+# A sincronização periódica continua a ser a garantia; o barramento apenas reduz o atraso.
+invalidation_bus.subscribe(CANAL_REVOGACAO, revocation_set.add_publicada)
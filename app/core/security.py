@@ -1,4 +1,10 @@
 # Importações necessárias para manipulação de datas, tipos, JWT e hashing.
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
@@ -13,7 +19,9 @@ from .config import settings
 #   e uso de um "salt" para proteger contra ataques de rainbow table.
 # - 'deprecated="auto"': Permite que o Passlib verifique senhas com hashes mais antigos (se aplicável)
 #   e os atualize automaticamente para o esquema preferencial (bcrypt) se a verificação for bem-sucedida.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# - 'bcrypt__rounds': O custo dos novos hashes (BCRYPT_ROUNDS). Os hashes com outro custo são
+#   reportados por needs_update e convertidos no login seguinte (ver AuthService).
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -25,6 +33,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+def password_needs_update(hashed_password: str) -> bool:
+    """
+    Indica se um hash deve ser refeito: usa um esquema obsoleto ou um custo diferente de BCRYPT_ROUNDS.
+    Não executa o bcrypt, apenas analisa o hash.
+    """
+    return pwd_context.needs_update(hashed_password)
+
 def get_password_hash(password: str) -> str:
     """
     Gera o hash de uma senha em texto plano usando o esquema padrão (bcrypt).
@@ -34,6 +49,116 @@ def get_password_hash(password: str) -> str:
     """
     return pwd_context.hash(password)
 
+# --- Execução do bcrypt fora do event loop e do threadpool dos pedidos ---
+# Cada hash/verificação bcrypt consome dezenas de milissegundos de CPU. Para que uma rajada de
+# logins não ocupe as threads que servem os restantes endpoints, estas operações correm num
+# pool de processos dedicado (usa todos os núcleos) com um limite próprio de pedidos em espera.
+
+class HashingSobrecarregado(Exception):
+    """Levantada quando a fila de operações de hashing atingiu PASSWORD_HASH_MAX_PENDING."""
+
+
+class HashingIndisponivel(Exception):
+    """Levantada quando o pool de hashing continua avariado depois de ser recriado."""
+
+
+# O pool é criado apenas na primeira utilização, para não lançar processos ao importar o módulo.
+_hash_executor: Optional[ProcessPoolExecutor] = None
+# Número de operações de hashing submetidas e ainda não concluídas.
+# Só é alterado a partir do event loop, pelo que não precisa de lock.
+_hash_pendentes = 0
+
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    """Devolve o pool de processos de hashing, criando-o se necessário."""
+    global _hash_executor
+    if _hash_executor is None:
+        workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+        # 'spawn' evita herdar, via fork, o estado das threads do servidor (locks, sockets).
+        _hash_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _hash_executor
+
+
+def _descartar_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Descarta um pool avariado, para que a utilização seguinte crie um novo. Só o descarta se
+    ainda for o pool atual: vários pedidos podem detetar a mesma avaria ao mesmo tempo.
+    """
+    global _hash_executor
+    if _hash_executor is executor:
+        _hash_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_hash(func, *args):
+    """
+    Executa uma função de hashing no pool dedicado, respeitando o limite de operações pendentes.
+    Se um processo do pool terminar abruptamente (ex: morto por falta de memória), o pool fica
+    inutilizável (BrokenProcessPool): é descartado e a operação é repetida uma vez num pool novo.
+
+    :raises HashingSobrecarregado: Se já existirem PASSWORD_HASH_MAX_PENDING operações em curso.
+    :raises HashingIndisponivel: Se a operação também falhar no pool novo.
+    """
+    global _hash_pendentes
+    if _hash_pendentes >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HashingSobrecarregado()
+    _hash_pendentes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            executor = _get_hash_executor()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                _descartar_executor(executor)
+        raise HashingIndisponivel()
+    finally:
+        _hash_pendentes -= 1
+
+
+# Número de verificações de senha em curso. Tal como _hash_pendentes, só é alterado no event loop.
+_verificacoes_em_curso = 0
+
+
+class VerificacoesEmExcesso(Exception):
+    """Levantada quando já existem PASSWORD_VERIFY_MAX_CONCURRENT verificações de senha em curso."""
+
+
+def _max_verificacoes() -> int:
+    """Limite de verificações simultâneas: o configurado ou duas por processo do pool de hashing."""
+    return settings.PASSWORD_VERIFY_MAX_CONCURRENT or 2 * (settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Versão assíncrona de verify_password, executada no pool de hashing.
+    As verificações (feitas por pedidos anónimos de login) têm um limite próprio, inferior ao
+    do pool, para que uma rajada de logins não impeça os registos nem esgote a fila.
+
+    :raises VerificacoesEmExcesso: Se o limite de verificações simultâneas foi atingido.
+    """
+    global _verificacoes_em_curso
+    if _verificacoes_em_curso >= _max_verificacoes():
+        raise VerificacoesEmExcesso()
+    _verificacoes_em_curso += 1
+    try:
+        return await _run_hash(verify_password, plain_password, hashed_password)
+    finally:
+        _verificacoes_em_curso -= 1
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Versão assíncrona de get_password_hash, executada no pool de hashing."""
+    return await _run_hash(get_password_hash, password)
+
+
+def shutdown_hash_executor() -> None:
+    """Termina os processos do pool de hashing (chamado no encerramento da aplicação)."""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=True, cancel_futures=True)
+        _hash_executor = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Cria um novo token de acesso JWT.
@@ -56,9 +181,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     # Adiciona a data de expiração ("exp" claim) ao payload do token.
     # O 'exp' é um claim registado pelo padrão JWT e é crucial para a segurança.
     to_encode.update({"exp": expire})
+    # Identificador único do token ("jti"), usado para o revogar antes de expirar.
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     
     # Codifica o payload para criar o JWT final.
     # Usa a SECRET_KEY e o ALGORITHM definidos nas configurações para assinar o token.
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     
     return encoded_jwt
+
+
+def create_refresh_token(data: dict) -> str:
+    """
+    Cria um refresh token JWT, válido durante REFRESH_TOKEN_EXPIRE_DAYS.
+    Distingue-se do token de acesso pelo claim "typ", para que não possa ser usado
+    como token de acesso (e vice-versa).
+
+    :param data: O payload do token (ex: {"sub": username, "uid": id, "fam": sessao}).
+    :return: O token JWT codificado como uma string.
+    """
+    return create_access_token(
+        data={**data, "typ": "refresh"},
+        expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+
+
+def new_token_family() -> str:
+    """Gera o identificador de uma nova sessão (claim "fam"), partilhado pelos tokens que dela derivam."""
+    return uuid.uuid4().hex
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verifica a assinatura e a validade de um token JWT e devolve o seu payload.
+    :raises JWTError: Se o token for inválido ou estiver expirado.
+    """
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -0,0 +1,81 @@
+# Preparação do esquema da base de dados: tabelas, colunas e índices em falta e objetos de pesquisa.
+# Substitui o create_all que era executado na importação de app/main.py, para que o arranque
+# de cada worker não tenha de ligar à base de dados e inspecionar o esquema.
+#
+# Uso (a partir da raiz do projeto, com o .env configurado):
+#     python -m app.db.bootstrap
+from typing import List
+
+from sqlalchemy import inspect, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.db import models
+from app.db.database import Base, get_engine
+from app.db.search import install_search
+
+
+def _add_missing_columns(engine: Engine) -> List[str]:
+    """
+    Acrescenta às tabelas existentes as colunas dos modelos que ainda não existem
+    (ex: 'versao', numa base de dados criada antes dessa funcionalidade).
+    As colunas NOT NULL têm de ter um server_default, para preencher as linhas existentes.
+
+    :return: As colunas acrescentadas, no formato "tabela.coluna".
+    """
+    inspector = inspect(engine)
+    acrescentadas = []
+    with engine.begin() as conn:
+        for tabela in Base.metadata.sorted_tables:
+            if not inspector.has_table(tabela.name):
+                continue
+            existentes = {coluna["name"] for coluna in inspector.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                ddl = CreateColumn(coluna).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {tabela.name} ADD COLUMN {ddl}"))
+                acrescentadas.append(f"{tabela.name}.{coluna.name}")
+    return acrescentadas
+
+
+def _init_change_feed(engine: Engine) -> None:
+    """
+    Prepara o feed de alterações de empresas: atribui seq=0 às empresas que ainda não têm
+    'seq' (criadas antes do feed), para que sejam devolvidas a quem começa do início (since=0).
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Empresa)
+            .where(models.Empresa.seq.is_(None))
+            .values(seq=0, atualizado_em=models.Empresa.data_cadastro)
+        )
+
+
+def bootstrap(engine: Engine = None) -> List[str]:
+    """
+    Cria (de forma idempotente) as tabelas, colunas e índices em falta e os objetos de pesquisa.
+    Pode ser executado em cada deploy: o que já existe não é alterado.
+
+    :param engine: A engine a usar (por omissão, a da aplicação).
+    :return: As colunas acrescentadas a tabelas existentes.
+    """
+    engine = engine or get_engine()
+    # Cria as tabelas que ainda não existem (com os respetivos índices).
+    Base.metadata.create_all(bind=engine)
+    acrescentadas = _add_missing_columns(engine)
+    # Índices declarados depois de a tabela ter sido criada (ex: ix_empresas_nome_id).
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=engine, checkfirst=True)
+    _init_change_feed(engine)
+    # Cria os índices de pesquisa textual (trigramas em PostgreSQL, FTS5 em SQLite), se ainda não existirem.
+    install_search(engine)
+    return acrescentadas
+
+
+if __name__ == "__main__":
+    colunas = bootstrap()
+    for coluna in colunas:
+        print(f"Coluna acrescentada: {coluna}")
+    print(f"Esquema atualizado ({len(models.Base.metadata.tables)} tabelas).")
@@ -1,16 +1,39 @@
 # Importa as funções e classes necessárias do SQLAlchemy.
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 # Importa a instância de configurações para aceder à URL da base de dados.
 from app.core.config import settings
+from app.db.pool_stats import InstrumentedQueuePool
 
-# Cria a "engine" do SQLAlchemy, que é o ponto central de comunicação com a base de dados.
+
+def pool_kwargs(url: str) -> dict:
+    """
+    Argumentos de configuração do pool de conexões, lidos das configurações (DB_POOL_*).
+    Uma base de dados SQLite em memória usa um pool próprio do SQLAlchemy, sem estas opções.
+
+    :param url: A URL de ligação à base de dados.
+    :return: Um dicionário de argumentos para create_engine / create_async_engine.
+    """
+    url_obj = make_url(url)
+    if url_obj.get_backend_name() == "sqlite" and url_obj.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+# A "engine" do SQLAlchemy é o ponto central de comunicação com a base de dados.
 # A engine gere um pool de conexões com a base de dados para otimizar a performance.
-# Ela é configurada uma única vez quando a aplicação inicia, usando a URL de conexão
-# fornecida no ficheiro .env.
-engine = create_engine(settings.DATABASE_URL)
+# Não é criada na importação deste módulo, mas no arranque do servidor (lifespan, em
+# app/main.py) ou no primeiro uso: importar a aplicação não exige uma base de dados.
+engine: Optional[Engine] = None
 
 # Cria uma "fábrica" de sessões chamada SessionLocal.
 # Cada instância de SessionLocal será uma sessão transacional com a base de dados.
@@ -18,8 +41,55 @@ engine = create_engine(settings.DATABASE_URL)
 #   Isto permite um controlo explícito sobre quando as alterações são gravadas.
 # - autoflush=False: Impede que o estado da sessão seja enviado para a base de dados
 #   automaticamente antes de um commit.
-# - bind=engine: Associa esta fábrica de sessões à engine que acabámos de criar.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# A fábrica é associada à engine por get_engine(); use new_session() para obter uma sessão.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def get_engine() -> Engine:
+    """
+    Devolve a engine da aplicação, criando-a (e associando-a a SessionLocal) no primeiro uso.
+    O pool é configurável (DB_POOL_*) e instrumentado (app/db/pool_stats.py), para que o
+    tempo de espera por conexões possa ser observado no endpoint /internal/pool.
+    :raises RuntimeError: Se DATABASE_URL não estiver definida.
+    """
+    global engine
+    if engine is None:
+        if not settings.DATABASE_URL:
+            raise RuntimeError("A variável de ambiente DATABASE_URL não está definida.")
+        kwargs = pool_kwargs(settings.DATABASE_URL)
+        if kwargs:
+            kwargs["poolclass"] = InstrumentedQueuePool
+        engine = create_engine(settings.DATABASE_URL, **kwargs)
+        SessionLocal.configure(bind=engine)
+    return engine
+
+
+def new_session():
+    """Cria uma nova sessão da base de dados (criando a engine, se ainda não existir)."""
+    get_engine()
+    return SessionLocal()
+
+
+def warm_up_pool() -> None:
+    """
+    Abre DB_POOL_WARMUP conexões (no máximo DB_POOL_SIZE) e devolve-as ao pool, para que
+    os primeiros pedidos depois do arranque encontrem conexões já estabelecidas.
+    """
+    engine = get_engine()
+    total = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE) if pool_kwargs(settings.DATABASE_URL) else 1
+    conexoes = []
+    try:
+        for _ in range(max(total, 0)):
+            conexoes.append(engine.connect())
+    finally:
+        for conexao in conexoes:
+            conexao.close()
+
+
+def dispose_engine() -> None:
+    """Fecha todas as conexões do pool da engine, se tiver sido criada (encerramento do servidor)."""
+    if engine is not None:
+        engine.dispose()
 
 # Cria uma classe base para todos os modelos ORM (Object-Relational Mapper) da aplicação.
 # Todos os seus modelos (como Empresa e Usuario) devem herdar desta classe Base
@@ -37,7 +107,7 @@ def get_db():
        mesmo que ocorram erros, libertando assim a conexão de volta para o pool da engine.
     Isto previne o esgotamento de conexões com a base de dados.
     """
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
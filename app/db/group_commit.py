@@ -0,0 +1,101 @@
+# Group commit: agrupa escritas concorrentes de várias threads numa única transação.
+# Os endpoints síncronos correm em threads do threadpool; em vez de cada pedido pagar o seu
+# próprio commit (e o fsync correspondente na base de dados), o primeiro pedido a chegar
+# torna-se o "líder", espera uma janela curta pelos seguintes e grava-os todos de uma vez.
+import threading
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+
+class _Pedido:
+    """Uma escrita submetida ao group commit e o seu resultado (ou erro)."""
+
+    __slots__ = ("valores", "pronto", "resultado", "erro", "lider")
+
+    def __init__(self, valores: Any):
+        self.valores = valores
+        # Sinalizado quando o resultado está disponível ou quando o pedido é promovido a líder.
+        self.pronto = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+        self.lider = False
+
+
+class GroupCommit:
+    """
+    Coordenação líder/seguidores de um group commit.
+
+    - O primeiro pedido sem líder ativo torna-se líder: espera até 'janela' segundos (ou até
+      haver 'max_linhas' pedidos), retira o lote da fila e executa-o com 'executar_lote'.
+    - Os restantes pedidos esperam pelo resultado, sem consumir CPU.
+    - No fim, se houver pedidos em fila, o primeiro deles é promovido a líder do lote seguinte.
+      Assim, cada pedido espera no máximo pelo lote em curso e pelo seu próprio lote.
+
+    'executar_lote' recebe os valores dos pedidos e devolve, pela mesma ordem, o resultado de
+    cada um ou a exceção que lhe deve ser levantada (ex: uma violação de unicidade).
+    Uma exceção levantada pelo próprio 'executar_lote' é devolvida a todos os pedidos do lote.
+    """
+
+    def __init__(self, executar_lote: Callable[[List[Any]], Sequence[Union[Any, BaseException]]], janela: float, max_linhas: int):
+        """
+        :param executar_lote: A função que grava um lote numa única transação.
+        :param janela: Tempo máximo (segundos) que o líder espera por mais pedidos.
+        :param max_linhas: Tamanho máximo de cada lote.
+        """
+        self.executar_lote = executar_lote
+        self.janela = janela
+        self.max_linhas = max(max_linhas, 1)
+        self._cond = threading.Condition()
+        self._fila: List[_Pedido] = []
+        self._com_lider = False
+
+    def submit(self, valores: Any) -> Any:
+        """
+        Submete uma escrita e bloqueia a thread até o seu lote estar gravado.
+        :param valores: Os dados da escrita, passados a 'executar_lote'.
+        :return: O resultado desta escrita.
+        :raises Exception: A exceção devolvida por 'executar_lote' para esta escrita.
+        """
+        pedido = _Pedido(valores)
+        with self._cond:
+            self._fila.append(pedido)
+            lider = not self._com_lider
+            if lider:
+                self._com_lider = True
+            elif len(self._fila) >= self.max_linhas:
+                # O lote está cheio: o líder não precisa de esperar pelo fim da janela.
+                self._cond.notify_all()
+        if not lider:
+            pedido.pronto.wait()
+            lider = pedido.lider
+        if lider:
+            self._liderar()
+        if pedido.erro is not None:
+            raise pedido.erro
+        return pedido.resultado
+
+    def _liderar(self) -> None:
+        """Recolhe um lote, grava-o e passa a liderança ao pedido seguinte (se existir)."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._fila) >= self.max_linhas, timeout=self.janela)
+            lote, self._fila = self._fila[:self.max_linhas], self._fila[self.max_linhas:]
+
+        try:
+            resultados = list(self.executar_lote([pedido.valores for pedido in lote]))
+        except Exception as exc:
+            resultados = [exc] * len(lote)
+        for pedido, resultado in zip(lote, resultados):
+            if isinstance(resultado, BaseException):
+                pedido.erro = resultado
+            else:
+                pedido.resultado = resultado
+
+        with self._cond:
+            seguinte = self._fila[0] if self._fila else None
+            if seguinte is not None:
+                seguinte.lider = True
+            else:
+                self._com_lider = False
+        for pedido in lote:
+            pedido.pronto.set()
+        if seguinte is not None:
+            seguinte.pronto.set()
@@ -1,5 +1,5 @@
 # Importa os componentes necessários do SQLAlchemy para definir os tipos de colunas e funções da BD.
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Index, func
 
 # Importa a classe 'Base' declarativa do nosso módulo de base de dados.
 # Todas as classes de modelo ORM devem herdar desta Base para serem mapeadas pelo SQLAlchemy.
@@ -43,6 +43,41 @@ class Empresa(Base):
     #   que insere o timestamp atual do servidor da base de dados no momento da criação do registo.
     data_cadastro = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Define a coluna 'versao', incrementada a cada atualização do registo.
+    # É usada para gerar os ETags das respostas e para o controlo de concorrência otimista (If-Match).
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Data da última alteração (criação ou atualização) do registo.
+    # É um default do lado do cliente (e não server_default) para que a coluna possa ser
+    # acrescentada a tabelas existentes em SQLite, que não aceita defaults não constantes no ALTER TABLE.
+    atualizado_em = Column(DateTime(timezone=True), default=func.now())
+
+    # Número de sequência da última alteração, atribuído pela própria instrução de escrita
+    # (ver empresa_repository.expr_seq). Permite a GET /empresas/changes devolver as alterações
+    # a partir de um ponto.
+    seq = Column(BigInteger)
+
+    # Índice composto que suporta a paginação por cursor ordenada por nome.
+    # O 'id' desempata empresas com o mesmo nome, tornando a ordem total e estável.
+    # ix_empresas_seq_id suporta o feed de alterações (várias empresas podem partilhar o mesmo
+    # 'seq', quando alteradas pela mesma instrução).
+    __table_args__ = (
+        Index("ix_empresas_nome_id", "nome", "id"),
+        Index("ix_empresas_seq_id", "seq", "id"),
+    )
+
+class EmpresaRemovida(Base):
+    """
+    Modelo ORM que mapeia para a tabela 'empresas_removidas' (tombstones).
+    Regista as empresas apagadas, para que o feed de alterações as possa reportar.
+    """
+    __tablename__ = "empresas_removidas"
+
+    # O 'seq' da remoção, partilhado pela sequência de alterações de 'empresas'.
+    seq = Column(BigInteger, primary_key=True)
+    empresa_id = Column(Integer, primary_key=True)
+    removida_em = Column(DateTime(timezone=True), default=func.now())
+
 class Usuario(Base):
     """
     Modelo ORM que mapeia para a tabela 'usuarios' (administradores).
@@ -58,3 +93,22 @@ class Usuario(Base):
     # Esta coluna irá armazenar a representação da senha após passar pelo algoritmo de hashing (bcrypt).
     # Nunca se deve armazenar senhas em texto plano.
     hashed_password = Column(String, nullable=False)
+
+class TokenRevogado(Base):
+    """
+    Modelo ORM que mapeia para a tabela 'tokens_revogados' (lista de revogação de tokens JWT).
+    Cada linha identifica um token (claim "jti") ou uma sessão inteira (claim "fam") revogados.
+    """
+    __tablename__ = "tokens_revogados"
+
+    # O 'id' é crescente, o que permite aos workers ler apenas as revogações novas.
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Identificador do token ou da sessão (família de tokens) revogados.
+    jti = Column(String, unique=True, nullable=False)
+
+    # Data a partir da qual a revogação deixa de ser necessária (o token já expirou por si).
+    # O índice permite apagar rapidamente as revogações expiradas.
+    expira_em = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    revogado_em = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,127 @@
+# Instrumentação do pool de conexões do SQLAlchemy.
+# Permite saber se, sob carga, os pedidos estão à espera de uma conexão livre do pool
+# (pool subdimensionado) ou à espera da própria base de dados.
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Limites superiores (em milissegundos) dos intervalos do histograma de espera pelo checkout.
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolStats:
+    """
+    Contadores acumulados do pool de conexões: checkouts, tempo de espera, conexões de
+    overflow criadas e timeouts. É atualizado por InstrumentedQueuePool e é seguro para
+    uso concorrente (os endpoints síncronos correm em várias threads).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Repõe todos os contadores a zero."""
+        with self._lock:
+            self.checkouts = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.overflow_events = 0
+            self.timeouts = 0
+
+    def record_checkout(self, wait_ms: float, overflow: bool) -> None:
+        """
+        Regista um checkout bem-sucedido.
+        :param wait_ms: Tempo (ms) que o pedido esperou pela conexão.
+        :param overflow: True se foi preciso abrir uma conexão de overflow (acima de pool_size).
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            for indice, limite in enumerate(WAIT_BUCKETS_MS):
+                if wait_ms <= limite:
+                    self.wait_buckets[indice] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+            if overflow:
+                self.overflow_events += 1
+
+    def record_timeout(self) -> None:
+        """Regista um pedido que desistiu após pool_timeout segundos sem conexão disponível."""
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool=None) -> Dict:
+        """
+        Devolve os contadores acumulados e, se for indicado o pool, o seu estado atual.
+        :param pool: O pool da engine (engine.pool), para as métricas instantâneas.
+        :return: Um dicionário pronto a ser devolvido como JSON.
+        """
+        with self._lock:
+            dados = {
+                "checkouts": self.checkouts,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "avg": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                    "max": round(self.wait_max_ms, 3),
+                    "buckets": {
+                        **{f"le_{limite}": total for limite, total in zip(WAIT_BUCKETS_MS, self.wait_buckets)},
+                        "le_inf": self.wait_buckets[-1],
+                    },
+                },
+            }
+        if isinstance(pool, QueuePool):
+            dados.update({
+                "pool_size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # Conexões abertas acima de pool_size (negativo enquanto o pool não está cheio).
+                "overflow": pool.overflow(),
+            })
+        return dados
+
+
+# Contadores do pool da engine síncrona e do da engine assíncrona (DB_ASYNC) do processo.
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _InstrumentedPool:
+    """
+    Mede o tempo de espera de cada checkout e deteta a criação de conexões de overflow e os
+    timeouts, registando-os nos contadores da classe ('_stats'). Combinado com o pool do SQLAlchemy.
+    """
+
+    _stats: PoolStats
+
+    def _do_get(self):
+        overflow_antes = self.overflow()
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            self._stats.record_timeout()
+            raise
+        espera_ms = (time.perf_counter() - inicio) * 1000
+        # O contador de overflow só sobe acima de zero quando é aberta uma conexão além de pool_size.
+        self._stats.record_checkout(espera_ms, overflow=self.overflow() > max(overflow_antes, 0))
+        return conexao
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    """QueuePool instrumentado da engine síncrona (contadores em pool_stats)."""
+
+    _stats = pool_stats
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """Pool instrumentado da engine assíncrona (contadores em async_pool_stats)."""
+
+    _stats = async_pool_stats
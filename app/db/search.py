@@ -0,0 +1,88 @@
+# Infraestrutura de pesquisa textual para a tabela 'empresas'.
+# Um filtro ILIKE com wildcard inicial ('%termo%') não consegue usar os índices B-tree
+# declarados em models.py e obriga a ler a tabela inteira. Este módulo cria, consoante o
+# dialeto da base de dados, um índice próprio para pesquisa:
+# - PostgreSQL: índice GIN de trigramas (pg_trgm) sobre o texto normalizado sem acentos (unaccent).
+# - SQLite: tabela virtual FTS5 sincronizada por triggers, com remoção de diacríticos.
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Expressão SQL (PostgreSQL) com o "documento" pesquisável de cada empresa: nome, cidade e ramo,
+# em minúsculas e sem acentos. A consulta tem de usar exatamente a mesma expressão para o índice ser usado.
+DOC_POSTGRES = (
+    "empresa_busca_norm(coalesce(nome, '') || ' ' || coalesce(cidade, '') || ' ' || coalesce(ramo_atuacao, ''))"
+)
+
+# Nome da tabela virtual FTS5 usada em SQLite.
+FTS_TABELA = "empresas_fts"
+
+_DDL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() não é IMMUTABLE (depende do dicionário configurado), pelo que não pode ser usada
+    # diretamente num índice. Este wrapper fixa o dicionário e pode ser declarado IMMUTABLE.
+    """
+    CREATE OR REPLACE FUNCTION empresa_busca_norm(texto text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+    $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto)) $$
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_empresas_busca_trgm ON empresas USING gin ({DOC_POSTGRES} gin_trgm_ops)",
+]
+
+_DDL_SQLITE = [
+    # Tabela FTS5 de "conteúdo externo": guarda apenas o índice invertido e lê o texto da tabela 'empresas'.
+    # 'remove_diacritics 2' faz com que "São Paulo" e "sao paulo" produzam os mesmos tokens.
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABELA} USING fts5(
+        nome, cidade, ramo_atuacao,
+        content='empresas', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Triggers que mantêm o índice FTS sincronizado com as escritas na tabela 'empresas'.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABELA}_ai AFTER INSERT ON empresas BEGIN
+        INSERT INTO {FTS_TABELA}(rowid, nome, cidade, ramo_atuacao)
+        VALUES (new.id, new.nome, new.cidade, new.ramo_atuacao);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABELA}_ad AFTER DELETE ON empresas BEGIN
+        INSERT INTO {FTS_TABELA}({FTS_TABELA}, rowid, nome, cidade, ramo_atuacao)
+        VALUES ('delete', old.id, old.nome, old.cidade, old.ramo_atuacao);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABELA}_au AFTER UPDATE OF nome, cidade, ramo_atuacao ON empresas BEGIN
+        INSERT INTO {FTS_TABELA}({FTS_TABELA}, rowid, nome, cidade, ramo_atuacao)
+        VALUES ('delete', old.id, old.nome, old.cidade, old.ramo_atuacao);
+        INSERT INTO {FTS_TABELA}(rowid, nome, cidade, ramo_atuacao)
+        VALUES (new.id, new.nome, new.cidade, new.ramo_atuacao);
+    END
+    """,
+]
+
+
+def install_search(engine: Engine) -> None:
+    """
+    Cria (de forma idempotente) os índices e objetos de pesquisa para o dialeto da engine.
+    Deve ser executada depois de as tabelas existirem. Noutros dialetos não faz nada e
+    a pesquisa recorre a ILIKE.
+
+    :param engine: A engine do SQLAlchemy ligada à base de dados da aplicação.
+    """
+    dialeto = engine.dialect.name
+    with engine.begin() as conn:
+        if dialeto == "postgresql":
+            for ddl in _DDL_POSTGRES:
+                conn.execute(text(ddl))
+        elif dialeto == "sqlite":
+            existia = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                {"nome": FTS_TABELA},
+            ).first()
+            for ddl in _DDL_SQLITE:
+                conn.execute(text(ddl))
+            # Numa base de dados já com empresas, o índice recém-criado tem de ser preenchido uma vez.
+            if not existia:
+                conn.execute(text(f"INSERT INTO {FTS_TABELA}({FTS_TABELA}) VALUES ('rebuild')"))
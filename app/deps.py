@@ -1,41 +1,49 @@
 # Importações necessárias do FastAPI, bibliotecas de segurança e módulos do projeto.
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 # Importações de módulos internos da aplicação.
 from app.core.config import settings 
+from app.core.cache import user_cache
+from app.core.revocation import revocation_set
 from app.db.database import get_db 
+from app.db.async_database import get_async_db
 from app.schemas.token import TokenData 
+from app.schemas.usuario import Usuario
 from app.repositories.usuario_repository import UsuarioRepository 
+from app.repositories.async_usuario_repository import AsyncUsuarioRepository
 
 # Configura o esquema de segurança OAuth2.
 # O FastAPI usará isto para identificar como o token deve ser fornecido.
 # "tokenUrl" indica ao Swagger UI qual endpoint deve ser usado para obter o token (o de login).
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
-def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_client_ip(request: Request) -> Optional[str]:
     """
-    Dependência do FastAPI para validar o token JWT e obter o utilizador atual.
-    
-    Esta função é usada para proteger os endpoints. Ela executa antes de cada pedido
-    a uma rota protegida e faz o seguinte:
-    1. Exige um token no cabeçalho Authorization.
-    2. Decodifica e valida o token.
-    3. Procura o utilizador correspondente na base de dados.
-    
-    Se qualquer passo falhar, levanta uma exceção HTTPException, bloqueando o acesso.
-    Se for bem-sucedida, retorna o objeto do utilizador autenticado.
+    Dependência do FastAPI que devolve o endereço IP do cliente (usado nos limites de pedidos).
+    Atrás de um proxy, o uvicorn deve ser iniciado com --proxy-headers / --forwarded-allow-ips
+    para que este seja o IP original (X-Forwarded-For) e não o do proxy.
     """
-    
-    # Define uma exceção padrão a ser retornada se a autenticação falhar.
-    credentials_exception = HTTPException(
+    return request.client.host if request.client else None
+
+def _credentials_exception() -> HTTPException:
+    """Exceção padrão a ser retornada se a autenticação falhar."""
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _decode_token(token: str) -> TokenData:
+    """
+    Decodifica e valida o token JWT, devolvendo os dados do utilizador nele contidos.
+    :raises HTTPException: 401 se o token for inválido, estiver expirado, não tiver "sub",
+                           for um refresh token ou tiver sido revogado.
+    """
     try:
         # Tenta decodificar o token usando a chave secreta e o algoritmo definidos.
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -44,25 +52,99 @@ def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = D
         username: str = payload.get("sub")
         if username is None:
             # Se não houver nome de utilizador no token, levanta a exceção.
-            raise credentials_exception
+            raise _credentials_exception()
+
+        # Um refresh token só pode ser usado em POST /refresh.
+        if payload.get("typ") == "refresh":
+            raise _credentials_exception()
+
+        # Rejeita os tokens revogados (logout ou reutilização de um refresh token).
+        # A consulta é feita à lista em memória, sem acesso à base de dados.
+        jti, familia = payload.get("jti"), payload.get("fam")
+        if revocation_set.is_revoked(jti, familia):
+            raise _credentials_exception()
         
         # Valida os dados do token com o schema Pydantic.
-        token_data = TokenData(username=username)
-    except JWTError:
+        return TokenData(username=username, user_id=payload.get("uid"), jti=jti, familia=familia)
+    except (JWTError, ValueError):
         # Se ocorrer um erro durante a decodificação (token inválido, expirado, etc.),
         # levanta a exceção.
-        raise credentials_exception
-    
-    # Cria uma instância do repositório para aceder à base de dados.
-    repo = UsuarioRepository()
-    
-    # Procura o utilizador na base de dados pelo nome de utilizador extraído do token.
-    user = repo.get_by_username(db, username=token_data.username)
+        raise _credentials_exception()
+
+def _get_user_without_db(token_data: TokenData) -> Optional[Usuario]:
+    """
+    Tenta resolver o utilizador sem consultar a base de dados.
+    :return: O utilizador, ou None se for necessário ir à base de dados.
+    """
+    # Modo sem base de dados: o token assinado já identifica o utilizador por completo.
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and token_data.user_id is not None:
+        return Usuario(id=token_data.user_id, username=token_data.username)
+
+    # Caso comum: o utilizador já foi validado recentemente e está na cache.
+    return user_cache.get(token_data.username)
+
+def _cache_user(token_data: TokenData, user) -> Usuario:
+    """
+    Guarda uma cópia desligada da sessão (sem a senha), que pode ser partilhada entre pedidos.
+    :raises HTTPException: 401 se o utilizador não existir.
+    """
     if user is None:
         # Se o utilizador não for encontrado na base de dados, levanta a exceção.
         # Isto protege contra tokens válidos de utilizadores que foram entretanto apagados.
-        raise credentials_exception
-        
-    # Se tudo estiver correto, retorna o objeto do utilizador.
+        raise _credentials_exception()
+    current_user = Usuario.model_validate(user)
+    user_cache.set(token_data.username, current_user)
+    return current_user
+
+def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    Dependência do FastAPI para validar o token JWT e obter o utilizador atual.
+    
+    Esta função é usada para proteger os endpoints. Ela executa antes de cada pedido
+    a uma rota protegida e faz o seguinte:
+    1. Exige um token no cabeçalho Authorization.
+    2. Decodifica e valida o token.
+    3. Procura o utilizador correspondente na cache ou, se não estiver lá, na base de dados.
+    
+    Se qualquer passo falhar, levanta uma exceção HTTPException, bloqueando o acesso.
+    Se for bem-sucedida, retorna o utilizador autenticado (schema Usuario).
+    """
+    token_data = _decode_token(token)
+    current_user = _get_user_without_db(token_data)
+    if current_user is not None:
+        return current_user
+
+    # Cria uma instância do repositório e procura o utilizador na base de dados
+    # pelo nome de utilizador extraído do token.
+    repo = UsuarioRepository()
+    user = repo.get_by_username(db, username=token_data.username)
+
+    # Se tudo estiver correto, retorna o utilizador.
     # Este utilizador pode ser injetado nos endpoints que usam esta dependência.
-    return user
+    return _cache_user(token_data, user)
+
+async def get_current_active_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """
+    Versão de get_current_active_user para a pilha assíncrona (DB_ASYNC).
+    Partilha a validação do token e a cache de utilizadores com a versão síncrona.
+    """
+    token_data = _decode_token(token)
+    current_user = _get_user_without_db(token_data)
+    if current_user is not None:
+        return current_user
+
+    repo = AsyncUsuarioRepository()
+    user = await repo.get_by_username(db, username=token_data.username)
+    return _cache_user(token_data, user)
+
+
+def get_current_token(token: str = Depends(oauth2_scheme), current_user: Usuario = Depends(get_current_active_user)) -> TokenData:
+    """
+    Dependência do FastAPI que devolve os dados do token do pedido (ex: para POST /logout),
+    depois de validado o utilizador por get_current_active_user.
+    """
+    return _decode_token(token)
+
+async def get_current_token_async(token: str = Depends(oauth2_scheme), current_user: Usuario = Depends(get_current_active_user_async)) -> TokenData:
+    """Versão de get_current_token para a pilha assíncrona (DB_ASYNC)."""
+    return _decode_token(token)
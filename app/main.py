@@ -1,17 +1,60 @@
 # Importa a classe FastAPI, que é o núcleo do framework.
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 
 # Importa os módulos internos necessários para a aplicação.
-# - 'models': Contém as classes que definem as tabelas da base de dados (ORM).
 # - 'database': Contém a configuração da engine e da sessão da base de dados.
 # - 'empresa' e 'auth': São os módulos de routers que contêm os endpoints da API.
-from app.db import models, database
-from app.routers import empresa, auth
+# A importação não liga à base de dados: a engine é criada no arranque (lifespan) e o
+# esquema é preparado pelo comando 'python -m app.db.bootstrap'.
+from app.db import database
+from app.db import async_database
+from app.db.bootstrap import bootstrap
+from app.core.security import shutdown_hash_executor
+from app.core import metrics
+from app.core.invalidation import invalidation_bus
+from app.service import token_service
+from app.routers import empresa, auth, async_empresa, async_auth, internal
+from app.core.config import settings
 
-# Inicialização da base de dados.
-# Ele instrui o SQLAlchemy a criar todas as tabelas definidas em 'app/db/models.py'
-# (que herdam de 'database.Base') na base de dados conectada, caso elas ainda não existam.
-models.Base.metadata.create_all(bind=database.engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da aplicação: o código antes do 'yield' corre no arranque,
+    o código depois do 'yield' corre no encerramento do servidor.
+    """
+    em_falta = settings.missing()
+    if em_falta:
+        raise RuntimeError(f"Variáveis de ambiente em falta: {', '.join(em_falta)}.")
+    if settings.DB_BOOTSTRAP_ON_STARTUP:
+        await run_in_threadpool(bootstrap)
+    # Cria a engine e abre as primeiras conexões antes de aceitar pedidos.
+    await run_in_threadpool(database.warm_up_pool)
+    if settings.DB_ASYNC:
+        # Em modo assíncrono, os pedidos são servidos pela engine assíncrona: também é criada
+        # e aquecida antes de aceitar pedidos, em vez de no primeiro pedido.
+        await async_database.warm_up_async_pool()
+    # Carrega a lista de tokens revogados e mantém-na atualizada (revogações feitas por outros workers).
+    await run_in_threadpool(token_service.sincronizar_revogacoes)
+    sincronizar_revogacoes = asyncio.create_task(token_service.sincronizar_periodicamente())
+    # Com INVALIDATION_BUS, as escritas dos outros workers descartam as entradas das caches deste.
+    if settings.INVALIDATION_BUS:
+        await run_in_threadpool(invalidation_bus.iniciar, database.get_engine())
+    # Com METRICS_DIR, cada worker grava periodicamente as suas métricas para a agregação em /metrics.
+    flush_metricas = asyncio.create_task(metrics.flush_periodicamente()) if settings.METRICS_DIR else None
+    yield
+    sincronizar_revogacoes.cancel()
+    await run_in_threadpool(invalidation_bus.parar)
+    if flush_metricas is not None:
+        flush_metricas.cancel()
+    # Termina os processos do pool de hashing de senhas.
+    shutdown_hash_executor()
+    # Fecha as conexões das engines (a assíncrona só se tiver sido criada).
+    database.dispose_engine()
+    await async_database.dispose_async_engine()
 
 # Cria a instância principal da aplicação FastAPI.
 # Todos os endpoints, configurações e middlewares serão associados a esta variável 'app'.
@@ -19,15 +62,30 @@ app = FastAPI(
     # Metadados para a documentação automática (Swagger UI / ReDoc).
     title="API de Gestão de Empresas Clentes",
     description="Uma API profissional para gerir empresas clientes, com autenticação e segurança.",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
 )
 
+# Regista a latência, o número de pedidos e os pedidos em curso de cada endpoint (ver GET /metrics).
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Inclui os routers na aplicação principal.
 # Esta é a forma organizada de adicionar todos os endpoints definidos em outros ficheiros.
-# O router de 'auth' contém os endpoints públicos /register e /login.
-app.include_router(auth.router)
-# O router de 'empresa' contém todos os endpoints de CRUD para /empresas.
-app.include_router(empresa.router)
+# Com DB_ASYNC ativo, os endpoints de autenticação e de CRUD de empresas usam a pilha
+# assíncrona (AsyncEngine/AsyncSession); caso contrário, usam a pilha síncrona habitual.
+if settings.DB_ASYNC:
+    app.include_router(async_auth.router)
+else:
+    # O router de 'auth' contém os endpoints públicos /register e /login.
+    app.include_router(auth.router)
+# Os restantes endpoints de empresas (operações em massa, exportação, pesquisa, estatísticas e
+# feed de alterações) são os mesmos nos dois modos. Têm de ser incluídos antes do router de
+# CRUD, para que os caminhos fixos (ex: /empresas/stats) não sejam captados por /{empresa_id}.
+app.include_router(empresa.router_partilhado)
+# O router de 'empresa' contém os endpoints de CRUD para /empresas.
+app.include_router(async_empresa.router if settings.DB_ASYNC else empresa.router)
+# O router 'internal' contém endpoints de diagnóstico (ex: telemetria do pool de conexões).
+app.include_router(internal.router)
 
 # Define um endpoint para a raiz da API ("/")
 # É útil para verificar rapidamente se a API está a funcionar.
@@ -38,3 +96,13 @@ def read_root():
     Retorna uma mensagem de boas-vindas.
     """
     return {"message": "Bem-vindo à API de Gestão de Empresas!"}
+
+# Endpoint com as métricas HTTP no formato de texto do Prometheus, para ser recolhido
+# (scraped) periodicamente. Fica fora da documentação, tal como é habitual.
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """
+    Devolve as métricas HTTP de todos os workers (ou do processo atual, sem METRICS_DIR).
+    É 'async' para correr na thread do event loop, a mesma que atualiza as métricas.
+    """
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
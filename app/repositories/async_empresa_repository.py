@@ -0,0 +1,126 @@
+# Importa a AsyncSession do SQLAlchemy para tipagem e os construtores de consultas.
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, insert, select, tuple_, update
+# Importa os módulos internos: 'models' para os ORMs e 'empresa_schema' para os modelos Pydantic.
+from app.db import models
+from app.schemas import empresa as empresa_schema
+from app.core.pagination import ORDENACOES
+from app.core.cache import facet_cache
+from app.core.invalidation import CANAL_FACETAS, invalidation_bus
+from app.repositories.empresa_repository import COLUNAS_LEITURA, FACETAS, aplicar_filtros, expr_seq
+# Importa tipos do Python para type hinting.
+from typing import Optional, Sequence
+from sqlalchemy.engine import Row
+
+
+class AsyncEmpresaRepository:
+    """
+    Versão assíncrona de EmpresaRepository, usada quando DB_ASYNC está ativo.
+    Tem a mesma interface, mas recebe uma AsyncSession e os métodos são corrotinas.
+    """
+
+    async def create(self, db: AsyncSession, empresa: empresa_schema.EmpresaCreate) -> models.Empresa:
+        """
+        Cria um novo registo de empresa com um único INSERT ... RETURNING (ver EmpresaRepository.create).
+        :param db: A sessão assíncrona da base de dados.
+        :param empresa: Um objeto Pydantic EmpresaCreate com os dados da nova empresa.
+        :return: O objeto ORM da empresa recém-criada.
+        :raises IntegrityError: Se o CNPJ ou o e-mail já estiverem registados.
+        """
+        stmt = insert(models.Empresa).values(**empresa.dict(), seq=self._seq(db)).returning(models.Empresa)
+        db_empresa = (await db.scalars(stmt)).one()
+        invalidation_bus.publicar(db.sync_session, CANAL_FACETAS)
+        # A sessão não expira os objetos no commit (expire_on_commit=False): os valores
+        # devolvidos pelo RETURNING continuam carregados.
+        await db.commit()
+        facet_cache.ajustar({faceta: getattr(db_empresa, faceta) for faceta in FACETAS}, 1)
+        return db_empresa
+
+    def _seq(self, db: AsyncSession):
+        """A expressão do 'seq' das escritas (ver expr_seq), para a base de dados da sessão."""
+        return expr_seq(db.get_bind().dialect.name)
+
+    async def get_by_id(self, db: AsyncSession, empresa_id: int) -> Optional[models.Empresa]:
+        """Obtém um registo de empresa pelo seu ID."""
+        return await db.get(models.Empresa, empresa_id)
+
+    async def get_row_by_id(self, db: AsyncSession, empresa_id: int, colunas: Sequence[str] = COLUNAS_LEITURA) -> Optional[Row]:
+        """Obtém apenas as colunas indicadas de uma empresa, como uma linha (ver EmpresaRepository.get_row_by_id)."""
+        stmt = select(*(getattr(models.Empresa, nome) for nome in colunas)).where(models.Empresa.id == empresa_id)
+        return (await db.execute(stmt)).first()
+
+    async def get_all(self, db: AsyncSession, skip: int, limit: int, filtros: dict, ordenar_por: str = "id",
+                      colunas: Sequence[str] = COLUNAS_LEITURA) -> Sequence[Row]:
+        """
+        Obtém uma lista de empresas, com paginação por offset e filtros dinâmicos.
+        Tal como EmpresaRepository.get_all, seleciona apenas as colunas indicadas e devolve linhas.
+        """
+        stmt = aplicar_filtros(select(*(getattr(models.Empresa, nome) for nome in colunas)), filtros)
+        ordem = [getattr(models.Empresa, nome) for nome in ORDENACOES[ordenar_por]]
+        return (await db.execute(stmt.order_by(*ordem).offset(skip).limit(limit))).all()
+
+    async def get_after(self, db: AsyncSession, chave: list, limit: int, filtros: dict, ordenar_por: str = "id",
+                        colunas: Sequence[str] = COLUNAS_LEITURA) -> Sequence[Row]:
+        """Obtém a página de empresas que se segue a uma chave de ordenação (paginação por cursor)."""
+        stmt = aplicar_filtros(select(*(getattr(models.Empresa, nome) for nome in colunas)), filtros)
+        ordem = [getattr(models.Empresa, nome) for nome in ORDENACOES[ordenar_por]]
+        stmt = stmt.where(tuple_(*ordem) > tuple_(*chave))
+        return (await db.execute(stmt.order_by(*ordem).limit(limit))).all()
+
+    async def update(self, db: AsyncSession, empresa_id: int, update_data: empresa_schema.EmpresaUpdate, versao_esperada: Optional[int] = None) -> Optional[models.Empresa]:
+        """
+        Atualiza os dados de um registo de empresa existente e incrementa a sua versão,
+        com um único UPDATE ... RETURNING (ver EmpresaRepository.update).
+        :param versao_esperada: Se indicada, só atualiza se a versão atual for esta (If-Match).
+        :return: O objeto ORM da empresa atualizada ou None se não for encontrada
+                 (ou se a versão não corresponder à esperada).
+        :raises IntegrityError: Se o novo e-mail já pertencer a outra empresa.
+        """
+        valores = update_data.dict(exclude_unset=True)
+        if not valores:
+            # Nada a alterar: a versão mantém-se e devolve-se o registo atual.
+            db_empresa = await self.get_by_id(db, empresa_id)
+            if db_empresa is not None and versao_esperada is not None and db_empresa.versao != versao_esperada:
+                return None
+            return db_empresa
+
+        valores["versao"] = models.Empresa.versao + 1
+        valores.update(seq=self._seq(db), atualizado_em=func.now())
+        stmt = update(models.Empresa).where(models.Empresa.id == empresa_id)
+        if versao_esperada is not None:
+            # Controlo de concorrência otimista, verificado no próprio UPDATE.
+            stmt = stmt.where(models.Empresa.versao == versao_esperada)
+        stmt = stmt.values(**valores).returning(models.Empresa)
+        db_empresa = (await db.scalars(stmt)).one_or_none()
+        if db_empresa is None:
+            await db.rollback()
+            return None
+        facetas_alteradas = any(faceta in valores for faceta in FACETAS)
+        if facetas_alteradas:
+            invalidation_bus.publicar(db.sync_session, CANAL_FACETAS)
+        await db.commit()
+        if facetas_alteradas:
+            # Os valores anteriores não são conhecidos: as contagens são recarregadas no próximo pedido.
+            facet_cache.invalidate()
+        return db_empresa
+
+    async def delete(self, db: AsyncSession, empresa_id: int, versao_esperada: Optional[int] = None) -> bool:
+        """
+        Apaga um registo de empresa com um único DELETE ... RETURNING, sem SELECT prévio
+        (ver EmpresaRepository.delete).
+        :param versao_esperada: Se indicada, só apaga se a versão atual for esta (If-Match).
+        :return: True se a empresa foi apagada com sucesso, False caso contrário.
+        """
+        stmt = delete(models.Empresa).where(models.Empresa.id == empresa_id)
+        if versao_esperada is not None:
+            stmt = stmt.where(models.Empresa.versao == versao_esperada)
+        apagada = (await db.execute(stmt.returning(*(getattr(models.Empresa, faceta) for faceta in FACETAS)))).first()
+        if apagada is None:
+            await db.rollback()
+            return False
+        # Tombstone para o feed de alterações, na mesma transação.
+        await db.execute(insert(models.EmpresaRemovida).values(seq=self._seq(db), empresa_id=empresa_id))
+        invalidation_bus.publicar(db.sync_session, CANAL_FACETAS)
+        await db.commit()
+        facet_cache.ajustar(apagada._asdict(), -1)
+        return True
@@ -0,0 +1,39 @@
+# Importa a AsyncSession do SQLAlchemy para tipagem e o construtor de consultas.
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+# Importa os módulos internos: 'models' para os ORMs e 'usuario_schema' para os modelos Pydantic.
+from app.db import models
+from app.schemas import usuario as usuario_schema
+from app.core.cache import user_cache
+from app.core.invalidation import CANAL_USUARIO, invalidation_bus
+
+
+class AsyncUsuarioRepository:
+    """
+    Versão assíncrona de UsuarioRepository, usada quando DB_ASYNC está ativo.
+    """
+
+    async def get_by_username(self, db: AsyncSession, username: str) -> models.Usuario:
+        """
+        Obtém um registo de utilizador pelo seu nome de utilizador (username).
+        :return: O objeto ORM do utilizador ou None se não for encontrado.
+        """
+        return await db.scalar(select(models.Usuario).where(models.Usuario.username == username))
+
+    async def create(self, db: AsyncSession, user: usuario_schema.UsuarioCreate, hashed_password: str) -> models.Usuario:
+        """
+        Cria um novo registo de utilizador na base de dados.
+        :param hashed_password: A representação da senha do utilizador após passar pelo algoritmo de hashing.
+        :return: O objeto ORM do utilizador recém-criado.
+        """
+        db_user = models.Usuario(username=user.username, hashed_password=hashed_password)
+        db.add(db_user)
+        invalidation_bus.publicar(db.sync_session, CANAL_USUARIO, db_user.username)
+        await db.commit()
+        await db.refresh(db_user)
+        self.invalidate_cache(db_user.username)
+        return db_user
+
+    def invalidate_cache(self, username: str) -> None:
+        """Remove um utilizador da cache de autenticação (ver UsuarioRepository.invalidate_cache)."""
+        user_cache.invalidate(username)
@@ -1,10 +1,87 @@
 # Importa o objeto Session do SQLAlchemy para tipagem e o motor de ORM.
 from sqlalchemy.orm import Session
+# Importa 'tuple_' para comparar a chave composta da paginação por cursor numa única expressão.
+from sqlalchemy import cast, delete, func, insert, literal, null, or_, select, text, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError
 # Importa os módulos internos: 'models' para os ORMs e 'empresa_schema' para os modelos Pydantic.
 from app.db import models 
 from app.schemas import empresa as empresa_schema 
+from app.core.pagination import ORDENACOES
+from app.core.cache import facet_cache
+from app.core.invalidation import CANAL_FACETAS, invalidation_bus
+from app.core.config import settings
+from app.db.database import new_session
+from app.db.group_commit import GroupCommit
 # Importa tipos do Python para type hinting, melhorando a legibilidade e a verificação estática.
-from typing import Optional, List
+from typing import Any, Dict, Iterator, Optional, List, Sequence, Set, Tuple
+from sqlalchemy.engine import Row
+
+# Colunas devolvidas pela API (as do schema de resposta, pela mesma ordem), mais a versão,
+# usada para os ETags. É a seleção padrão das consultas de leitura que devolvem linhas.
+COLUNAS_LEITURA: Tuple[str, ...] = (*empresa_schema.Empresa.model_fields, "versao")
+
+# Colunas pelas quais GET /empresas/stats agrupa as contagens (ambas indexadas).
+FACETAS: Tuple[str, ...] = ("cidade", "ramo_atuacao")
+
+
+def expr_seq(dialeto: str):
+    """
+    Expressão SQL do 'seq' de uma escrita, avaliada pela própria instrução INSERT/UPDATE: não
+    custa uma ida extra à base de dados nem bloqueia uma linha partilhada até ao commit, pelo
+    que as escritas concorrentes (incluindo as importações em massa) não esperam umas pelas outras.
+    Partilhada pelos repositórios síncrono e assíncrono.
+
+    - PostgreSQL: o ID da transação (txid_current(), de 64 bits e sempre crescente). As
+      transações não terminam pela ordem dos seus IDs; o feed só devolve os 'seq' abaixo do
+      horizonte de visibilidade (ver expr_horizonte_seq), a partir do qual já não há escritas
+      por confirmar.
+    - Restantes (SQLite): o maior 'seq' já atribuído, mais um. As escritas em SQLite são
+      serializadas pelo lock da base de dados, pelo que os valores são atribuídos e ficam
+      visíveis pela mesma ordem.
+
+    :param dialeto: O nome do dialeto da base de dados (ex: "postgresql").
+    """
+    if dialeto == "postgresql":
+        return func.txid_current()
+    maximos = union_all(
+        select(func.max(models.Empresa.seq).label("seq")),
+        select(func.max(models.EmpresaRemovida.seq).label("seq")),
+    ).subquery()
+    return func.coalesce(select(func.max(maximos.c.seq)).scalar_subquery(), 0) + 1
+
+
+def expr_horizonte_seq(dialeto: str):
+    """
+    Expressão SQL do limite (exclusivo) dos 'seq' que o feed de alterações pode devolver: o
+    ID da transação mais antiga ainda em curso (PostgreSQL). Todas as escritas com um 'seq'
+    inferior já terminaram, e nenhuma escrita futura terá um 'seq' inferior, pelo que o
+    token do feed nunca ultrapassa uma alteração que ainda não estava visível.
+    Uma transação longa atrasa o feed (mas nunca o faz saltar alterações).
+
+    :return: A expressão, ou None se não for necessário (SQLite: ver expr_seq).
+    """
+    if dialeto == "postgresql":
+        return func.txid_snapshot_xmin(func.txid_current_snapshot())
+    return None
+
+
+def aplicar_filtros(query, filtros: dict):
+    """
+    Aplica a uma consulta os filtros dinâmicos partilhados pelas listagens de empresas.
+    Funciona tanto com db.query(...) como com select(...), pelo que é usada também pelo repositório assíncrono.
+    :param query: A consulta SQLAlchemy a filtrar.
+    :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+    :return: A consulta com os filtros aplicados.
+    """
+    # Aplica filtros dinamicamente se eles forem fornecidos.
+    # .ilike() realiza uma correspondência de string insensível a maiúsculas/minúsculas.
+    if filtros.get("cidade"):
+        query = query.filter(models.Empresa.cidade.ilike(f"%{filtros['cidade']}%"))
+    if filtros.get("ramo_atuacao"):
+        query = query.filter(models.Empresa.ramo_atuacao.ilike(f"%{filtros['ramo_atuacao']}%"))
+    if filtros.get("nome"):
+        query = query.filter(models.Empresa.nome.ilike(f"%{filtros['nome']}%"))
+    return query
 
 
 class EmpresaRepository:
@@ -16,18 +93,74 @@ class EmpresaRepository:
 
     def create(self, db: Session, empresa: empresa_schema.EmpresaCreate) -> models.Empresa:
         """
-        Cria um novo registo de empresa na base de dados.
+        Cria um novo registo de empresa na base de dados com um único INSERT ... RETURNING
+        (agrupado com os de outros pedidos simultâneos, se EMPRESA_GROUP_COMMIT estiver ativo).
+        As restrições UNIQUE da tabela garantem a unicidade do CNPJ e do e-mail: em caso de
+        duplicado é levantada uma IntegrityError, que a camada de serviço converte em erro HTTP.
         :param db: A sessão da base de dados.
         :param empresa: Um objeto Pydantic EmpresaCreate com os dados da nova empresa.
         :return: O objeto ORM da empresa recém-criada.
+        :raises IntegrityError: Se o CNPJ ou o e-mail já estiverem registados.
         """
-        # Desempacota o dicionário do modelo Pydantic para criar uma instância do modelo ORM.
-        db_empresa = models.Empresa(**empresa.dict())
-        db.add(db_empresa)  # Adiciona o novo objeto à sessão.
-        db.commit()         # Persiste a transação na base de dados.
-        db.refresh(db_empresa) # Atualiza o objeto com os dados da BD (ex: ID gerado).
+        if settings.EMPRESA_GROUP_COMMIT:
+            # O INSERT é agrupado com os de outros pedidos simultâneos, numa transação própria.
+            db_empresa = empresa_group_commit.submit(empresa.dict())
+        else:
+            valores = {**empresa.dict(), "seq": self._seq(db)}
+            stmt = insert(models.Empresa).values(**valores).returning(models.Empresa)
+            # O RETURNING devolve logo os valores gerados pela BD (ID, data_cadastro, versao),
+            # dispensando o db.refresh() que faria uma nova consulta.
+            db_empresa = db.scalars(stmt).one()
+            invalidation_bus.publicar(db, CANAL_FACETAS)
+            self._commit_detached(db, db_empresa)
+        # Atualiza as contagens por faceta em memória, sem voltar a contar a tabela.
+        facet_cache.ajustar({faceta: getattr(db_empresa, faceta) for faceta in FACETAS}, 1)
         return db_empresa
 
+    def insert_batch(self, db: Session, lista_valores: List[dict]) -> List[Any]:
+        """
+        Insere várias empresas numa única transação (usado pelo group commit de create).
+        Tenta primeiro um único INSERT de várias linhas com RETURNING. Se alguma linha violar
+        uma restrição UNIQUE, repete o lote linha a linha, cada uma num SAVEPOINT, para que só
+        as linhas em conflito falhem; as restantes são gravadas no mesmo commit.
+
+        :param db: A sessão da base de dados.
+        :param lista_valores: Os valores de cada empresa (EmpresaCreate.dict()).
+        :return: Para cada empresa, pela mesma ordem, o objeto ORM criado ou a IntegrityError.
+        """
+        try:
+            stmt = insert(models.Empresa).values(seq=self._seq(db)).returning(models.Empresa, sort_by_parameter_order=True)
+            resultados = list(db.scalars(stmt, lista_valores).all())
+        except IntegrityError:
+            db.rollback()
+            resultados = []
+            for valores in lista_valores:
+                try:
+                    with db.begin_nested():
+                        stmt = insert(models.Empresa).values(**valores, seq=self._seq(db)).returning(models.Empresa)
+                        resultados.append(db.scalars(stmt).one())
+                except IntegrityError as exc:
+                    resultados.append(exc)
+        for resultado in resultados:
+            if isinstance(resultado, models.Empresa):
+                db.expunge(resultado)
+        invalidation_bus.publicar(db, CANAL_FACETAS)
+        db.commit()
+        return resultados
+
+    def _seq(self, db: Session):
+        """A expressão do 'seq' das escritas (ver expr_seq), para a base de dados da sessão."""
+        return expr_seq(db.get_bind().dialect.name)
+
+    def _commit_detached(self, db: Session, db_empresa: models.Empresa) -> None:
+        """
+        Faz o commit da transação mantendo os atributos já carregados do objeto.
+        Sem o expunge, o commit expiraria o objeto e a serialização da resposta
+        faria uma nova consulta para o recarregar.
+        """
+        db.expunge(db_empresa)
+        db.commit()
+
     def get_by_id(self, db: Session, empresa_id: int) -> Optional[models.Empresa]:
         """
         Obtém um registo de empresa pelo seu ID.
@@ -37,6 +170,17 @@ class EmpresaRepository:
         """
         return db.query(models.Empresa).filter(models.Empresa.id == empresa_id).first()
 
+    def get_row_by_id(self, db: Session, empresa_id: int, colunas: Sequence[str] = COLUNAS_LEITURA) -> Optional[Row]:
+        """
+        Obtém apenas as colunas indicadas de uma empresa, como uma linha (sem objeto ORM).
+        :param db: A sessão da base de dados.
+        :param empresa_id: O ID da empresa a ser procurada.
+        :param colunas: Os nomes das colunas de models.Empresa a selecionar, pela ordem desejada.
+        :return: A linha com os valores das colunas, ou None se a empresa não for encontrada.
+        """
+        stmt = select(*(getattr(models.Empresa, nome) for nome in colunas)).where(models.Empresa.id == empresa_id)
+        return db.execute(stmt).first()
+
     def get_by_cnpj(self, db: Session, cnpj: str) -> Optional[models.Empresa]:
         """Obtém um registo de empresa pelo seu CNPJ."""
         return db.query(models.Empresa).filter(models.Empresa.cnpj == cnpj).first()
@@ -45,55 +189,318 @@ class EmpresaRepository:
         """Obtém um registo de empresa pelo seu email de contacto."""
         return db.query(models.Empresa).filter(models.Empresa.email_contato == email).first()
 
-    def get_all(self, db: Session, skip: int, limit: int, filtros: dict) -> List[models.Empresa]:
+    def get_conflicts(self, db: Session, cnpjs: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        Verifica, numa única consulta, quais dos CNPJs e e-mails indicados já estão registados.
+        Usado pela importação em massa para validar um lote inteiro de uma só vez.
+        :param db: A sessão da base de dados.
+        :param cnpjs: Os CNPJs a verificar.
+        :param emails: Os e-mails de contacto a verificar.
+        :return: Um tuplo (CNPJs existentes, e-mails existentes).
+        """
+        if not cnpjs and not emails:
+            return set(), set()
+        stmt = select(models.Empresa.cnpj, models.Empresa.email_contato).where(
+            or_(models.Empresa.cnpj.in_(cnpjs), models.Empresa.email_contato.in_(emails))
+        )
+        cnpjs_existentes, emails_existentes = set(), set()
+        for cnpj, email in db.execute(stmt):
+            cnpjs_existentes.add(cnpj)
+            emails_existentes.add(email)
+        return cnpjs_existentes, emails_existentes
+
+    def bulk_create(self, db: Session, empresas: List[dict]) -> int:
+        """
+        Insere várias empresas com um único INSERT de múltiplas linhas (sem commit).
+        O commit fica a cargo de quem chama, para que cada lote seja uma transação.
+        :param db: A sessão da base de dados.
+        :param empresas: Os dados das empresas, já validados (ex: EmpresaCreate.dict()).
+        :return: O número de empresas inseridas.
+        """
+        if not empresas:
+            return 0
+        db.execute(insert(models.Empresa).values(seq=self._seq(db)), empresas)
+        invalidation_bus.publicar(db, CANAL_FACETAS)
+        return len(empresas)
+
+    def get_all(self, db: Session, skip: int, limit: int, filtros: dict, ordenar_por: str = "id",
+                colunas: Sequence[str] = COLUNAS_LEITURA) -> Sequence[Row]:
         """
         Obtém uma lista de empresas, com suporte a paginação e filtros dinâmicos.
+        Seleciona apenas as colunas indicadas e devolve linhas em vez de objetos ORM,
+        evitando o custo de construir e acompanhar um objeto por registo.
         :param db: A sessão da base de dados.
         :param skip: Número de registos a saltar (offset).
         :param limit: Número máximo de registos a retornar.
         :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
-        :return: Uma lista de objetos ORM de empresas.
-        """
-        query = db.query(models.Empresa)
-        # Aplica filtros dinamicamente se eles forem fornecidos.
-        # .ilike() realiza uma correspondência de string insensível a maiúsculas/minúsculas.
-        if filtros.get("cidade"):
-            query = query.filter(models.Empresa.cidade.ilike(f"%{filtros['cidade']}%"))
-        if filtros.get("ramo_atuacao"):
-            query = query.filter(models.Empresa.ramo_atuacao.ilike(f"%{filtros['ramo_atuacao']}%"))
-        if filtros.get("nome"):
-            query = query.filter(models.Empresa.nome.ilike(f"%{filtros['nome']}%"))
+        :param ordenar_por: A ordenação a usar (uma das chaves de ORDENACOES).
+        :param colunas: Os nomes das colunas de models.Empresa a selecionar, pela ordem desejada.
+        :return: Uma lista de linhas com os valores das colunas (acessíveis também por nome, ex: linha.id).
+        """
+        stmt = aplicar_filtros(select(*(getattr(models.Empresa, nome) for nome in colunas)), filtros)
+        # Uma ordem total torna as páginas determinísticas e permite continuar por cursor.
+        ordem = [getattr(models.Empresa, nome) for nome in ORDENACOES[ordenar_por]]
         # Aplica a paginação e executa a consulta.
-        return query.offset(skip).limit(limit).all()
+        return db.execute(stmt.order_by(*ordem).offset(skip).limit(limit)).all()
 
-    def update(self, db: Session, empresa_id: int, update_data: empresa_schema.EmpresaUpdate) -> Optional[models.Empresa]:
+    def get_after(self, db: Session, chave: list, limit: int, filtros: dict, ordenar_por: str = "id",
+                  colunas: Sequence[str] = COLUNAS_LEITURA) -> Sequence[Row]:
         """
-        Atualiza os dados de um registo de empresa existente.
+        Obtém a página de empresas que se segue a uma chave de ordenação (paginação por cursor).
+        Ao contrário de get_all, não usa OFFSET: a condição "chave > última chave" é resolvida
+        pelo índice, pelo que o custo de cada página não depende da sua profundidade.
+        :param db: A sessão da base de dados.
+        :param chave: Os valores das colunas de ordenação do último registo da página anterior.
+        :param limit: Número máximo de registos a retornar.
+        :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+        :param ordenar_por: A ordenação a usar (uma das chaves de ORDENACOES).
+        :param colunas: Os nomes das colunas de models.Empresa a selecionar, pela ordem desejada.
+        :return: Uma lista de linhas com os valores das colunas.
+        """
+        stmt = aplicar_filtros(select(*(getattr(models.Empresa, nome) for nome in colunas)), filtros)
+        ordem = [getattr(models.Empresa, nome) for nome in ORDENACOES[ordenar_por]]
+        # Comparação de tuplos (row values): (nome, id) > (:nome, :id).
+        stmt = stmt.where(tuple_(*ordem) > tuple_(*chave))
+        return db.execute(stmt.order_by(*ordem).limit(limit)).all()
+
+    def stream_all(self, db: Session, colunas: Sequence[str], filtros: dict, batch_size: int) -> Iterator[Sequence[tuple]]:
+        """
+        Percorre todas as empresas que satisfazem os filtros, lote a lote, através de um cursor
+        do lado do servidor (yield_per ativa stream_results). Ao contrário de get_all, nunca
+        carrega o resultado completo em memória nem constrói objetos ORM.
+        :param db: A sessão da base de dados (deve permanecer aberta enquanto o iterador é consumido).
+        :param colunas: Os nomes das colunas de models.Empresa a selecionar, pela ordem desejada.
+        :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+        :param batch_size: Número de linhas obtidas da base de dados de cada vez.
+        :return: Um iterador de lotes de tuplos, com os valores pela ordem de 'colunas'.
+        """
+        stmt = aplicar_filtros(select(*(getattr(models.Empresa, nome) for nome in colunas)), filtros)
+        stmt = stmt.order_by(models.Empresa.id).execution_options(yield_per=batch_size)
+        yield from db.execute(stmt).partitions()
+
+    def update(self, db: Session, empresa_id: int, update_data: empresa_schema.EmpresaUpdate, versao_esperada: Optional[int] = None) -> Optional[models.Empresa]:
+        """
+        Atualiza os dados de um registo de empresa existente e incrementa a sua versão,
+        com um único UPDATE ... RETURNING (sem ler o registo antes).
         :param db: A sessão da base de dados.
         :param empresa_id: O ID da empresa a ser atualizada.
         :param update_data: Um objeto Pydantic EmpresaUpdate com os novos dados.
-        :return: O objeto ORM da empresa atualizada ou None se não for encontrada.
-        """
-        db_empresa = self.get_by_id(db, empresa_id)
-        if db_empresa:
-            # Itera sobre os dados fornecidos e atualiza os atributos do objeto ORM.
-            # exclude_unset=True garante que apenas os campos explicitamente enviados sejam atualizados.
-            for key, value in update_data.dict(exclude_unset=True).items():
-                setattr(db_empresa, key, value)
-            db.commit()
-            db.refresh(db_empresa)
+        :param versao_esperada: Se indicada, só atualiza se a versão atual for esta (If-Match).
+        :return: O objeto ORM da empresa atualizada ou None se não for encontrada
+                 (ou se a versão não corresponder à esperada).
+        :raises IntegrityError: Se o novo e-mail já pertencer a outra empresa.
+        """
+        # exclude_unset=True garante que apenas os campos explicitamente enviados sejam atualizados.
+        valores = update_data.dict(exclude_unset=True)
+        if not valores:
+            # Nada a alterar: a versão mantém-se e devolve-se o registo atual.
+            db_empresa = self.get_by_id(db, empresa_id)
+            if db_empresa is not None and versao_esperada is not None and db_empresa.versao != versao_esperada:
+                return None
+            return db_empresa
+
+        # O incremento é feito pela própria instrução UPDATE, pelo que é atómico mesmo com escritas concorrentes.
+        valores["versao"] = models.Empresa.versao + 1
+        valores.update(seq=self._seq(db), atualizado_em=func.now())
+        stmt = update(models.Empresa).where(models.Empresa.id == empresa_id)
+        if versao_esperada is not None:
+            # Controlo de concorrência otimista: a condição sobre a versão é verificada no próprio UPDATE.
+            stmt = stmt.where(models.Empresa.versao == versao_esperada)
+        stmt = stmt.values(**valores).returning(models.Empresa)
+        db_empresa = db.scalars(stmt).one_or_none()
+        if db_empresa is None:
+            db.rollback()
+            return None
+        if any(faceta in valores for faceta in FACETAS):
+            invalidation_bus.publicar(db, CANAL_FACETAS)
+        self._commit_detached(db, db_empresa)
+        if any(faceta in valores for faceta in FACETAS):
+            # Os valores anteriores não são conhecidos: as contagens são recarregadas no próximo pedido.
+            facet_cache.invalidate()
         return db_empresa
 
-    def delete(self, db: Session, empresa_id: int) -> bool:
+    def delete(self, db: Session, empresa_id: int, versao_esperada: Optional[int] = None) -> bool:
         """
         Apaga um registo de empresa da base de dados.
         :param db: A sessão da base de dados.
         :param empresa_id: O ID da empresa a ser apagada.
+        :param versao_esperada: Se indicada, só apaga se a versão atual for esta (If-Match).
         :return: True se a empresa foi apagada com sucesso, False caso contrário.
         """
-        db_empresa = self.get_by_id(db, empresa_id)
-        if db_empresa:
-            db.delete(db_empresa)
-            db.commit()
-            return True
-        return False
+        # Um único DELETE, sem SELECT prévio: a linha devolvida indica se a empresa existia
+        # e traz os valores das facetas, para atualizar as contagens em memória.
+        stmt = delete(models.Empresa).where(models.Empresa.id == empresa_id)
+        if versao_esperada is not None:
+            stmt = stmt.where(models.Empresa.versao == versao_esperada)
+        apagada = db.execute(stmt.returning(*(getattr(models.Empresa, faceta) for faceta in FACETAS))).first()
+        if apagada is None:
+            db.rollback()
+            return False
+        # Tombstone para o feed de alterações, na mesma transação.
+        self._registar_remocoes(db, [empresa_id])
+        invalidation_bus.publicar(db, CANAL_FACETAS)
+        db.commit()
+        facet_cache.ajustar(apagada._asdict(), -1)
+        return True
+
+    def _aplicar_selecao(self, stmt, ids: Optional[List[int]], filtros: dict):
+        """Restringe uma instrução UPDATE/DELETE às empresas com os IDs indicados e/ou que satisfazem os filtros."""
+        if ids:
+            stmt = stmt.where(models.Empresa.id.in_(ids))
+        return aplicar_filtros(stmt, filtros)
+
+    def bulk_update(self, db: Session, ids: Optional[List[int]], filtros: dict, update_data: empresa_schema.EmpresaUpdate) -> int:
+        """
+        Atualiza todas as empresas selecionadas com um único UPDATE ... WHERE, numa transação,
+        incrementando a versão de cada uma.
+        :param db: A sessão da base de dados.
+        :param ids: Os IDs das empresas a atualizar (ou None).
+        :param filtros: Os filtros da listagem (cidade, ramo, nome) que as empresas têm de satisfazer.
+        :param update_data: Um objeto Pydantic EmpresaUpdate com os campos a alterar.
+        :return: O número de empresas atualizadas.
+        :raises IntegrityError: Se o novo e-mail já pertencer a outra empresa (ou for aplicado a várias).
+        """
+        valores = update_data.dict(exclude_unset=True)
+        valores["versao"] = models.Empresa.versao + 1
+        # Todas as empresas alteradas pela instrução partilham o mesmo 'seq'.
+        valores.update(seq=self._seq(db), atualizado_em=func.now())
+        stmt = self._aplicar_selecao(update(models.Empresa), ids, filtros).values(**valores)
+        # Nenhum objeto da sessão precisa de ser sincronizado: evita a avaliação dos filtros em Python.
+        atualizadas = db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+        if atualizadas and any(faceta in valores for faceta in FACETAS):
+            invalidation_bus.publicar(db, CANAL_FACETAS)
+        db.commit()
+        if atualizadas and any(faceta in valores for faceta in FACETAS):
+            facet_cache.invalidate()
+        return atualizadas
+
+    def bulk_delete(self, db: Session, ids: Optional[List[int]], filtros: dict) -> int:
+        """
+        Apaga todas as empresas selecionadas com um único DELETE ... WHERE, numa transação.
+        :param db: A sessão da base de dados.
+        :param ids: Os IDs das empresas a apagar (ou None).
+        :param filtros: Os filtros da listagem (cidade, ramo, nome) que as empresas têm de satisfazer.
+        :return: O número de empresas apagadas.
+        """
+        stmt = self._aplicar_selecao(delete(models.Empresa), ids, filtros).returning(models.Empresa.id)
+        ids_apagados = db.scalars(stmt, execution_options={"synchronize_session": False}).all()
+        # Os IDs devolvidos pelo DELETE dão origem aos tombstones do feed de alterações.
+        self._registar_remocoes(db, ids_apagados)
+        if ids_apagados:
+            invalidation_bus.publicar(db, CANAL_FACETAS)
+        db.commit()
+        apagadas = len(ids_apagados)
+        if apagadas:
+            # Recarregar as contagens uma vez é mais barato do que devolver as facetas de cada linha apagada.
+            facet_cache.invalidate()
+        return apagadas
+
+    def _registar_remocoes(self, db: Session, ids: Sequence[int]) -> None:
+        """Regista os tombstones das empresas apagadas (sem commit)."""
+        if ids:
+            stmt = insert(models.EmpresaRemovida).values(seq=self._seq(db))
+            db.execute(stmt, [{"empresa_id": empresa_id} for empresa_id in ids])
+
+    def get_changes(self, db: Session, desde: Tuple[int, int], limit: int,
+                    colunas: Sequence[str] = COLUNAS_LEITURA) -> List[Tuple[int, int, Optional[Row]]]:
+        """
+        Obtém as alterações de empresas posteriores a um ponto do feed, pela ordem (seq, id).
+        As empresas criadas/atualizadas e os tombstones das apagadas são lidos numa única
+        instrução (UNION ALL), para que ambos venham do mesmo snapshot: com duas consultas,
+        uma alteração confirmada entre elas podia ficar antes do token devolvido sem ter sido
+        lida. Cada ramo usa o índice (seq, id) da sua tabela, com o seu próprio LIMIT, pelo
+        que o custo é proporcional ao número de alterações. Em PostgreSQL, só são lidas as
+        alterações abaixo do horizonte de visibilidade (ver expr_horizonte_seq).
+
+        :param db: A sessão da base de dados.
+        :param desde: O par (seq, id) da última alteração já recebida ((0, 0) para começar do início).
+        :param limit: Número máximo de alterações.
+        :param colunas: As colunas das empresas a devolver (têm de incluir 'id').
+        :return: Tuplos (seq, id, linha), em que a linha é None para uma empresa apagada.
+        """
+        empresa, removida = models.Empresa, models.EmpresaRemovida
+        horizonte = expr_horizonte_seq(db.get_bind().dialect.name)
+        vivas = (
+            select(*(getattr(empresa, nome) for nome in colunas), empresa.seq, literal(False).label("apagada"))
+            .where(tuple_(empresa.seq, empresa.id) > tuple_(*desde))
+            .order_by(empresa.seq, empresa.id)
+            .limit(limit)
+        )
+        # Os tombstones têm as mesmas colunas, a NULL (com o tipo da coluna, exigido pelo UNION
+        # em PostgreSQL), exceto o ID.
+        apagadas = (
+            select(
+                *(removida.empresa_id.label(nome) if nome == "id" else cast(null(), getattr(empresa, nome).type).label(nome)
+                  for nome in colunas),
+                removida.seq,
+                literal(True).label("apagada"),
+            )
+            .where(tuple_(removida.seq, removida.empresa_id) > tuple_(*desde))
+            .order_by(removida.seq, removida.empresa_id)
+            .limit(limit)
+        )
+        if horizonte is not None:
+            vivas = vivas.where(empresa.seq < horizonte)
+            apagadas = apagadas.where(removida.seq < horizonte)
+        alteracoes = union_all(select(vivas.subquery()), select(apagadas.subquery())).subquery()
+        linhas = db.execute(
+            select(alteracoes).order_by(alteracoes.c.seq, alteracoes.c.id).limit(limit)
+        ).all()
+        return [(linha.seq, linha.id, None if linha.apagada else linha) for linha in linhas]
+
+    def count(self, db: Session, filtros: dict) -> int:
+        """
+        Conta as empresas que satisfazem os filtros (os mesmos de get_all), com COUNT(*).
+        :param db: A sessão da base de dados.
+        :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+        :return: O número exato de empresas.
+        """
+        stmt = aplicar_filtros(select(func.count()).select_from(models.Empresa), filtros)
+        return db.scalar(stmt)
+
+    def estimate_count(self, db: Session) -> Optional[int]:
+        """
+        Estimativa do número total de empresas mantida pelo PostgreSQL (pg_class.reltuples,
+        atualizada pelo VACUUM/ANALYZE), obtida sem percorrer a tabela.
+        :param db: A sessão da base de dados.
+        :return: A estimativa, ou None se não estiver disponível (outra base de dados ou tabela nunca analisada).
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return None
+        estimativa = db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:tabela AS regclass)"),
+            {"tabela": models.Empresa.__tablename__},
+        )
+        return estimativa if estimativa is not None and estimativa >= 0 else None
+
+    def count_by_facets(self, db: Session, filtros: dict) -> Dict[str, Dict[Any, int]]:
+        """
+        Conta as empresas agrupadas por cada faceta (cidade e ramo de atuação), com um
+        GROUP BY por faceta sobre as colunas indexadas.
+        :param db: A sessão da base de dados.
+        :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+        :return: Um dicionário {faceta: {valor: número de empresas}}.
+        """
+        contagens = {}
+        for faceta in FACETAS:
+            coluna = getattr(models.Empresa, faceta)
+            stmt = aplicar_filtros(select(coluna, func.count()), filtros).group_by(coluna)
+            contagens[faceta] = {valor: total for valor, total in db.execute(stmt)}
+        return contagens
+
+
+def _inserir_lote(lista_valores: List[dict]) -> List[Any]:
+    """Grava um lote do group commit numa sessão própria (o lote reúne pedidos de várias sessões)."""
+    db = new_session()
+    try:
+        return EmpresaRepository().insert_batch(db, lista_valores)
+    finally:
+        db.close()
+
+
+# Group commit das criações de empresas (EMPRESA_GROUP_COMMIT), partilhado pelas threads do worker.
+empresa_group_commit = GroupCommit(
+    _inserir_lote,
+    janela=settings.GROUP_COMMIT_WINDOW_MS / 1000,
+    max_linhas=settings.GROUP_COMMIT_MAX_ROWS,
+)
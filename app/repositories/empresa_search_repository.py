@@ -0,0 +1,80 @@
+# Importa o objeto Session do SQLAlchemy para tipagem e os construtores de consultas.
+import re
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, literal_column, select, text
+# Importa os módulos internos: 'models' para os ORMs e 'search' para os objetos de pesquisa.
+from app.db import models
+from app.db.search import DOC_POSTGRES, FTS_TABELA
+# Importa tipos do Python para type hinting.
+from typing import List
+
+# Divide o termo de pesquisa em palavras (letras e dígitos, incluindo caracteres acentuados).
+_PALAVRAS = re.compile(r"\w+", re.UNICODE)
+
+
+class EmpresaSearchRepository:
+    """
+    Camada de Acesso a Dados (Repository) para a pesquisa textual de empresas.
+    Usa o índice de pesquisa criado por app.db.search.install_search, escolhendo a
+    consulta adequada ao dialeto da base de dados, e devolve os resultados ordenados
+    por relevância.
+    """
+
+    def search(self, db: Session, termo: str, limit: int) -> List[models.Empresa]:
+        """
+        Pesquisa empresas por nome, cidade e ramo de atuação, ignorando maiúsculas e acentos.
+        :param db: A sessão da base de dados.
+        :param termo: O texto a pesquisar, tal como escrito pelo utilizador.
+        :param limit: Número máximo de resultados a retornar.
+        :return: Uma lista de objetos ORM de empresas, da mais para a menos relevante.
+        """
+        palavras = _PALAVRAS.findall(termo)
+        if not palavras:
+            return []
+
+        dialeto = db.get_bind().dialect.name
+        if dialeto == "postgresql":
+            return self._search_postgres(db, " ".join(palavras), limit)
+        if dialeto == "sqlite":
+            return self._search_sqlite(db, palavras, limit)
+        return self._search_ilike(db, " ".join(palavras), limit)
+
+    def _search_postgres(self, db: Session, termo: str, limit: int) -> List[models.Empresa]:
+        """Pesquisa por semelhança de trigramas, servida pelo índice GIN ix_empresas_busca_trgm."""
+        doc = literal_column(DOC_POSTGRES)
+        consulta = func.empresa_busca_norm(bindparam("termo", termo))
+        # '<%' é verdadeiro quando o termo é semelhante a alguma parte do documento
+        # (word similarity) e é acelerado pelo índice gin_trgm_ops.
+        stmt = (
+            select(models.Empresa)
+            .where(consulta.op("<%")(doc))
+            .order_by(func.word_similarity(consulta, doc).desc(), models.Empresa.id)
+            .limit(limit)
+        )
+        return db.scalars(stmt).all()
+
+    def _search_sqlite(self, db: Session, palavras: List[str], limit: int) -> List[models.Empresa]:
+        """Pesquisa na tabela FTS5, ordenada por BM25 (o nome pesa mais do que cidade e ramo)."""
+        # Cada palavra vira um prefixo entre aspas ("pal"*), o que neutraliza a sintaxe de
+        # consulta do FTS5 e permite encontrar resultados enquanto o utilizador escreve.
+        consulta = " ".join('"{}"*'.format(p.replace('"', '""')) for p in palavras)
+        stmt = text(
+            f"""
+            SELECT empresas.* FROM {FTS_TABELA}
+            JOIN empresas ON empresas.id = {FTS_TABELA}.rowid
+            WHERE {FTS_TABELA} MATCH :consulta
+            ORDER BY bm25({FTS_TABELA}, 10.0, 2.0, 2.0), empresas.id
+            LIMIT :limit
+            """
+        ).bindparams(consulta=consulta, limit=limit)
+        return db.scalars(select(models.Empresa).from_statement(stmt)).all()
+
+    def _search_ilike(self, db: Session, termo: str, limit: int) -> List[models.Empresa]:
+        """Alternativa sem índice próprio para dialetos sem suporte de pesquisa configurado."""
+        return (
+            db.query(models.Empresa)
+            .filter(models.Empresa.nome.ilike(f"%{termo}%"))
+            .order_by(models.Empresa.nome, models.Empresa.id)
+            .limit(limit)
+            .all()
+        )
@@ -0,0 +1,66 @@
+# Importa o objeto Session do SQLAlchemy para tipagem e as construções de consultas.
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import CANAL_REVOGACAO, invalidation_bus
+from app.core.revocation import chave_revogacao
+from app.db import models
+
+
+class TokenRepository:
+    """
+    Camada de Acesso a Dados (Repository) da lista de tokens revogados.
+    A tabela é apenas acrescentada (INSERT) e limpa das revogações expiradas; os pedidos
+    autenticados nunca a consultam diretamente (ver app/core/revocation.py).
+    """
+
+    def revoke(self, db: Session, jti: str, expira_em: datetime) -> bool:
+        """
+        Revoga um token ou uma sessão.
+        A restrição UNIQUE de 'jti' torna a operação atómica: se dois pedidos tentarem usar o
+        mesmo refresh token em simultâneo, apenas um deles o consegue revogar.
+
+        :param db: A sessão da base de dados.
+        :param jti: O identificador do token (claim "jti") ou da sessão (claim "fam").
+        :param expira_em: A data de expiração do token (ou da sessão).
+        :return: True se foi revogado agora, False se já estava revogado.
+        """
+        try:
+            db.execute(insert(models.TokenRevogado).values(jti=jti, expira_em=expira_em))
+            # Os outros workers passam a rejeitar o token sem esperar pela sincronização seguinte.
+            invalidation_bus.publicar(db, CANAL_REVOGACAO, chave_revogacao(jti, expira_em))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    def get_revoked_since(self, db: Session, ultimo_id: int) -> List[tuple]:
+        """
+        Obtém as revogações ainda não expiradas com ID superior a 'ultimo_id'.
+
+        :param db: A sessão da base de dados.
+        :param ultimo_id: O maior ID já lido (0 para ler todas).
+        :return: Uma lista de tuplos (id, jti, expira_em), por ordem de ID.
+        """
+        tabela = models.TokenRevogado
+        stmt = (
+            select(tabela.id, tabela.jti, tabela.expira_em)
+            .where(tabela.id > ultimo_id, tabela.expira_em > datetime.now(timezone.utc))
+            .order_by(tabela.id)
+        )
+        return [tuple(linha) for linha in db.execute(stmt)]
+
+    def delete_expired(self, db: Session) -> int:
+        """
+        Apaga as revogações de tokens que já expiraram por si (e que, por isso, já são rejeitados).
+        :return: O número de linhas apagadas.
+        """
+        tabela = models.TokenRevogado
+        resultado = db.execute(delete(tabela).where(tabela.expira_em <= datetime.now(timezone.utc)))
+        db.commit()
+        return resultado.rowcount
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 # Importa os módulos internos: 'models' para os ORMs e 'usuario_schema' para os modelos Pydantic.
 from app.db import models 
 from app.schemas import usuario as usuario_schema 
+from app.core.cache import user_cache
+from app.core.invalidation import CANAL_USUARIO, invalidation_bus
 
 class UsuarioRepository:
     """
@@ -36,6 +38,39 @@ class UsuarioRepository:
         # A senha é armazenada na sua forma hasheada para segurança.
         db_user = models.Usuario(username=user.username, hashed_password=hashed_password)
         db.add(db_user)  # Adiciona o novo objeto à sessão.
+        # Os outros workers descartam a entrada antiga com o mesmo username (ver invalidate_cache).
+        invalidation_bus.publicar(db, CANAL_USUARIO, db_user.username)
         db.commit()         # Persiste a transação na base de dados.
         db.refresh(db_user) # Atualiza o objeto com os dados da BD (ex: ID gerado).
+        # Descarta qualquer entrada antiga com o mesmo username (ex: utilizador apagado e recriado).
+        self.invalidate_cache(db_user.username)
         return db_user
+
+    def update_password_hash(self, db: Session, user_id: int, hash_atual: str, novo_hash: str) -> bool:
+        """
+        Substitui o hash da senha de um utilizador (ex: por um com o custo atual do bcrypt).
+        O UPDATE só é aplicado se o hash guardado ainda for 'hash_atual', para nunca
+        sobrepor uma alteração de senha feita entretanto.
+
+        :param db: A sessão da base de dados.
+        :param user_id: O ID do utilizador.
+        :param hash_atual: O hash lido no login.
+        :param novo_hash: O novo hash da mesma senha.
+        :return: True se o hash foi substituído.
+        """
+        alteradas = (
+            db.query(models.Usuario)
+            .filter(models.Usuario.id == user_id, models.Usuario.hashed_password == hash_atual)
+            .update({models.Usuario.hashed_password: novo_hash}, synchronize_session=False)
+        )
+        db.commit()
+        return alteradas > 0
+
+    def invalidate_cache(self, username: str) -> None:
+        """
+        Remove um utilizador da cache de autenticação usada por deps.get_current_active_user.
+        Deve ser chamado sempre que os dados de um utilizador são alterados ou apagados.
+
+        :param username: O nome de utilizador cuja entrada deve ser descartada.
+        """
+        user_cache.invalidate(username)
@@ -0,0 +1,37 @@
+# Versão do router de autenticação para a pilha assíncrona de base de dados (DB_ASYNC).
+# Expõe exatamente os mesmos endpoints e schemas que app/routers/auth.py.
+from fastapi import APIRouter, Depends, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.db.async_database import get_async_db
+from app.deps import get_client_ip, get_current_token_async
+from app.schemas import usuario as usuario_schema, token as token_schema
+from app.service.async_auth_service import AsyncAuthService
+
+router = APIRouter(tags=["Autenticação"])
+
+@router.post("/register", response_model=usuario_schema.Usuario, status_code=status.HTTP_201_CREATED)
+async def register_user(user: usuario_schema.UsuarioCreate, cliente: Optional[str] = Depends(get_client_ip), db: AsyncSession = Depends(get_async_db)):
+    """Endpoint para registar um novo utilizador administrador."""
+    service = AsyncAuthService(db)
+    return await service.register_user(user, cliente)
+
+@router.post("/login", response_model=token_schema.Token)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), cliente: Optional[str] = Depends(get_client_ip), db: AsyncSession = Depends(get_async_db)):
+    """Endpoint para autenticar um utilizador e retornar um token de acesso JWT."""
+    service = AsyncAuthService(db)
+    return await service.login_for_access_token(form_data, cliente)
+
+@router.post("/refresh", response_model=token_schema.Token)
+async def refresh_token(pedido: token_schema.RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Endpoint para obter um novo par de tokens a partir de um refresh token (com rotação)."""
+    service = AsyncAuthService(db)
+    return await service.refresh(pedido.refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token_data: token_schema.TokenData = Depends(get_current_token_async), db: AsyncSession = Depends(get_async_db)):
+    """Endpoint para terminar a sessão: revoga o token de acesso e os refresh tokens da sessão."""
+    service = AsyncAuthService(db)
+    await service.logout(token_data)
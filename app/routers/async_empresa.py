@@ -0,0 +1,128 @@
+# Versão do router de empresas para a pilha assíncrona de base de dados (DB_ASYNC).
+# Expõe os endpoints de CRUD (criação, listagem, leitura, atualização e remoção) com os mesmos
+# caminhos, parâmetros, cabeçalhos (ETag, If-None-Match, If-Match) e formatos de resposta que
+# app/routers/empresa.py, para que os dois modos possam ser comparados em testes de carga.
+# Os restantes endpoints de empresas (empresa.router_partilhado) são os mesmos nos dois modos.
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+
+from app.db.async_database import get_async_db
+from app.schemas import empresa as empresa_schema
+from app.service.async_empresa_service import AsyncEmpresaService
+from app.service.empresa_stats_service import EmpresaStatsService
+from app.repositories.async_empresa_repository import AsyncEmpresaRepository
+from app.deps import get_current_active_user_async
+from app.core.pagination import ORDENACOES
+from app.core.etag import etag_empresa, if_none_match
+from app.core.responses import FastJSONResponse, linhas_para_dicts
+from app.routers.empresa import (
+    CAMPOS_RESPOSTA,
+    _FIELDS_DESCRICAO,
+    _campos_pedidos,
+    _colunas,
+    _formato_pedido,
+    _ordem_do_cursor,
+    _resposta_lista,
+    _versao_esperada,
+)
+
+router = APIRouter(
+    prefix="/empresas",
+    tags=["Empresas"],
+    dependencies=[Depends(get_current_active_user_async)]
+)
+
+@router.post("/", response_model=empresa_schema.Empresa, status_code=status.HTTP_201_CREATED)
+async def create_empresa(empresa: empresa_schema.EmpresaCreate, db: AsyncSession = Depends(get_async_db)):
+    """Endpoint para criar uma nova empresa."""
+    service = AsyncEmpresaService(db)
+    return await service.create_empresa(empresa)
+
+@router.get("/", response_model=List[empresa_schema.Empresa])
+async def list_empresas(
+    cidade: Optional[str] = None,
+    ramo_atuacao: Optional[str] = None,
+    nome: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    ordenar_por: Literal["id", "nome"] = "id",
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRICAO),
+    contagem: Optional[Literal["exata", "aproximada"]] = Query(
+        None, description="Inclui o total de empresas (com os mesmos filtros) no cabeçalho X-Total-Count."
+    ),
+    if_none_match_header: Optional[str] = Header(None, alias="If-None-Match"),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Endpoint para listar empresas com suporte a filtros e paginação (offset ou cursor),
+    'fields', 'contagem', ETag/If-None-Match e respostas em JSON, MessagePack ou Arrow
+    (ver app/routers/empresa.py).
+    """
+    filtros = {"cidade": cidade, "ramo_atuacao": ramo_atuacao, "nome": nome}
+    campos = _campos_pedidos(fields)
+    formato = _formato_pedido(accept)
+    ordenar_por, chave = _ordem_do_cursor(cursor, ordenar_por)
+    colunas = _colunas(campos or CAMPOS_RESPOSTA, (*ORDENACOES[ordenar_por], "versao"))
+    repo = AsyncEmpresaRepository()
+    if chave is not None:
+        empresas = await repo.get_after(db, chave, limit, filtros, ordenar_por, colunas)
+    else:
+        empresas = await repo.get_all(db, skip, limit, filtros, ordenar_por, colunas)
+    total = None
+    if contagem is not None:
+        # As regras da contagem (cache, estimativas) são as de EmpresaStatsService, executado
+        # sobre a sessão síncrona da AsyncSession (as consultas continuam a usar o driver assíncrono).
+        total = await db.run_sync(lambda sessao: EmpresaStatsService(sessao).count(filtros, contagem))
+    return _resposta_lista(empresas, limit, ordenar_por, campos, formato, if_none_match_header, contagem, total)
+
+@router.get("/{empresa_id}", response_model=empresa_schema.Empresa)
+async def read_empresa(
+    empresa_id: int,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRICAO),
+    if_none_match_header: Optional[str] = Header(None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Endpoint para obter os detalhes de uma empresa específica pelo seu ID, com 'fields',
+    ETag e resposta 304 Not Modified para If-None-Match (ver app/routers/empresa.py).
+    """
+    campos = _campos_pedidos(fields)
+    repo = AsyncEmpresaRepository()
+    linha = await repo.get_row_by_id(db, empresa_id, _colunas(campos or CAMPOS_RESPOSTA, ("id", "versao")))
+    if linha is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa não encontrada.")
+    etag = etag_empresa(linha.id, linha.versao, campos)
+    if if_none_match(if_none_match_header, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return FastJSONResponse(linhas_para_dicts(campos or CAMPOS_RESPOSTA, [linha])[0], headers={"ETag": etag})
+
+@router.put("/{empresa_id}", response_model=empresa_schema.Empresa)
+async def update_empresa(
+    empresa_id: int,
+    empresa: empresa_schema.EmpresaUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, alias="If-Match"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Endpoint para atualizar os dados de uma empresa existente.
+    Com o cabeçalho If-Match, só é aplicada se a empresa não tiver sido alterada entretanto (412).
+    """
+    service = AsyncEmpresaService(db)
+    updated_empresa = await service.update_empresa(empresa_id, empresa, _versao_esperada(if_match, empresa_id))
+    response.headers["ETag"] = etag_empresa(updated_empresa.id, updated_empresa.versao)
+    return updated_empresa
+
+@router.delete("/{empresa_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_empresa(
+    empresa_id: int,
+    if_match: Optional[str] = Header(None, alias="If-Match"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Endpoint para apagar uma empresa (condicional, se for enviado o cabeçalho If-Match)."""
+    service = AsyncEmpresaService(db)
+    await service.delete_empresa(empresa_id, _versao_esperada(if_match, empresa_id))
+    return
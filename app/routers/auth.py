@@ -6,9 +6,11 @@ from fastapi import APIRouter, Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
 # Importa o objeto Session do SQLAlchemy para tipagem.
 from sqlalchemy.orm import Session
+from typing import Optional
 
 # Importa os módulos internos da aplicação.
 from app.db.database import get_db
+from app.deps import get_client_ip, get_current_token
 from app.schemas import usuario as usuario_schema, token as token_schema
 from app.service.auth_service import AuthService
 
@@ -18,7 +20,7 @@ from app.service.auth_service import AuthService
 router = APIRouter(tags=["Autenticação"])
 
 @router.post("/register", response_model=usuario_schema.Usuario, status_code=status.HTTP_201_CREATED)
-def register_user(user: usuario_schema.UsuarioCreate, db: Session = Depends(get_db)):
+async def register_user(user: usuario_schema.UsuarioCreate, cliente: Optional[str] = Depends(get_client_ip), db: Session = Depends(get_db)):
     """
     Endpoint para registar um novo utilizador administrador.
     
@@ -28,10 +30,10 @@ def register_user(user: usuario_schema.UsuarioCreate, db: Session = Depends(get_
     - Retorna os dados do utilizador criado (sem a senha) com o status 201 Created.
     """
     service = AuthService(db)
-    return service.register_user(user)
+    return await service.register_user(user, cliente)
 
 @router.post("/login", response_model=token_schema.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), cliente: Optional[str] = Depends(get_client_ip), db: Session = Depends(get_db)):
     """
     Endpoint para autenticar um utilizador e retornar um token de acesso JWT.
     
@@ -39,7 +41,27 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
       do corpo do pedido (enviado como form-data).
     - Delega a lógica de autenticação (verificação de credenciais e criação do token)
       para a camada de serviço (AuthService).
-    - Retorna um objeto Token contendo o access_token e o token_type.
+    - Retorna um objeto Token contendo o access_token, o refresh_token e o token_type.
     """
     service = AuthService(db)
-    return service.login_for_access_token(form_data)
+    return await service.login_for_access_token(form_data, cliente)
+
+@router.post("/refresh", response_model=token_schema.Token)
+async def refresh_token(pedido: token_schema.RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Endpoint para obter um novo par de tokens a partir de um refresh token.
+
+    - O refresh token usado é revogado e substituído por um novo (rotação).
+    - Reutilizar um refresh token já trocado revoga a sessão inteira (401).
+    """
+    service = AuthService(db)
+    return await service.refresh(pedido.refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token_data: token_schema.TokenData = Depends(get_current_token), db: Session = Depends(get_db)):
+    """
+    Endpoint para terminar a sessão: o token de acesso e os refresh tokens da sessão
+    deixam de ser aceites.
+    """
+    service = AuthService(db)
+    await service.logout(token_data)
@@ -1,15 +1,26 @@
 # Importações necessárias do FastAPI e do SQLAlchemy.
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 # Importações para type hinting.
-from typing import List, Optional
+from typing import List, Literal, Optional, Sequence, Tuple
 
 # Importações dos módulos internos da aplicação.
 from app.db.database import get_db 
 from app.schemas import empresa as empresa_schema, usuario as usuario_schema 
 from app.service.empresa_service import EmpresaService 
-from app.repositories.empresa_repository import EmpresaRepository 
+from app.service.empresa_import_service import EmpresaImportService, FORMATOS, iter_linhas
+from app.service.empresa_export_service import EmpresaExportService, MEDIA_TYPES
+from app.service.empresa_stats_service import EmpresaStatsService
+from app.service.empresa_changes_service import EmpresaChangesService, decode_token, stream_changes
+from app.repositories.empresa_repository import EmpresaRepository, COLUNAS_LEITURA
+from app.repositories.empresa_search_repository import EmpresaSearchRepository
 from app.deps import get_current_active_user 
+from app.core.pagination import ORDENACOES, encode_cursor, decode_cursor
+from app.core.etag import etag_empresa, etag_lista, if_none_match, versao_de_if_match
+from app.core.responses import FastJSONResponse, linhas_para_dicts
+from app.core import binary_formats
+from app.db import models
 
 # Cria uma instância de APIRouter para agrupar os endpoints de gestão de empresas.
 router = APIRouter(
@@ -23,12 +34,135 @@ router = APIRouter(
     dependencies=[Depends(get_current_active_user)]
 )
 
+# Router com os endpoints de empresas que não têm versão assíncrona (importação e operações em
+# massa, exportação, pesquisa, estatísticas e feed de alterações). É incluído nos dois modos
+# (com e sem DB_ASYNC) e antes do router de CRUD, cujas rotas "/{empresa_id}" captariam os
+# caminhos fixos como "/stats" ou "/changes" (ver app/main.py).
+router_partilhado = APIRouter(
+    prefix="/empresas",
+    tags=["Empresas"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+# Campos das respostas de leitura, pela ordem do schema Empresa. As consultas selecionam
+# COLUNAS_LEITURA (estes campos seguidos de 'versao', que só é usada para o ETag).
+CAMPOS_RESPOSTA = COLUNAS_LEITURA[:-1]
+
+# Descrição do parâmetro 'fields' (respostas parciais) na documentação.
+_FIELDS_DESCRICAO = (
+    "Campos a devolver, separados por vírgulas (ex: id,nome,cnpj). "
+    f"Valores aceites: {', '.join(CAMPOS_RESPOSTA)}. Por omissão, são devolvidos todos."
+)
+
+def _campos_pedidos(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Valida o parâmetro 'fields' e devolve os campos pedidos, pela ordem do schema Empresa
+    (assim, 'nome,id' e 'id,nome' são a mesma representação, com o mesmo ETag).
+    :return: Os campos pedidos, ou None para a representação completa.
+    :raises HTTPException: 400 se 'fields' estiver vazio ou contiver campos desconhecidos.
+    """
+    if fields is None:
+        return None
+    pedidos = {campo.strip() for campo in fields.split(",") if campo.strip()}
+    desconhecidos = pedidos - set(CAMPOS_RESPOSTA)
+    if not pedidos or desconhecidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos inválidos em 'fields': {', '.join(sorted(desconhecidos)) or '(vazio)'}. "
+                   f"Valores aceites: {', '.join(CAMPOS_RESPOSTA)}.",
+        )
+    campos = tuple(campo for campo in CAMPOS_RESPOSTA if campo in pedidos)
+    return None if campos == CAMPOS_RESPOSTA else campos
+
+def _colunas(campos: Sequence[str], extras: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Colunas a selecionar: os campos da resposta seguidos das colunas que o endpoint precisa
+    mas que o cliente não pediu (ex: 'versao' para o ETag, a chave do cursor). Por estarem no
+    fim, estas últimas são descartadas por linhas_para_dicts.
+    """
+    return (*campos, *(coluna for coluna in extras if coluna not in campos))
+
+def _formato_pedido(accept: Optional[str]) -> str:
+    """
+    Escolhe o formato da resposta (JSON, MessagePack ou Arrow) a partir do cabeçalho Accept.
+    :raises HTTPException: 406 se o formato pedido não estiver disponível neste servidor.
+    """
+    formato = binary_formats.negociar_formato(accept)
+    _verificar_formato(formato)
+    return formato
+
+def _verificar_formato(formato: str) -> None:
+    """:raises HTTPException: 406 se a biblioteca do formato não estiver instalada."""
+    try:
+        binary_formats.verificar_disponivel(formato)
+    except binary_formats.FormatoIndisponivel as exc:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=str(exc))
+
 @router.post("/", response_model=empresa_schema.Empresa, status_code=status.HTTP_201_CREATED)
 def create_empresa(empresa: empresa_schema.EmpresaCreate, db: Session = Depends(get_db)):
     """Endpoint para criar uma nova empresa."""
     service = EmpresaService(db)
     return service.create_empresa(empresa)
 
+@router_partilhado.post("/bulk", response_model=empresa_schema.EmpresaImportResultado)
+async def import_empresas(request: Request, db: Session = Depends(get_db)):
+    """
+    Endpoint para importar empresas em massa a partir de um ficheiro CSV ou NDJSON.
+
+    - O formato é indicado pelo cabeçalho Content-Type: 'text/csv' (primeira linha com os
+      nomes dos campos) ou 'application/x-ndjson' (um objeto JSON por linha).
+    - O corpo é lido em streaming e processado em lotes, pelo que o consumo de memória
+      não depende do tamanho do ficheiro.
+    - As linhas válidas são inseridas; as restantes são listadas no relatório com o motivo.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    formato = FORMATOS.get(content_type)
+    if formato is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Formato não suportado. Use 'text/csv' ou 'application/x-ndjson'.",
+        )
+    service = EmpresaImportService(db)
+    return await service.importar(iter_linhas(request.stream()), formato)
+
+# A seleção usa os mesmos filtros da listagem, além de uma lista opcional de IDs (?ids=1&ids=2).
+_IDS_DESCRICAO = "IDs das empresas (ex: ?ids=1&ids=2). Pode ser combinado com os filtros."
+
+@router_partilhado.patch("/bulk", response_model=empresa_schema.EmpresaBulkResultado)
+def bulk_update_empresas(
+    empresa: empresa_schema.EmpresaUpdate,
+    ids: Optional[List[int]] = Query(None, max_length=1000, description=_IDS_DESCRICAO),
+    cidade: Optional[str] = None,
+    ramo_atuacao: Optional[str] = None,
+    nome: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint para atualizar várias empresas de uma só vez, selecionadas por IDs e/ou pelos
+    filtros da listagem. É executado como um único UPDATE, numa transação.
+    É obrigatório indicar pelo menos um ID ou um filtro.
+    """
+    filtros = {"cidade": cidade, "ramo_atuacao": ramo_atuacao, "nome": nome}
+    service = EmpresaService(db)
+    return {"afetadas": service.bulk_update_empresas(ids, filtros, empresa)}
+
+@router_partilhado.delete("/bulk", response_model=empresa_schema.EmpresaBulkResultado)
+def bulk_delete_empresas(
+    ids: Optional[List[int]] = Query(None, max_length=1000, description=_IDS_DESCRICAO),
+    cidade: Optional[str] = None,
+    ramo_atuacao: Optional[str] = None,
+    nome: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint para apagar várias empresas de uma só vez, selecionadas por IDs e/ou pelos
+    filtros da listagem. É executado como um único DELETE, numa transação.
+    É obrigatório indicar pelo menos um ID ou um filtro.
+    """
+    filtros = {"cidade": cidade, "ramo_atuacao": ramo_atuacao, "nome": nome}
+    service = EmpresaService(db)
+    return {"afetadas": service.bulk_delete_empresas(ids, filtros)}
+
 @router.get("/", response_model=List[empresa_schema.Empresa])
 def list_empresas(
     # Parâmetros de consulta (query parameters) para filtragem, todos opcionais.
@@ -38,38 +172,240 @@ def list_empresas(
     # Parâmetros de consulta para paginação.
     skip: int = 0, 
     limit: int = 100, 
+    # Paginação por cursor: 'cursor' é o valor do cabeçalho X-Next-Cursor da página anterior.
+    cursor: Optional[str] = None,
+    ordenar_por: Literal["id", "nome"] = "id",
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRICAO),
+    contagem: Optional[Literal["exata", "aproximada"]] = Query(
+        None, description="Inclui o total de empresas (com os mesmos filtros) no cabeçalho X-Total-Count."
+    ),
+    if_none_match_header: Optional[str] = Header(None, alias="If-None-Match"),
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Endpoint para listar empresas com suporte a filtros e paginação."""
+    """
+    Endpoint para listar empresas com suporte a filtros e paginação.
+
+    Sempre que a página vem cheia, o cabeçalho X-Next-Cursor contém um cursor opaco
+    que, enviado no parâmetro 'cursor', devolve a página seguinte sem usar OFFSET.
+    Cada página tem um ETag fraco; se o cliente o reenviar em If-None-Match e nada
+    tiver mudado, a resposta é 304 Not Modified, sem corpo.
+
+    As empresas são lidas como linhas (só as colunas da resposta) e serializadas
+    diretamente com o orjson, sem passar pela validação do response_model.
+    Com 'fields', só os campos pedidos são lidos da base de dados e devolvidos.
+    Com 'contagem', o total de empresas vem no cabeçalho X-Total-Count: 'exata' faz um
+    COUNT(*); 'aproximada' usa estimativas e contagens recentes, quase sem custo.
+    Com 'Accept: application/msgpack' ou 'application/vnd.apache.arrow.stream', a página é
+    devolvida por colunas em MessagePack ou Apache Arrow, em vez de JSON.
+    """
     filtros = {"cidade": cidade, "ramo_atuacao": ramo_atuacao, "nome": nome}
+    campos = _campos_pedidos(fields)
+    formato = _formato_pedido(accept)
+    ordenar_por, chave = _ordem_do_cursor(cursor, ordenar_por)
+    # Além dos campos pedidos, são lidas a versão (ETag) e as colunas da chave do cursor.
+    colunas = _colunas(campos or CAMPOS_RESPOSTA, (*ORDENACOES[ordenar_por], "versao"))
     # A lógica de filtragem está no repositório, mantendo o endpoint limpo.
     repo = EmpresaRepository()
-    return repo.get_all(db, skip, limit, filtros)
+    if chave is not None:
+        empresas = repo.get_after(db, chave, limit, filtros, ordenar_por, colunas)
+    else:
+        empresas = repo.get_all(db, skip, limit, filtros, ordenar_por, colunas)
+    total = EmpresaStatsService(db).count(filtros, contagem) if contagem is not None else None
+    return _resposta_lista(empresas, limit, ordenar_por, campos, formato, if_none_match_header, contagem, total)
+
+def _ordem_do_cursor(cursor: Optional[str], ordenar_por: str) -> Tuple[str, Optional[list]]:
+    """
+    Descodifica o parâmetro 'cursor' da listagem.
+    :return: A ordenação a usar (a do cursor, se existir) e a chave a partir da qual continuar (ou None).
+    :raises HTTPException: 400 se o cursor for inválido.
+    """
+    if not cursor:
+        return ordenar_por, None
+    try:
+        # O cursor transporta a sua própria ordenação; 'skip' não se aplica neste modo.
+        return decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+def _resposta_lista(
+    empresas: Sequence, limit: int, ordenar_por: str, campos: Optional[Tuple[str, ...]], formato: str,
+    if_none_match_header: Optional[str], contagem: Optional[str] = None, total: Optional[int] = None
+) -> Response:
+    """
+    Constrói a resposta de uma página da listagem (partilhada com app/routers/async_empresa.py):
+    ETag, cursor seguinte, contagem total e o corpo no formato pedido, ou 304 Not Modified.
+    :param empresas: As linhas da página (com as colunas de _colunas, incluindo 'versao').
+    """
+    binario = formato if formato != binary_formats.JSON else None
+    headers = {"ETag": etag_lista(((linha.id, linha.versao) for linha in empresas), campos, binario), "Vary": "Accept"}
+    # Uma página incompleta é a última; só há cursor seguinte quando a página vem cheia.
+    if empresas and len(empresas) == limit:
+        ultima = empresas[-1]
+        chave = tuple(getattr(ultima, coluna) for coluna in ORDENACOES[ordenar_por])
+        headers["X-Next-Cursor"] = encode_cursor(ordenar_por, chave)
+    if contagem is not None:
+        headers["X-Total-Count"] = str(total)
+        headers["X-Total-Count-Mode"] = contagem
+
+    # O cliente já tem esta página: responde 304 sem construir nem serializar a resposta.
+    if if_none_match(if_none_match_header, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if formato == binary_formats.MSGPACK:
+        conteudo = binary_formats.encode_msgpack(campos or CAMPOS_RESPOSTA, empresas)
+    elif formato == binary_formats.ARROW:
+        conteudo = binary_formats.encode_arrow(campos or CAMPOS_RESPOSTA, empresas, models.Empresa.__table__)
+    else:
+        return FastJSONResponse(linhas_para_dicts(campos or CAMPOS_RESPOSTA, empresas), headers=headers)
+    return Response(conteudo, media_type=binary_formats.MEDIA_TYPES[formato], headers=headers)
+
+@router_partilhado.get("/export", response_class=StreamingResponse)
+def export_empresas(
+    formato: Optional[Literal["ndjson", "csv", "msgpack", "arrow"]] = Query(
+        None, description="Formato da exportação. Por omissão, MessagePack ou Arrow se pedidos no cabeçalho Accept, NDJSON caso contrário."
+    ),
+    cidade: Optional[str] = None,
+    ramo_atuacao: Optional[str] = None,
+    nome: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+):
+    """
+    Endpoint para exportar todas as empresas (com os mesmos filtros da listagem) em NDJSON, CSV,
+    MessagePack ou Apache Arrow (um bloco colunar por lote).
+    A resposta é enviada em streaming a partir de um cursor do lado do servidor, sem paginação
+    e sem carregar o resultado completo em memória.
+    """
+    if formato is None:
+        negociado = _formato_pedido(accept)
+        formato = "ndjson" if negociado == binary_formats.JSON else negociado
+    else:
+        _verificar_formato(formato)
+    filtros = {"cidade": cidade, "ramo_atuacao": ramo_atuacao, "nome": nome}
+    service = EmpresaExportService()
+    return StreamingResponse(
+        service.gerar(formato, filtros),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="empresas.{formato}"'},
+    )
+
+@router_partilhado.get("/search", response_model=List[empresa_schema.Empresa])
+def search_empresas(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint de pesquisa textual de empresas por nome, cidade e ramo de atuação.
+    Ignora maiúsculas e acentos e devolve os resultados ordenados por relevância.
+    """
+    repo = EmpresaSearchRepository()
+    return repo.search(db, q, limit)
+
+@router_partilhado.get("/stats", response_model=empresa_schema.EmpresaStats)
+def empresa_stats(
+    cidade: Optional[str] = None,
+    ramo_atuacao: Optional[str] = None,
+    nome: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint com o número de empresas por cidade e por ramo de atuação, com os mesmos
+    filtros da listagem. Sem filtros, as contagens vêm de uma cache em memória mantida
+    a cada escrita, pelo que a resposta não implica percorrer a tabela.
+    """
+    filtros = {"cidade": cidade, "ramo_atuacao": ramo_atuacao, "nome": nome}
+    service = EmpresaStatsService(db)
+    return service.get_stats(filtros)
+
+@router_partilhado.get("/changes", response_model=empresa_schema.EmpresaAlteracoes)
+def empresa_changes(
+    since: Optional[str] = Query(None, description="O token 'proximo' da resposta anterior. Por omissão, o início do feed."),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint de sincronização incremental: devolve as empresas criadas, atualizadas ou apagadas
+    depois do token 'since', pela ordem em que as alterações foram feitas. O pedido seguinte
+    deve enviar o token 'proximo' da resposta ('mais' indica se há mais alterações por ler).
+    """
+    service = EmpresaChangesService(db)
+    return FastJSONResponse(service.get_changes(since, limit))
+
+@router_partilhado.get("/changes/stream", response_class=StreamingResponse)
+async def empresa_changes_stream(
+    request: Request,
+    since: Optional[str] = Query(None, description="O token a partir do qual enviar as alterações. Por omissão, o de Last-Event-ID ou o início do feed."),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Endpoint Server-Sent Events com as alterações de empresas: envia as alterações posteriores
+    ao token e depois as novas, à medida que acontecem. Ao religar, o cliente retoma a partir
+    do cabeçalho Last-Event-ID (o 'id' do último evento recebido).
+    """
+    return StreamingResponse(
+        stream_changes(request, decode_token(since or last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{empresa_id}", response_model=empresa_schema.Empresa)
-def read_empresa(empresa_id: int, db: Session = Depends(get_db)):
-    """Endpoint para obter os detalhes de uma empresa específica pelo seu ID."""
+def read_empresa(
+    empresa_id: int,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRICAO),
+    if_none_match_header: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint para obter os detalhes de uma empresa específica pelo seu ID.
+    A resposta inclui um ETag forte; se o cliente o reenviar em If-None-Match e a
+    empresa não tiver mudado, a resposta é 304 Not Modified, sem corpo.
+    Com 'fields', só os campos pedidos são lidos da base de dados e devolvidos.
+    """
+    campos = _campos_pedidos(fields)
     repo = EmpresaRepository()
-    db_empresa = repo.get_by_id(db, empresa_id)
-    if db_empresa is None:
+    linha = repo.get_row_by_id(db, empresa_id, _colunas(campos or CAMPOS_RESPOSTA, ("id", "versao")))
+    if linha is None:
         # Se a empresa não for encontrada, retorna um erro 404 Not Found.
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa não encontrada.")
-    return db_empresa
+    etag = etag_empresa(linha.id, linha.versao, campos)
+    if if_none_match(if_none_match_header, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return FastJSONResponse(linhas_para_dicts(campos or CAMPOS_RESPOSTA, [linha])[0], headers={"ETag": etag})
+
+def _versao_esperada(if_match: Optional[str], empresa_id: int) -> Optional[int]:
+    """Converte o cabeçalho If-Match na versão esperada, respondendo 412 se nunca puder corresponder."""
+    try:
+        return versao_de_if_match(if_match, empresa_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="A empresa foi alterada entretanto.")
 
 @router.put("/{empresa_id}", response_model=empresa_schema.Empresa)
-def update_empresa(empresa_id: int, empresa: empresa_schema.EmpresaUpdate, db: Session = Depends(get_db)):
-    """Endpoint para atualizar os dados de uma empresa existente."""
+def update_empresa(
+    empresa_id: int,
+    empresa: empresa_schema.EmpresaUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, alias="If-Match"),
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint para atualizar os dados de uma empresa existente.
+    Com o cabeçalho If-Match (ETag obtido num GET), a atualização só é aplicada se a
+    empresa não tiver sido alterada entretanto; caso contrário, a resposta é 412.
+    """
     service = EmpresaService(db)
-    updated_empresa = service.update_empresa(empresa_id, empresa)
+    updated_empresa = service.update_empresa(empresa_id, empresa, _versao_esperada(if_match, empresa_id))
+    response.headers["ETag"] = etag_empresa(updated_empresa.id, updated_empresa.versao)
     return updated_empresa
 
 @router.delete("/{empresa_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_empresa(empresa_id: int, db: Session = Depends(get_db)):
-    """Endpoint para apagar uma empresa."""
-    repo = EmpresaRepository()
-    success = repo.delete(db, empresa_id)
-    if not success:
-        # Se o repositório retornar False, significa que a empresa não foi encontrada.
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa não encontrada.")
+def delete_empresa(
+    empresa_id: int,
+    if_match: Optional[str] = Header(None, alias="If-Match"),
+    db: Session = Depends(get_db)
+):
+    """Endpoint para apagar uma empresa (condicional, se for enviado o cabeçalho If-Match)."""
+    service = EmpresaService(db)
+    # Levanta 404 se a empresa não existir, ou 412 se a versão não corresponder ao If-Match.
+    service.delete_empresa(empresa_id, _versao_esperada(if_match, empresa_id))
     # Em caso de sucesso, retorna uma resposta 204 No Content, sem corpo.
     return
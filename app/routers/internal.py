@@ -0,0 +1,36 @@
+# Router com endpoints internos de diagnóstico (não fazem parte da API pública de negócio).
+from fastapi import APIRouter, Depends
+
+from app.core.config import settings
+from app.db import async_database, database
+from app.db.pool_stats import async_pool_stats, pool_stats
+from app.deps import get_current_active_user
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Interno"],
+    # Tal como /empresas, estes endpoints exigem um utilizador autenticado.
+    dependencies=[Depends(get_current_active_user)]
+)
+
+@router.get("/pool")
+def read_pool_stats():
+    """
+    Endpoint com a telemetria do pool de conexões deste processo (worker):
+    - pool_size, in_use, idle e overflow: estado atual do pool;
+    - checkouts, overflow_events e timeouts: contadores acumulados desde o arranque;
+    - wait_ms: tempo de espera por uma conexão (média, máximo e histograma).
+
+    Esperas elevadas com o pool esgotado (in_use = pool_size + max_overflow) indicam um pool
+    pequeno; esperas baixas com respostas lentas indicam que o gargalo é a própria base de dados.
+    Com DB_ASYNC, os pedidos são servidos pela engine assíncrona, cujo pool é descrito em "async"
+    (os restantes campos continuam a ser os da engine síncrona, usada pelas tarefas de fundo).
+    """
+    dados = {
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        **pool_stats.snapshot(database.get_engine().pool),
+    }
+    if settings.DB_ASYNC:
+        dados["async"] = async_pool_stats.snapshot(async_database.get_async_engine().sync_engine.pool)
+    return dados
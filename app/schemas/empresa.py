@@ -1,8 +1,8 @@
 # Importações necessárias do Pydantic para criação de modelos e validação,
 # do datetime para manipulação de datas, e do typing para anotações de tipo.
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
 class EmpresaBase(BaseModel):
     """
@@ -39,6 +39,15 @@ class EmpresaUpdate(BaseModel):
     telefone: Optional[str] = None
     email_contato: Optional[EmailStr] = None
 
+    # Omitir um campo mantém o valor atual. Enviá-lo a null é rejeitado com 422: nome, telefone
+    # e e-mail são NOT NULL na tabela, e todos os campos são obrigatórios no schema de resposta.
+    @field_validator("nome", "cidade", "ramo_atuacao", "telefone", "email_contato")
+    @classmethod
+    def _nao_nulo(cls, valor):
+        if valor is None:
+            raise ValueError("O campo não pode ser nulo.")
+        return valor
+
 class Empresa(EmpresaBase):
     """
     Schema usado para as respostas da API (leitura de dados).
@@ -56,3 +65,65 @@ class Empresa(EmpresaBase):
         # leia os dados diretamente de um objeto ORM do SQLAlchemy,
         # facilitando a conversão do modelo da base de dados (models.Empresa) para o schema Pydantic.
         from_attributes = True
+
+class EmpresaImportErro(BaseModel):
+    """
+    Schema que descreve uma linha rejeitada durante a importação em massa (POST /empresas/bulk).
+    """
+    # Número da linha no ficheiro enviado (a primeira linha é a 1; em CSV, a 1 é o cabeçalho).
+    linha: int
+    # Motivo da rejeição (erro de validação, CNPJ/e-mail duplicado, etc.).
+    erro: str
+
+class EmpresaImportResultado(BaseModel):
+    """
+    Schema da resposta da importação em massa: contagens e relatório de erros por linha.
+    """
+    total_linhas: int
+    inseridas: int
+    rejeitadas: int
+    # Apenas os primeiros BULK_IMPORT_MAX_ERRORS erros são devolvidos, para limitar o tamanho da resposta.
+    erros: List[EmpresaImportErro]
+    # True quando existiram mais erros do que os devolvidos em 'erros'.
+    erros_truncados: bool = False
+
+class EmpresaBulkResultado(BaseModel):
+    """
+    Schema da resposta de PATCH/DELETE /empresas/bulk: o número de empresas afetadas.
+    """
+    afetadas: int
+
+class EmpresaFaceta(BaseModel):
+    """
+    Schema de uma contagem de GET /empresas/stats: um valor de uma faceta
+    (ex: a cidade "Belém") e o número de empresas com esse valor.
+    """
+    valor: Optional[str]
+    total: int
+
+class EmpresaStats(BaseModel):
+    """
+    Schema da resposta de GET /empresas/stats: o total de empresas e as contagens
+    por cidade e por ramo de atuação, ordenadas da mais frequente para a menos frequente.
+    """
+    total: int
+    cidade: List[EmpresaFaceta]
+    ramo_atuacao: List[EmpresaFaceta]
+
+class EmpresaAlteracao(BaseModel):
+    """
+    Schema de uma alteração do feed de GET /empresas/changes: uma empresa criada ou
+    atualizada ("upsert", com os dados atuais) ou apagada ("delete", sem dados).
+    """
+    tipo: Literal["upsert", "delete"]
+    id: int
+    empresa: Optional[Empresa] = None
+
+class EmpresaAlteracoes(BaseModel):
+    """
+    Schema da resposta de GET /empresas/changes: as alterações por ordem, o token a enviar
+    em 'since' no pedido seguinte e se há mais alterações por ler.
+    """
+    alteracoes: List[EmpresaAlteracao]
+    proximo: str
+    mais: bool
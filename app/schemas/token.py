@@ -12,6 +12,14 @@ class Token(BaseModel):
     access_token: str
     # O tipo do token. Pelo padrão OAuth2, é tipicamente "bearer".
     token_type: str
+    # O refresh token, trocado em POST /refresh por um novo par de tokens quando o de acesso expira.
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    """
+    Schema Pydantic para o corpo do pedido de POST /refresh.
+    """
+    refresh_token: str
 
 class TokenData(BaseModel):
     """
@@ -23,3 +31,8 @@ class TokenData(BaseModel):
     # É definido como Optional porque o payload pode não conter este campo,
     # permitindo uma validação explícita no código.
     username: Optional[str] = None
+    # O ID do utilizador (claim "uid"), presente nos tokens emitidos pelo login.
+    user_id: Optional[int] = None
+    # O identificador do token (claim "jti") e da sessão a que pertence (claim "fam").
+    jti: Optional[str] = None
+    familia: Optional[str] = None
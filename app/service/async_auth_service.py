@@ -0,0 +1,73 @@
+# Importa a AsyncSession do SQLAlchemy para tipagem.
+from sqlalchemy.ext.asyncio import AsyncSession
+# Importa componentes do FastAPI para tratamento de erros HTTP.
+from fastapi import HTTPException, status
+# Importa o repositório assíncrono de utilizador para aceder à base de dados.
+from app.repositories.async_usuario_repository import AsyncUsuarioRepository
+# Importa o schema Pydantic para validação dos dados de entrada do utilizador.
+from app.schemas.usuario import UsuarioCreate
+# Importa as funções de segurança para hashing de senhas e criação de tokens JWT.
+from app.core.security import get_password_hash_async, new_token_family, verify_password_async
+from datetime import datetime
+from typing import Optional
+from app.service.auth_service import AuthService
+from app.service.token_service import TokenService
+
+
+class AsyncAuthService(AuthService):
+    """
+    Versão de AuthService que usa a pilha assíncrona de base de dados (DB_ASYNC).
+    As consultas são aguardadas diretamente no event loop, sem passar pelo threadpool;
+    o tratamento da sobrecarga do pool de hashing e a lógica de refresh e logout são
+    herdados de AuthService.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """
+        :param db: A sessão assíncrona da base de dados injetada pela dependência do FastAPI.
+        """
+        self.db = db
+        self.repo = AsyncUsuarioRepository()
+
+    async def register_user(self, user: UsuarioCreate, cliente: Optional[str] = None):
+        """
+        Regista um novo utilizador, impedindo nomes de utilizador duplicados.
+        :return: O objeto ORM do utilizador recém-criado.
+        """
+        await self._limitar(cliente, user.username)
+        if await self.repo.get_by_username(self.db, user.username):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Nome de utilizador já registado."
+            )
+        hashed_password = await self._hash(get_password_hash_async(user.password))
+        return await self.repo.create(self.db, user, hashed_password)
+
+    async def login_for_access_token(self, form_data, cliente: Optional[str] = None):
+        """
+        Autentica um utilizador e gera um token de acesso JWT e um refresh token.
+        :return: Um dicionário contendo os tokens e o tipo de token.
+        """
+        await self._limitar(cliente, form_data.username)
+        user = await self.repo.get_by_username(self.db, form_data.username)
+
+        if not user or not await self._hash(verify_password_async(form_data.password, user.hashed_password)):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Nome de utilizador ou senha incorretos",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        self._rehash_if_needed(user, form_data.password)
+        return self._emitir_tokens(user.username, user.id, new_token_family())
+
+    async def _revogar(self, identificador: str, expira_em: datetime) -> bool:
+        """
+        Revoga um token ou uma sessão com TokenService, sobre a sessão síncrona da AsyncSession
+        (a consulta continua a usar o driver assíncrono, sem passar pelo threadpool).
+        """
+        return await self.db.run_sync(lambda sessao: TokenService(sessao).revoke(identificador, expira_em))
+
+    async def _get_user(self, username: str):
+        """Obtém o utilizador pelo nome de utilizador (None se não existir)."""
+        return await self.repo.get_by_username(self.db, username)
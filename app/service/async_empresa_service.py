@@ -0,0 +1,77 @@
+# Importa a AsyncSession do SQLAlchemy para tipagem e a exceção de violação de restrições.
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+# Importa componentes do FastAPI para tratamento de erros HTTP.
+from fastapi import HTTPException, status
+# Importa o repositório assíncrono de empresa para aceder à base de dados.
+from app.repositories.async_empresa_repository import AsyncEmpresaRepository
+# Importa os schemas Pydantic para validação dos dados de entrada.
+from app.schemas import empresa as empresa_schema
+from app.service.empresa_service import _coluna_duplicada
+# Importa tipos do Python para type hinting.
+from typing import Optional
+
+
+class AsyncEmpresaService:
+    """
+    Versão assíncrona de EmpresaService, usada quando DB_ASYNC está ativo.
+    Aplica as mesmas regras de negócio, com as mesmas mensagens de erro.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """
+        :param db: A sessão assíncrona da base de dados injetada pela dependência do FastAPI.
+        """
+        self.db = db
+        self.repo = AsyncEmpresaRepository()
+
+    async def create_empresa(self, empresa: empresa_schema.EmpresaCreate):
+        """
+        Cria uma nova empresa, impedindo CNPJs e e-mails de contacto duplicados.
+        Tal como em EmpresaService, a unicidade é garantida pelas restrições UNIQUE da tabela,
+        numa única ida à base de dados e sem janela entre a verificação e o INSERT.
+        :return: O objeto ORM da empresa recém-criada.
+        """
+        try:
+            return await self.repo.create(self.db, empresa)
+        except IntegrityError as exc:
+            await self.db.rollback()
+            coluna = _coluna_duplicada(exc)
+            if coluna == "email_contato":
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registado.")
+            if coluna == "cnpj":
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CNPJ já registado.")
+            raise
+
+    async def update_empresa(self, empresa_id: int, empresa_update: empresa_schema.EmpresaUpdate, versao_esperada: Optional[int] = None):
+        """
+        Atualiza uma empresa existente, impedindo que o novo e-mail pertença a outra empresa
+        (restrição UNIQUE, verificada pelo próprio UPDATE).
+        :param versao_esperada: A versão extraída do cabeçalho If-Match, se existir.
+        :return: O objeto ORM da empresa atualizada.
+        """
+        try:
+            updated_empresa = await self.repo.update(self.db, empresa_id, empresa_update, versao_esperada)
+        except IntegrityError as exc:
+            await self.db.rollback()
+            if _coluna_duplicada(exc) != "email_contato":
+                raise
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registado noutra empresa.")
+
+        if updated_empresa is None:
+            await self._raise_not_found_or_stale(empresa_id, versao_esperada)
+        return updated_empresa
+
+    async def delete_empresa(self, empresa_id: int, versao_esperada: Optional[int] = None) -> None:
+        """
+        Apaga uma empresa (condicional, se for indicada a versão esperada).
+        :param versao_esperada: A versão extraída do cabeçalho If-Match, se existir.
+        """
+        if not await self.repo.delete(self.db, empresa_id, versao_esperada):
+            await self._raise_not_found_or_stale(empresa_id, versao_esperada)
+
+    async def _raise_not_found_or_stale(self, empresa_id: int, versao_esperada: Optional[int]) -> None:
+        """412 se a empresa existe mas a versão não corresponde ao If-Match, 404 caso contrário."""
+        if versao_esperada is not None and await self.repo.get_by_id(self.db, empresa_id) is not None:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="A empresa foi alterada entretanto.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa não encontrada.")
@@ -1,13 +1,43 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
 # Importa o objeto Session do SQLAlchemy para tipagem.
 from sqlalchemy.orm import Session
+from jose import JWTError
 # Importa componentes do FastAPI para tratamento de erros HTTP.
 from fastapi import HTTPException, status
+# run_in_threadpool executa as consultas síncronas à BD sem bloquear o event loop.
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, Optional
 # Importa o repositório de utilizador para aceder à base de dados.
 from app.repositories.usuario_repository import UsuarioRepository 
 # Importa o schema Pydantic para validação dos dados de entrada do utilizador.
 from app.schemas.usuario import UsuarioCreate 
+from app.schemas.token import TokenData
+from app.core.config import settings
+from app.core.rate_limit import LimiteExcedido, auth_rate_limiter
+from app.core.revocation import revocation_set
+from app.db.database import new_session
+from app.service.token_service import TokenService
 # Importa as funções de segurança para hashing de senhas e criação de tokens JWT.
-from app.core.security import get_password_hash, verify_password, create_access_token 
+from app.core.security import (
+    HashingIndisponivel,
+    HashingSobrecarregado,
+    VerificacoesEmExcesso,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_password_hash_async,
+    new_token_family,
+    password_needs_update,
+    verify_password_async,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rehash em curso por ID de utilizador (ver AuthService._rehash_if_needed). Guarda também a
+# referência à tarefa, que de outro modo poderia ser recolhida antes de terminar.
+_rehash_em_curso: Dict[int, asyncio.Task] = {}
 
 
 class AuthService:
@@ -15,6 +45,9 @@ class AuthService:
     Camada de Serviço (Service Layer) para a lógica de negócio de autenticação.
     Esta classe orquestra as operações de registo e login, utilizando o repositório
     para interagir com a base de dados e as funções de segurança para manipular senhas e tokens.
+
+    Os métodos são assíncronos: o bcrypt corre no pool de processos de hashing e as consultas
+    à base de dados no threadpool, de modo que um pico de logins não bloqueia os outros endpoints.
     """
 
     def __init__(self, db: Session):
@@ -25,42 +58,48 @@ class AuthService:
         self.db = db
         self.repo = UsuarioRepository()
 
-    def register_user(self, user: UsuarioCreate):
+    async def register_user(self, user: UsuarioCreate, cliente: Optional[str] = None):
         """
         Executa a lógica de negócio para registar um novo utilizador.
-        1. Verifica se o nome de utilizador já existe.
-        2. Gera o hash da senha.
-        3. Chama o repositório para criar o utilizador na base de dados.
+        1. Aplica os limites de pedidos por IP e por utilizador.
+        2. Verifica se o nome de utilizador já existe.
+        3. Gera o hash da senha.
+        4. Chama o repositório para criar o utilizador na base de dados.
         
         :param user: Um objeto Pydantic UsuarioCreate com os dados do novo utilizador.
+        :param cliente: O endereço IP do cliente, para o limite de pedidos.
         :return: O objeto ORM do utilizador recém-criado.
         """
+        await self._limitar(cliente, user.username)
         # Regra de negócio: Impede o registo de nomes de utilizador duplicados.
-        if self.repo.get_by_username(self.db, user.username):
+        if await run_in_threadpool(self.repo.get_by_username, self.db, user.username):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Nome de utilizador já registado."
             )
         # Gera o hash da senha antes de a armazenar.
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await self._hash(get_password_hash_async(user.password))
         # Delega a criação do utilizador à camada de repositório.
-        return self.repo.create(self.db, user, hashed_password)
+        return await run_in_threadpool(self.repo.create, self.db, user, hashed_password)
     
-    def login_for_access_token(self, form_data):
+    async def login_for_access_token(self, form_data, cliente: Optional[str] = None):
         """
         Executa a lógica de negócio para autenticar um utilizador e gerar um token.
-        1. Obtém o utilizador pelo nome de utilizador.
-        2. Verifica se a senha fornecida corresponde à senha hasheada.
-        3. Cria um token de acesso JWT se as credenciais forem válidas.
+        1. Aplica os limites de pedidos por IP e por utilizador (antes de qualquer bcrypt).
+        2. Obtém o utilizador pelo nome de utilizador.
+        3. Verifica se a senha fornecida corresponde à senha hasheada.
+        4. Cria um token de acesso JWT se as credenciais forem válidas.
         
         :param form_data: Um objeto OAuth2PasswordRequestForm com 'username' e 'password'.
-        :return: Um dicionário contendo o token de acesso e o tipo de token.
+        :param cliente: O endereço IP do cliente, para o limite de pedidos.
+        :return: Um dicionário contendo o token de acesso, o refresh token e o tipo de token.
         """
-        user = self.repo.get_by_username(self.db, form_data.username)
+        await self._limitar(cliente, form_data.username)
+        user = await run_in_threadpool(self.repo.get_by_username, self.db, form_data.username)
         
         # Regra de negócio: Verifica se o utilizador existe e se a senha está correta.
         # A verificação é feita em tempo constante para mitigar ataques de timing.
-        if not user or not verify_password(form_data.password, user.hashed_password):
+        if not user or not await self._hash(verify_password_async(form_data.password, user.hashed_password)):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Nome de utilizador ou senha incorretos",
@@ -69,8 +108,182 @@ class AuthService:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Cria o token de acesso, incluindo o nome de utilizador no "subject" (sub) do payload.
-        access_token = create_access_token(data={"sub": user.username})
-        
-        # Retorna o token no formato esperado pelo padrão OAuth2.
-        return {"access_token": access_token, "token_type": "bearer"}
+        self._rehash_if_needed(user, form_data.password)
+        # Cada login inicia uma nova sessão (família de tokens).
+        return self._emitir_tokens(user.username, user.id, new_token_family())
+
+    async def refresh(self, refresh_token: str):
+        """
+        Troca um refresh token por um novo par de tokens (rotação).
+        1. Valida o refresh token e verifica que não foi revogado.
+        2. Revoga-o, para que não possa voltar a ser usado.
+        3. Emite um novo token de acesso e um novo refresh token da mesma sessão.
+
+        Se o refresh token já tiver sido usado (por exemplo, porque foi roubado e usado pelo
+        atacante ou pelo cliente legítimo), toda a sessão é revogada.
+
+        :param refresh_token: O refresh token devolvido pelo login ou pelo refresh anterior.
+        :return: Um dicionário contendo os novos tokens e o tipo de token.
+        """
+        try:
+            payload = decode_token(refresh_token)
+        except JWTError:
+            raise _refresh_invalido()
+        username, jti, familia = payload.get("sub"), payload.get("jti"), payload.get("fam")
+        if payload.get("typ") != "refresh" or not (username and jti and familia):
+            raise _refresh_invalido()
+        if revocation_set.is_revoked(familia):
+            raise _refresh_invalido()
+
+        expira_em = datetime.fromtimestamp(payload["exp"], timezone.utc)
+        # O INSERT da revogação falha se o token já tiver sido trocado (noutro worker ou num
+        # pedido concorrente); a lista em memória evita a ida à base de dados no caso comum.
+        if revocation_set.is_revoked(jti) or not await self._revogar(jti, expira_em):
+            # Regra de negócio: reutilização de um refresh token já trocado. Revoga a sessão,
+            # invalidando também os tokens emitidos a partir dele.
+            await self._revogar(familia, _fim_da_sessao())
+            raise _refresh_invalido()
+
+        # O utilizador pode ter sido apagado desde o login.
+        user = await self._get_user(username)
+        if user is None:
+            raise _refresh_invalido()
+        return self._emitir_tokens(user.username, user.id, familia)
+
+    async def logout(self, token_data: TokenData) -> None:
+        """
+        Termina a sessão do token apresentado: o token de acesso e todos os refresh tokens
+        dessa sessão deixam de ser aceites.
+
+        :param token_data: Os dados do token de acesso do pedido.
+        """
+        if token_data.familia:
+            await self._revogar(token_data.familia, _fim_da_sessao())
+        elif token_data.jti:
+            # Tokens emitidos antes da existência das sessões: revoga apenas o próprio token.
+            await self._revogar(token_data.jti, _fim_da_sessao())
+
+    async def _revogar(self, identificador: str, expira_em: datetime) -> bool:
+        """Revoga um token ou uma sessão (ver TokenService.revoke), no threadpool."""
+        return await run_in_threadpool(TokenService(self.db).revoke, identificador, expira_em)
+
+    async def _get_user(self, username: str):
+        """Obtém o utilizador pelo nome de utilizador, no threadpool (None se não existir)."""
+        return await run_in_threadpool(self.repo.get_by_username, self.db, username)
+
+    def _rehash_if_needed(self, user, password: str) -> None:
+        """
+        Se o hash da senha usar um custo do bcrypt diferente de BCRYPT_ROUNDS (ou um esquema
+        obsoleto), agenda a sua substituição. Corre numa tarefa de fundo, fora do caminho da
+        resposta: o login não espera por um segundo bcrypt.
+
+        :param user: O utilizador acabado de autenticar.
+        :param password: A senha em texto plano, já verificada.
+        """
+        if not password_needs_update(user.hashed_password) or user.id in _rehash_em_curso:
+            return
+        tarefa = asyncio.create_task(_rehash(user.id, user.username, password, user.hashed_password))
+        _rehash_em_curso[user.id] = tarefa
+        tarefa.add_done_callback(lambda _: _rehash_em_curso.pop(user.id, None))
+
+    def _emitir_tokens(self, username: str, user_id: int, familia: str) -> dict:
+        """
+        Cria o par token de acesso / refresh token de uma sessão.
+        O token de acesso inclui o nome de utilizador no "subject" (sub) do payload e o ID do
+        utilizador ("uid"), que permite validar o token sem consultar a base de dados.
+
+        :return: Os tokens no formato esperado pelo padrão OAuth2.
+        """
+        dados = {"sub": username, "uid": user_id, "fam": familia}
+        return {
+            "access_token": create_access_token(data=dados),
+            "refresh_token": create_refresh_token(dados),
+            "token_type": "bearer",
+        }
+
+    async def _limitar(self, cliente: Optional[str], username: str) -> None:
+        """
+        Aplica os limites de pedidos de autenticação (ver app/core/rate_limit.py).
+        :raises HTTPException: 429 com Retry-After se o IP ou o utilizador excederam o limite.
+        """
+        try:
+            await auth_rate_limiter.check(cliente, username)
+        except LimiteExcedido as exc:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas tentativas. Tente novamente mais tarde.",
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+
+    async def _hash(self, operacao):
+        """
+        Aguarda uma operação de hashing, convertendo a sobrecarga ou a avaria do pool num erro HTTP.
+        :param operacao: A corrotina devolvida por get_password_hash_async/verify_password_async.
+        :return: O resultado da operação.
+        """
+        try:
+            return await operacao
+        except VerificacoesEmExcesso:
+            # Demasiados logins em simultâneo: recusa de imediato, sem ocupar o pool de hashing.
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiados pedidos de autenticação em curso. Tente novamente dentro de instantes.",
+                headers={"Retry-After": "1"},
+            )
+        except HashingSobrecarregado:
+            # O pool de hashing está saturado: falha rapidamente em vez de acumular pedidos.
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Serviço de autenticação sobrecarregado. Tente novamente dentro de instantes.",
+                headers={"Retry-After": "1"},
+            )
+        except HashingIndisponivel:
+            # Os processos do pool de hashing falharam mesmo depois de recriados.
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Serviço de autenticação indisponível. Tente novamente dentro de instantes.",
+                headers={"Retry-After": "1"},
+            )
+
+
+async def _rehash(user_id: int, username: str, password: str, hash_atual: str) -> None:
+    """
+    Calcula o novo hash no pool de hashing e grava-o numa sessão própria (a do pedido já foi
+    fechada). Uma falha não afeta o utilizador: o rehash é repetido no login seguinte.
+    """
+    try:
+        novo_hash = await get_password_hash_async(password)
+        await run_in_threadpool(_gravar_hash, user_id, username, hash_atual, novo_hash)
+    except (HashingSobrecarregado, HashingIndisponivel):
+        # O pool está ocupado com logins (ou avariado): o rehash fica para o login seguinte.
+        pass
+    except Exception:
+        logger.warning("Falha ao atualizar o hash da senha do utilizador %s.", user_id, exc_info=True)
+
+
+def _gravar_hash(user_id: int, username: str, hash_atual: str, novo_hash: str) -> None:
+    """Grava o novo hash da senha, se não tiver sido alterada entretanto."""
+    db = new_session()
+    try:
+        repo = UsuarioRepository()
+        if repo.update_password_hash(db, user_id, hash_atual, novo_hash):
+            repo.invalidate_cache(username)
+    finally:
+        db.close()
+
+
+def _fim_da_sessao() -> datetime:
+    """
+    Data a partir da qual a revogação de uma sessão deixa de ser necessária: nenhum token
+    da sessão emitido até agora é válido para além de REFRESH_TOKEN_EXPIRE_DAYS.
+    """
+    return datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def _refresh_invalido() -> HTTPException:
+    """Exceção devolvida quando o refresh token é inválido, expirou ou foi revogado."""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido ou revogado.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
@@ -0,0 +1,134 @@
+# Feed de alterações de empresas (GET /empresas/changes e o stream SSE /empresas/changes/stream).
+#
+# Cada escrita recebe um número de sequência ('seq', ver empresa_repository.expr_seq), guardado
+# na empresa (criação/atualização) ou num tombstone (remoção). Um cliente sincroniza pedindo as
+# alterações posteriores ao último token que recebeu; a consulta usa os índices (seq, id), pelo
+# que o custo é proporcional ao número de alterações, e não ao tamanho da tabela.
+import asyncio
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.responses import linhas_para_dicts
+from app.db.database import new_session
+from app.repositories.empresa_repository import COLUNAS_LEITURA, EmpresaRepository
+
+# Campos de cada empresa no feed: os mesmos do schema de resposta Empresa.
+CAMPOS_ALTERACAO = COLUNAS_LEITURA[:-1]
+
+# Token do início do feed: inclui todas as empresas existentes antes da sua criação (seq 0).
+TOKEN_INICIAL = "0"
+
+# Alterações lidas por consulta no stream SSE.
+_LOTE_STREAM = 500
+
+
+def encode_token(seq: int, empresa_id: int) -> str:
+    """Codifica uma posição do feed (seq, id) no token opaco devolvido aos clientes ("seq.id")."""
+    return f"{seq}.{empresa_id}"
+
+
+def decode_token(token: Optional[str]) -> Tuple[int, int]:
+    """
+    Descodifica um token do feed. Sem token (ou com TOKEN_INICIAL), devolve o início do feed.
+    :raises HTTPException: 400 se o token for inválido.
+    """
+    if not token or token == TOKEN_INICIAL:
+        return 0, 0
+    seq, _, empresa_id = token.partition(".")
+    try:
+        posicao = int(seq), int(empresa_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token de alterações inválido.")
+    if min(posicao) < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token de alterações inválido.")
+    return posicao
+
+
+class EmpresaChangesService:
+    """
+    Camada de Serviço para o feed de alterações de empresas.
+    """
+
+    def __init__(self, db: Session):
+        """
+        :param db: A sessão da base de dados injetada pela dependência do FastAPI.
+        """
+        self.db = db
+        self.repo = EmpresaRepository()
+
+    def get_changes(self, since: Optional[str], limit: int) -> dict:
+        """
+        Obtém as alterações posteriores a um token, pela ordem em que foram feitas.
+
+        :param since: O token devolvido no pedido anterior ('proximo'), ou None para começar do início.
+        :param limit: Número máximo de alterações.
+        :return: Um dicionário compatível com o schema EmpresaAlteracoes.
+        """
+        alteracoes, proximo, mais = self._pagina(decode_token(since), limit)
+        return {"alteracoes": [alteracao for _, alteracao in alteracoes], "proximo": proximo, "mais": mais}
+
+    def _pagina(self, desde: Tuple[int, int], limit: int) -> Tuple[List[Tuple[str, dict]], str, bool]:
+        """
+        Lê uma página do feed. Pede uma alteração a mais para saber se há mais por ler.
+        :return: As alterações (cada uma com o seu token), o token da última e se há mais.
+        """
+        linhas = self.repo.get_changes(self.db, desde, limit + 1)
+        mais = len(linhas) > limit
+        alteracoes = []
+        for seq, empresa_id, linha in linhas[:limit]:
+            if linha is None:
+                alteracao = {"tipo": "delete", "id": empresa_id, "empresa": None}
+            else:
+                alteracao = {"tipo": "upsert", "id": empresa_id, "empresa": linhas_para_dicts(CAMPOS_ALTERACAO, [linha])[0]}
+            alteracoes.append((encode_token(seq, empresa_id), alteracao))
+        proximo = alteracoes[-1][0] if alteracoes else encode_token(*desde)
+        return alteracoes, proximo, mais
+
+
+def _ler_pagina(desde: Tuple[int, int]) -> Tuple[List[Tuple[str, dict]], str, bool]:
+    """Lê uma página do feed numa sessão própria (o stream dura mais do que o pedido)."""
+    db = new_session()
+    try:
+        return EmpresaChangesService(db)._pagina(desde, _LOTE_STREAM)
+    finally:
+        db.close()
+
+
+async def stream_changes(request: Request, desde: Tuple[int, int]) -> AsyncIterator[bytes]:
+    """
+    Gera o stream Server-Sent Events das alterações posteriores a um token: primeiro as que
+    já existem e depois, à medida que acontecem, as novas (consultadas a cada
+    CHANGES_POLL_SECONDS, apenas a partir do último token enviado).
+
+    Cada evento tem o tipo da alteração ("upsert" ou "delete"), o seu token no campo 'id'
+    (que o navegador reenvia em Last-Event-ID ao religar) e a alteração em JSON nos dados.
+    Termina quando o cliente fecha a ligação.
+
+    :param request: O pedido, usado para detetar a desconexão do cliente.
+    :param desde: A posição (seq, id) a partir da qual enviar as alterações (ver decode_token,
+        chamado antes de a resposta começar, para que um token inválido dê 400).
+    """
+    ultimo_envio = time.monotonic()
+    # Indica ao cliente o intervalo de religação, em milissegundos.
+    yield f"retry: {int(settings.CHANGES_POLL_SECONDS * 1000) or 1000}\n\n".encode()
+    while not await request.is_disconnected():
+        alteracoes, _, mais = await run_in_threadpool(_ler_pagina, desde)
+        if alteracoes:
+            yield b"".join(
+                b"id: %s\nevent: %s\ndata: %s\n\n" % (token.encode(), alteracao["tipo"].encode(), orjson.dumps(alteracao, option=orjson.OPT_UTC_Z))
+                for token, alteracao in alteracoes
+            )
+            desde = decode_token(alteracoes[-1][0])
+            ultimo_envio = time.monotonic()
+        elif time.monotonic() - ultimo_envio >= settings.CHANGES_HEARTBEAT_SECONDS:
+            # Comentário SSE: ignorado pelo cliente, mas mantém a ligação viva em proxies.
+            yield b": keep-alive\n\n"
+            ultimo_envio = time.monotonic()
+        if not mais:
+            await asyncio.sleep(settings.CHANGES_POLL_SECONDS)
@@ -0,0 +1,94 @@
+# Importa os módulos da biblioteca padrão para serializar CSV/NDJSON.
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Union
+
+from app.core import binary_formats
+from app.core.config import settings
+from app.db import models
+from app.db.database import new_session
+from app.repositories.empresa_repository import EmpresaRepository
+from app.schemas import empresa as empresa_schema
+
+# Campos exportados: os mesmos (e pela mesma ordem) do schema de resposta Empresa.
+CAMPOS_EXPORT = list(empresa_schema.Empresa.model_fields)
+
+# Formatos suportados e o respetivo media type.
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "msgpack": binary_formats.MEDIA_TYPES[binary_formats.MSGPACK],
+    "arrow": binary_formats.MEDIA_TYPES[binary_formats.ARROW],
+}
+
+
+def _json_default(valor):
+    """Serializa as datas em ISO 8601, tal como nas respostas JSON da API."""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+class EmpresaExportService:
+    """
+    Camada de Serviço para a exportação em streaming de empresas (GET /empresas/export).
+
+    Os geradores desta classe são consumidos pela StreamingResponse depois de o endpoint
+    retornar, pelo que abrem e fecham a sua própria sessão da base de dados (a sessão do
+    pedido já foi libertada nesse momento). Cada bloco de EXPORT_BATCH_SIZE linhas lido do
+    cursor é serializado e enviado de imediato: a memória usada é constante e o primeiro
+    byte chega ao cliente logo após o primeiro bloco.
+    """
+
+    def __init__(self):
+        self.repo = EmpresaRepository()
+
+    def _lotes(self, filtros: dict) -> Iterator[list]:
+        """Percorre as empresas filtradas, lote a lote, numa sessão própria."""
+        db = new_session()
+        try:
+            yield from self.repo.stream_all(db, CAMPOS_EXPORT, filtros, settings.EXPORT_BATCH_SIZE)
+        finally:
+            db.close()
+
+    def gerar(self, formato: str, filtros: dict) -> Iterator[Union[str, bytes]]:
+        """
+        Gera o conteúdo da exportação, bloco a bloco.
+        :param formato: "ndjson", "csv", "msgpack" ou "arrow".
+        :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+        :return: Um iterador de blocos de texto (ou de bytes, nos formatos binários).
+        """
+        if formato == "msgpack":
+            # Um objeto MessagePack colunar por lote.
+            return binary_formats.msgpack_stream(CAMPOS_EXPORT, self._lotes(filtros))
+        if formato == "arrow":
+            # Um stream Arrow IPC com um RecordBatch por lote.
+            return binary_formats.arrow_stream(CAMPOS_EXPORT, self._lotes(filtros), models.Empresa.__table__)
+        if formato == "csv":
+            return self._gerar_csv(filtros)
+        return self._gerar_ndjson(filtros)
+
+    def _gerar_ndjson(self, filtros: dict) -> Iterator[str]:
+        """Um objeto JSON por linha."""
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default).encode
+        for lote in self._lotes(filtros):
+            yield "".join(dumps(dict(zip(CAMPOS_EXPORT, linha))) + "\n" for linha in lote)
+
+    def _gerar_csv(self, filtros: dict) -> Iterator[str]:
+        """CSV com cabeçalho; as datas são escritas em ISO 8601."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CAMPOS_EXPORT)
+        for lote in self._lotes(filtros):
+            writer.writerows(
+                [valor.isoformat() if isinstance(valor, datetime) else valor for valor in linha]
+                for linha in lote
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # Garante que o cabeçalho é enviado mesmo quando não há nenhuma empresa.
+        if buffer.tell():
+            yield buffer.getvalue()
@@ -0,0 +1,177 @@
+# Importa os módulos da biblioteca padrão para ler CSV/NDJSON de forma incremental.
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Tuple
+
+# Importa o objeto Session do SQLAlchemy para tipagem e a exceção de violação de restrições.
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+# Importa a exceção de validação do Pydantic e o run_in_threadpool do FastAPI.
+from pydantic import ValidationError
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.cache import facet_cache
+from app.repositories.empresa_repository import EmpresaRepository
+from app.schemas import empresa as empresa_schema
+
+# Formatos aceites no corpo do pedido de importação, identificados pelo Content-Type.
+FORMATOS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+async def iter_linhas(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Converte o corpo do pedido, recebido em blocos de bytes, num iterador de linhas de texto.
+    Só guarda em memória a linha incompleta do bloco atual, pelo que o consumo de memória
+    não depende do tamanho do ficheiro.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    resto = ""
+    async for chunk in chunks:
+        resto += decoder.decode(chunk)
+        *linhas, resto = resto.split("\n")
+        for linha in linhas:
+            yield linha.rstrip("\r")
+    resto += decoder.decode(b"", final=True)
+    if resto:
+        yield resto.rstrip("\r")
+
+
+def _formatar_erro_validacao(exc: ValidationError) -> str:
+    """Resume um ValidationError do Pydantic numa mensagem de uma linha ("campo: motivo; ...")."""
+    partes = []
+    for erro in exc.errors():
+        campo = ".".join(str(parte) for parte in erro["loc"]) or "linha"
+        partes.append(f"{campo}: {erro['msg']}")
+    return "; ".join(partes)
+
+
+class EmpresaImportService:
+    """
+    Camada de Serviço para a importação em massa de empresas (POST /empresas/bulk).
+
+    O ficheiro é lido em streaming e processado em lotes de BULK_IMPORT_CHUNK_SIZE linhas.
+    Para cada lote:
+    1. Cada linha é validada com o schema EmpresaCreate (as mesmas regras do POST /empresas/).
+    2. Os CNPJs/e-mails duplicados são detetados com uma única consulta por lote.
+    3. As linhas válidas são inseridas com um INSERT de múltiplas linhas, numa transação por lote.
+    O resultado é um relatório com as contagens e o motivo de rejeição de cada linha.
+    """
+
+    def __init__(self, db: Session):
+        """
+        :param db: A sessão da base de dados injetada pela dependência do FastAPI.
+        """
+        self.db = db
+        self.repo = EmpresaRepository()
+
+    async def importar(self, linhas: AsyncIterator[str], formato: str) -> dict:
+        """
+        Importa as empresas contidas nas linhas de um ficheiro CSV ou NDJSON.
+        :param linhas: As linhas do ficheiro (ver iter_linhas).
+        :param formato: "csv" ou "ndjson".
+        :return: Um dicionário compatível com o schema EmpresaImportResultado.
+        """
+        resultado = {"total_linhas": 0, "inseridas": 0, "rejeitadas": 0, "erros": [], "erros_truncados": False}
+        cabecalho = None
+        lote: List[Tuple[int, object]] = []
+
+        numero = 0
+        async for linha in linhas:
+            numero += 1
+            if not linha.strip():
+                continue
+            if formato == "csv":
+                valores = next(csv.reader([linha]))
+                if cabecalho is None:
+                    # A primeira linha não vazia de um CSV é o cabeçalho com os nomes dos campos.
+                    cabecalho = [nome.strip() for nome in valores]
+                    continue
+                lote.append((numero, dict(zip(cabecalho, valores))))
+            else:
+                lote.append((numero, linha))
+
+            if len(lote) >= settings.BULK_IMPORT_CHUNK_SIZE:
+                await run_in_threadpool(self._processar_lote, lote, resultado)
+                lote = []
+
+        if lote:
+            await run_in_threadpool(self._processar_lote, lote, resultado)
+        return resultado
+
+    def _registar_erro(self, resultado: dict, linha: int, erro: str) -> None:
+        """Regista uma linha rejeitada, respeitando o limite de erros devolvidos."""
+        resultado["rejeitadas"] += 1
+        if len(resultado["erros"]) < settings.BULK_IMPORT_MAX_ERRORS:
+            resultado["erros"].append({"linha": linha, "erro": erro})
+        else:
+            resultado["erros_truncados"] = True
+
+    def _processar_lote(self, lote: List[Tuple[int, object]], resultado: dict) -> None:
+        """
+        Valida, verifica duplicados e insere um lote de linhas numa única transação.
+        :param lote: Pares (número da linha, dados) — dados é um dicionário (CSV) ou texto JSON (NDJSON).
+        :param resultado: O relatório da importação, atualizado no próprio objeto.
+        """
+        resultado["total_linhas"] += len(lote)
+
+        # 1. Validação de cada linha com o schema de criação.
+        validas: Dict[int, dict] = {}
+        for numero, dados in lote:
+            try:
+                if isinstance(dados, str):
+                    dados = json.loads(dados)
+                    if not isinstance(dados, dict):
+                        raise ValueError("cada linha tem de ser um objeto JSON")
+                validas[numero] = empresa_schema.EmpresaCreate(**dados).dict()
+            except ValidationError as exc:
+                self._registar_erro(resultado, numero, _formatar_erro_validacao(exc))
+            except ValueError as exc:
+                self._registar_erro(resultado, numero, f"JSON inválido: {exc}")
+
+        # 2. Deteção de duplicados: uma consulta para o lote inteiro, mais os repetidos dentro do próprio lote.
+        cnpjs_existentes, emails_existentes = self.repo.get_conflicts(
+            self.db,
+            [empresa["cnpj"] for empresa in validas.values()],
+            [empresa["email_contato"] for empresa in validas.values()],
+        )
+        a_inserir: Dict[int, dict] = {}
+        for numero, empresa in validas.items():
+            if empresa["cnpj"] in cnpjs_existentes:
+                self._registar_erro(resultado, numero, "CNPJ já registado.")
+            elif empresa["email_contato"] in emails_existentes:
+                self._registar_erro(resultado, numero, "E-mail já registado.")
+            else:
+                # As linhas seguintes do lote com o mesmo CNPJ/e-mail passam a ser duplicados.
+                cnpjs_existentes.add(empresa["cnpj"])
+                emails_existentes.add(empresa["email_contato"])
+                a_inserir[numero] = empresa
+
+        # 3. Inserção do lote numa única transação, com um INSERT de múltiplas linhas.
+        try:
+            resultado["inseridas"] += self.repo.bulk_create(self.db, list(a_inserir.values()))
+            self.db.commit()
+        except IntegrityError:
+            # Outro pedido inseriu um CNPJ/e-mail do lote entre a verificação e o INSERT.
+            # Repete o lote linha a linha para identificar exatamente quais falham.
+            self.db.rollback()
+            self._inserir_linha_a_linha(a_inserir, resultado)
+        # As contagens de GET /empresas/stats passam a incluir o lote (recarregadas no próximo pedido).
+        facet_cache.invalidate()
+
+    def _inserir_linha_a_linha(self, a_inserir: Dict[int, dict], resultado: dict) -> None:
+        """Insere cada empresa num SAVEPOINT próprio, rejeitando apenas as que violam a unicidade."""
+        for numero, empresa in a_inserir.items():
+            try:
+                with self.db.begin_nested():
+                    self.repo.bulk_create(self.db, [empresa])
+                resultado["inseridas"] += 1
+            except IntegrityError:
+                self._registar_erro(resultado, numero, "CNPJ ou e-mail já registado.")
+        self.db.commit()
@@ -1,11 +1,14 @@
-# Importa o objeto Session do SQLAlchemy para tipagem.
+# Importa o objeto Session do SQLAlchemy para tipagem e a exceção de violação de restrições.
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 # Importa componentes do FastAPI para tratamento de erros HTTP.
 from fastapi import HTTPException, status
 # Importa o repositório de empresa para aceder à base de dados.
 from app.repositories.empresa_repository import EmpresaRepository 
 # Importa os schemas Pydantic para validação dos dados de entrada.
 from app.schemas import empresa as empresa_schema 
+# Importa tipos do Python para type hinting.
+from typing import List, Optional
 
 
 class EmpresaService:
@@ -26,45 +29,133 @@ class EmpresaService:
     def create_empresa(self, empresa: empresa_schema.EmpresaCreate):
         """
         Executa a lógica de negócio para criar uma nova empresa.
-        1. Verifica se o CNPJ já existe.
-        2. Verifica se o E-mail de contacto já existe.
-        3. Se as validações passarem, chama o repositório para criar a empresa.
+        A unicidade do CNPJ e do e-mail de contacto é garantida pelas restrições UNIQUE da
+        tabela, numa única ida à base de dados (sem consultas prévias e sem janela para
+        condições de corrida entre a verificação e o INSERT).
         
         :param empresa: Um objeto Pydantic EmpresaCreate com os dados da nova empresa.
         :return: O objeto ORM da empresa recém-criada.
         """
-        # Regra de negócio: Impede o registo de CNPJs duplicados.
-        if self.repo.get_by_cnpj(self.db, empresa.cnpj):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CNPJ já registado.")
-        
-        # Regra de negócio: Impede o registo de e-mails de contacto duplicados.
-        if self.repo.get_by_email(self.db, empresa.email_contato):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registado.")
-        
-        # Delega a criação da empresa à camada de repositório.
-        return self.repo.create(self.db, empresa)
+        try:
+            # Delega a criação da empresa à camada de repositório.
+            return self.repo.create(self.db, empresa)
+        except IntegrityError as exc:
+            self.db.rollback()
+            # Regra de negócio: Impede o registo de CNPJs e e-mails de contacto duplicados.
+            coluna = _coluna_duplicada(exc)
+            if coluna == "email_contato":
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registado.")
+            if coluna == "cnpj":
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CNPJ já registado.")
+            # Outras restrições não são erros do cliente previstos pelo schema.
+            raise
 
-    def update_empresa(self, empresa_id: int, empresa_update: empresa_schema.EmpresaUpdate):
+    def update_empresa(self, empresa_id: int, empresa_update: empresa_schema.EmpresaUpdate, versao_esperada: Optional[int] = None):
         """
         Executa a lógica de negócio para atualizar uma empresa existente.
-        1. Verifica se a empresa existe.
-        2. Se um novo e-mail for fornecido, verifica se ele já está em uso por outra empresa.
-        3. Se as validações passarem, chama o repositório para atualizar os dados.
+        O UPDATE é feito diretamente; a unicidade do e-mail é garantida pela restrição UNIQUE
+        e a versão esperada (If-Match) pela condição do próprio UPDATE. Só em caso de falha
+        é feita uma leitura, para distinguir "não encontrada" de "versão desatualizada".
         
         :param empresa_id: O ID da empresa a ser atualizada.
         :param empresa_update: Um objeto Pydantic EmpresaUpdate com os novos dados.
+        :param versao_esperada: A versão extraída do cabeçalho If-Match, se existir.
         :return: O objeto ORM da empresa atualizada.
         """
-        db_empresa = self.repo.get_by_id(self.db, empresa_id)
-        if not db_empresa:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa não encontrada.")
-        
-        # Regra de negócio: Se o e-mail estiver a ser atualizado,
-        # verifica se o novo e-mail já pertence a outra empresa.
-        if empresa_update.email_contato:
-            empresa_existente = self.repo.get_by_email(self.db, empresa_update.email_contato)
-            if empresa_existente and empresa_existente.id != empresa_id:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registado noutra empresa.")
-        
-        # Delega a atualização à camada de repositório.
-        return self.repo.update(self.db, empresa_id, empresa_update)
+        try:
+            # Delega a atualização à camada de repositório.
+            updated_empresa = self.repo.update(self.db, empresa_id, empresa_update, versao_esperada)
+        except IntegrityError as exc:
+            self.db.rollback()
+            if _coluna_duplicada(exc) != "email_contato":
+                raise
+            # Regra de negócio: o novo e-mail não pode pertencer a outra empresa.
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registado noutra empresa.")
+
+        if updated_empresa is None:
+            self._raise_not_found_or_stale(empresa_id, versao_esperada)
+        return updated_empresa
+
+    def delete_empresa(self, empresa_id: int, versao_esperada: Optional[int] = None) -> None:
+        """
+        Executa a lógica de negócio para apagar uma empresa.
+        O DELETE é feito diretamente (com a condição de versão, se existir); só em caso de
+        falha é feita uma leitura para distinguir "não encontrada" de "versão desatualizada".
+
+        :param empresa_id: O ID da empresa a ser apagada.
+        :param versao_esperada: A versão extraída do cabeçalho If-Match, se existir.
+        """
+        if not self.repo.delete(self.db, empresa_id, versao_esperada):
+            self._raise_not_found_or_stale(empresa_id, versao_esperada)
+
+    def bulk_update_empresas(self, ids: Optional[List[int]], filtros: dict, empresa_update: empresa_schema.EmpresaUpdate) -> int:
+        """
+        Executa a lógica de negócio para atualizar várias empresas de uma só vez.
+        A unicidade do e-mail é garantida pela restrição UNIQUE, verificada pelo próprio UPDATE:
+        um e-mail já registado, ou aplicado a mais do que uma empresa, é rejeitado.
+
+        :param ids: Os IDs das empresas a atualizar (ou None).
+        :param filtros: Os filtros da listagem que as empresas têm de satisfazer.
+        :param empresa_update: Um objeto Pydantic EmpresaUpdate com os campos a alterar.
+        :return: O número de empresas atualizadas.
+        """
+        _validar_selecao(ids, filtros)
+        if not empresa_update.dict(exclude_unset=True):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Indique pelo menos um campo a atualizar.")
+        try:
+            return self.repo.bulk_update(self.db, ids, filtros, empresa_update)
+        except IntegrityError as exc:
+            self.db.rollback()
+            if _coluna_duplicada(exc) != "email_contato":
+                raise
+            # Regra de negócio: o novo e-mail não pode pertencer a outra empresa.
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registado noutra empresa.")
+
+    def bulk_delete_empresas(self, ids: Optional[List[int]], filtros: dict) -> int:
+        """
+        Executa a lógica de negócio para apagar várias empresas de uma só vez.
+        :param ids: Os IDs das empresas a apagar (ou None).
+        :param filtros: Os filtros da listagem que as empresas têm de satisfazer.
+        :return: O número de empresas apagadas.
+        """
+        _validar_selecao(ids, filtros)
+        return self.repo.bulk_delete(self.db, ids, filtros)
+
+    def _raise_not_found_or_stale(self, empresa_id: int, versao_esperada: Optional[int]) -> None:
+        """
+        Levanta o erro adequado quando uma escrita não afetou nenhuma linha:
+        412 se a empresa existe mas a versão não corresponde ao If-Match, 404 caso contrário.
+        """
+        if versao_esperada is not None and self.repo.get_by_id(self.db, empresa_id) is not None:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="A empresa foi alterada entretanto.")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa não encontrada.")
+
+
+def _validar_selecao(ids: Optional[List[int]], filtros: dict) -> None:
+    """
+    Regra de negócio das operações em massa: a seleção não pode ser vazia, para que um pedido
+    sem parâmetros nunca altere ou apague todas as empresas.
+    """
+    if not ids and not any(filtros.values()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indique os IDs ('ids') ou pelo menos um filtro (cidade, ramo_atuacao, nome).",
+        )
+
+
+def _coluna_duplicada(exc: IntegrityError) -> Optional[str]:
+    """
+    Identifica a coluna cuja restrição UNIQUE foi violada.
+    Usa o nome da restrição quando o driver o expõe (psycopg2: "ix_empresas_email_contato")
+    e, caso contrário, a primeira linha da mensagem (SQLite: "UNIQUE constraint failed: empresas.cnpj"),
+    que nunca inclui os valores enviados.
+
+    :param exc: A exceção levantada pelo INSERT/UPDATE.
+    :return: "cnpj", "email_contato" ou None se não for possível determinar.
+    """
+    constraint = getattr(getattr(exc.orig, "diag", None), "constraint_name", None)
+    texto = constraint or str(exc.orig).splitlines()[0]
+    for coluna in ("email_contato", "cnpj"):
+        if coluna in texto:
+            return coluna
+    return None
@@ -0,0 +1,85 @@
+# Importa o objeto Session do SQLAlchemy para tipagem.
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import count_cache, facet_cache
+from app.repositories.empresa_repository import EmpresaRepository, FACETAS
+
+
+def _ordenar(contagem: Dict[Any, int]) -> list:
+    """Converte {valor: total} numa lista de facetas, da mais frequente para a menos frequente."""
+    return [
+        {"valor": valor, "total": total}
+        for valor, total in sorted(contagem.items(), key=lambda item: (-item[1], item[0] is None, item[0] or ""))
+    ]
+
+
+class EmpresaStatsService:
+    """
+    Camada de Serviço para as contagens de empresas por cidade e ramo de atuação (GET /empresas/stats).
+
+    Sem filtros, as contagens vêm da cache em memória (facet_cache), que o repositório mantém
+    atualizada a cada criação/remoção: o custo do pedido não depende do número de empresas.
+    Com filtros, as contagens são calculadas na base de dados com GROUP BY.
+    """
+
+    def __init__(self, db: Session):
+        """
+        :param db: A sessão da base de dados injetada pela dependência do FastAPI.
+        """
+        self.db = db
+        self.repo = EmpresaRepository()
+
+    def get_stats(self, filtros: dict) -> dict:
+        """
+        :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+        :return: Um dicionário compatível com o schema EmpresaStats.
+        """
+        if any(filtros.values()):
+            contagens = self.repo.count_by_facets(self.db, filtros)
+        else:
+            contagens = facet_cache.get()
+            if contagens is None:
+                # A geração é lida antes da consulta, para que uma escrita concorrente a invalide.
+                geracao = facet_cache.geracao()
+                contagens = self.repo.count_by_facets(self.db, filtros)
+                facet_cache.carregar(contagens, geracao)
+
+        return {
+            # Cada empresa tem exatamente um valor (possivelmente nulo) em cada faceta.
+            "total": sum(contagens[FACETAS[0]].values()),
+            **{faceta: _ordenar(contagens[faceta]) for faceta in FACETAS},
+        }
+
+    def count(self, filtros: dict, modo: str) -> int:
+        """
+        Número total de empresas de uma listagem (cabeçalho X-Total-Count).
+
+        - "exata": COUNT(*) com os filtros da listagem.
+        - "aproximada": sem filtros, usa o total da cache de facetas ou, em PostgreSQL,
+          a estimativa do planeador (reltuples); com filtros, reutiliza durante
+          COUNT_CACHE_TTL_SECONDS a última contagem feita com os mesmos filtros.
+          Assim, a contagem raramente acrescenta uma consulta à da página.
+
+        :param filtros: Um dicionário contendo os filtros a serem aplicados (cidade, ramo, nome).
+        :param modo: "exata" ou "aproximada".
+        :return: O número de empresas.
+        """
+        if modo == "exata":
+            return self.repo.count(self.db, filtros)
+
+        if not any(filtros.values()):
+            contagens = facet_cache.get()
+            if contagens is not None:
+                return sum(contagens[FACETAS[0]].values())
+            estimativa = self.repo.estimate_count(self.db)
+            if estimativa is not None:
+                return estimativa
+
+        chave = tuple(sorted((nome, valor) for nome, valor in filtros.items() if valor))
+        total = count_cache.get(chave)
+        if total is None:
+            total = self.repo.count(self.db, filtros)
+            count_cache.set(chave, total)
+        return total
@@ -0,0 +1,91 @@
+# Revogação de tokens JWT: grava as revogações na base de dados e mantém atualizada a lista
+# em memória (app/core/revocation.py) consultada em cada pedido autenticado.
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.revocation import revocation_set
+from app.db.database import new_session
+from app.repositories.token_repository import TokenRepository
+
+logger = logging.getLogger(__name__)
+
+# Cada sincronização volta a ler as últimas _JANELA_IDS linhas já vistas. Os IDs são atribuídos
+# no INSERT mas as transações podem terminar fora de ordem; sem esta margem, uma revogação com
+# ID inferior ao maior já lido, confirmada um instante depois, nunca seria carregada.
+_JANELA_IDS = 100
+
+# Intervalo, em segundos, entre limpezas das revogações expiradas na base de dados.
+_INTERVALO_LIMPEZA = 3600
+
+
+class TokenService:
+    """
+    Camada de Serviço (Service Layer) da revogação de tokens.
+    """
+
+    def __init__(self, db: Session):
+        """
+        :param db: A sessão da base de dados.
+        """
+        self.db = db
+        self.repo = TokenRepository()
+
+    def revoke(self, identificador: str, expira_em: datetime) -> bool:
+        """
+        Revoga um token (jti) ou uma sessão (fam). A revogação tem efeito imediato neste
+        processo e, nos restantes workers, na sincronização seguinte.
+
+        :param identificador: O jti do token ou o identificador da sessão.
+        :param expira_em: A data a partir da qual a revogação deixa de ser necessária.
+        :return: True se foi revogado agora, False se já estava revogado.
+        """
+        revogado = self.repo.revoke(self.db, identificador, expira_em)
+        revocation_set.add(identificador, expira_em)
+        return revogado
+
+    def sync(self) -> None:
+        """Carrega na lista em memória as revogações gravadas desde a última sincronização."""
+        ultimo_id = max(revocation_set.ultimo_id - _JANELA_IDS, 0)
+        revocation_set.merge(self.repo.get_revoked_since(self.db, ultimo_id))
+
+    def purge_expired(self) -> int:
+        """Apaga da base de dados as revogações que já expiraram."""
+        return self.repo.delete_expired(self.db)
+
+
+def sincronizar_revogacoes(limpar: bool = False) -> None:
+    """Sincroniza a lista em memória numa sessão própria (e, se pedido, limpa as expiradas)."""
+    db = new_session()
+    try:
+        service = TokenService(db)
+        if limpar:
+            service.purge_expired()
+        service.sync()
+    finally:
+        db.close()
+
+
+async def sincronizar_periodicamente() -> None:
+    """
+    Tarefa de fundo (iniciada no lifespan) que sincroniza a lista de tokens revogados a cada
+    REVOCATION_SYNC_SECONDS. Uma falha da base de dados não termina a tarefa: a lista em
+    memória continua válida e a sincronização é repetida no ciclo seguinte.
+    """
+    ultima_limpeza = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+        limpar = time.monotonic() - ultima_limpeza >= _INTERVALO_LIMPEZA
+        try:
+            await run_in_threadpool(sincronizar_revogacoes, limpar)
+        except SQLAlchemyError:
+            logger.warning("Falha ao sincronizar a lista de tokens revogados.", exc_info=True)
+            continue
+        if limpar:
+            ultima_limpeza = time.monotonic()
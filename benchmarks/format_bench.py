@@ -0,0 +1,98 @@
+"""
+Benchmark dos formatos de resposta de GET /empresas/ (JSON, MessagePack e Apache Arrow), sem HTTP
+nem base de dados: tamanho do payload e tempo de codificação (servidor) e de descodificação (cliente).
+
+A codificação parte das mesmas linhas que a consulta devolve e usa as mesmas funções do endpoint.
+A descodificação é a de um consumidor típico: orjson, msgpack.unpackb e pyarrow.ipc.
+
+Uso (a partir da raiz do projeto, com msgpack e pyarrow instalados):
+    python benchmarks/format_bench.py --rows 100,1000,10000 --iterations 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import msgpack  # noqa: E402
+import orjson  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+from app.core import binary_formats  # noqa: E402
+from app.core.responses import FastJSONResponse, linhas_para_dicts  # noqa: E402
+from app.db import models  # noqa: E402
+from app.repositories.empresa_repository import COLUNAS_LEITURA  # noqa: E402
+
+CAMPOS = COLUNAS_LEITURA[:-1]
+TABELA = models.Empresa.__table__
+
+
+def _linha(n: int) -> tuple:
+    valores = {
+        "id": n, "nome": f"Empresa {n}", "cnpj": f"{n:014d}", "cidade": "Belém",
+        "ramo_atuacao": "Tecnologia", "telefone": "91999990000", "email_contato": f"contato{n}@exemplo.com",
+        "data_cadastro": datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc), "versao": 1,
+    }
+    return tuple(valores[c] for c in COLUNAS_LEITURA)
+
+
+# Cada formato: (codificação no servidor, descodificação no cliente).
+FORMATOS = {
+    "json": (
+        lambda linhas: FastJSONResponse(linhas_para_dicts(CAMPOS, linhas)).body,
+        orjson.loads,
+    ),
+    "msgpack": (
+        lambda linhas: binary_formats.encode_msgpack(CAMPOS, linhas),
+        lambda dados: msgpack.unpackb(dados, timestamp=3),
+    ),
+    "arrow": (
+        lambda linhas: binary_formats.encode_arrow(CAMPOS, linhas, TABELA),
+        lambda dados: pa.ipc.open_stream(dados).read_all(),
+    ),
+}
+
+
+def medir(funcao, iteracoes: int) -> float:
+    """Tempo médio por chamada, em milissegundos (melhor de 3 repetições)."""
+    melhores = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(iteracoes):
+            funcao()
+        melhores.append((time.perf_counter() - inicio) / iteracoes * 1000)
+    return min(melhores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=lambda v: [int(x) for x in v.split(",")], default=[100, 1000, 10000],
+                        help="Tamanhos de página, separados por vírgulas (padrão: 100,1000,10000).")
+    parser.add_argument("--iterations", type=int, default=20, help="Repetições por medição (padrão: 20).")
+    args = parser.parse_args()
+
+    resultados: List[dict] = []
+    for n in args.rows:
+        linhas = [_linha(i) for i in range(1, n + 1)]
+        tamanho_json = None
+        for nome, (codificar, descodificar) in FORMATOS.items():
+            dados = codificar(linhas)
+            tamanho_json = tamanho_json or len(dados)
+            resultados.append({
+                "rows": n,
+                "format": nome,
+                "bytes": len(dados),
+                "size_vs_json": round(len(dados) / tamanho_json, 2),
+                "encode_ms": round(medir(lambda: codificar(linhas), args.iterations), 3),
+                "decode_ms": round(medir(lambda: descodificar(dados), args.iterations), 3),
+            })
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark do custo de serialização das respostas de empresas, por linha, sem HTTP nem base de dados.
+
+Compara o caminho padrão do FastAPI (objetos ORM -> validação com o response_model via
+from_attributes -> JSON com o módulo json) com o caminho rápido usado por GET /empresas
+(linhas -> dicionários -> orjson).
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/serialization_bench.py --rows 100 --iterations 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# As configurações da aplicação são obrigatórias na importação; a base de dados não é usada.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.core.responses import FastJSONResponse, linhas_para_dicts  # noqa: E402
+from app.db import models  # noqa: E402
+from app.repositories.empresa_repository import COLUNAS_LEITURA  # noqa: E402
+from app.schemas import empresa as empresa_schema  # noqa: E402
+
+CAMPOS = COLUNAS_LEITURA[:-1]
+
+
+def _valores(n: int) -> dict:
+    return {
+        "id": n, "nome": f"Empresa {n}", "cnpj": f"{n:014d}", "cidade": "Belém",
+        "ramo_atuacao": "Tecnologia", "telefone": "91999990000", "email_contato": f"contato{n}@exemplo.com",
+        "data_cadastro": datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc), "versao": 1,
+    }
+
+
+def caminho_padrao(objetos: List[models.Empresa], adapter: TypeAdapter) -> bytes:
+    """O que o FastAPI faz com um response_model: validar, converter para JSON e codificar."""
+    validados = adapter.validate_python(objetos, from_attributes=True)
+    conteudo = adapter.dump_python(validados, mode="json")
+    return json.dumps(conteudo, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def caminho_rapido(linhas: List[tuple]) -> bytes:
+    """O caminho de GET /empresas: linhas -> dicionários -> orjson, sem revalidação."""
+    return FastJSONResponse(linhas_para_dicts(CAMPOS, linhas)).body
+
+
+def medir(funcao, iteracoes: int) -> float:
+    """Tempo médio por chamada, em microssegundos (melhor de 3 repetições)."""
+    melhores = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(iteracoes):
+            funcao()
+        melhores.append((time.perf_counter() - inicio) / iteracoes * 1e6)
+    return min(melhores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=lambda v: [int(x) for x in v.split(",")], default=[1, 20, 100],
+                        help="Tamanhos de página, separados por vírgulas (padrão: 1,20,100).")
+    parser.add_argument("--iterations", type=int, default=200, help="Repetições por medição (padrão: 200).")
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[empresa_schema.Empresa])
+    resultados = []
+    for n in args.rows:
+        valores = [_valores(i) for i in range(1, n + 1)]
+        objetos = [models.Empresa(**v) for v in valores]
+        linhas = [tuple(v[c] for c in COLUNAS_LEITURA) for v in valores]
+        # Os dois caminhos produzem o mesmo JSON.
+        assert json.loads(caminho_padrao(objetos, adapter)) == json.loads(caminho_rapido(linhas))
+
+        padrao = medir(lambda: caminho_padrao(objetos, adapter), args.iterations)
+        rapido = medir(lambda: caminho_rapido(linhas), args.iterations)
+        resultados.append({
+            "rows": n,
+            "default_us": round(padrao, 1),
+            "fast_us": round(rapido, 1),
+            "default_us_per_row": round(padrao / n, 2),
+            "fast_us_per_row": round(rapido / n, 2),
+            "speedup": round(padrao / rapido, 1),
+        })
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark do arranque da aplicação, em processos novos (sem caches do interpretador em memória):
+
+- import: tempo de 'import app.main' (sem base de dados disponível, se --sem-bd);
+- cold start: tempo desde o lançamento do uvicorn até à primeira resposta 200 em "/".
+
+Para comparar com outra versão, crie uma cópia do repositório nessa versão e indique-a em --app-dir:
+    git worktree add /tmp/versao-anterior HEAD~1
+    python benchmarks/startup_bench.py --app-dir /tmp/versao-anterior --output antes.json
+    python benchmarks/startup_bench.py --output depois.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def medir_import(app_dir: str, env: dict) -> float:
+    """Tempo (s) de 'import app.main' num interpretador novo, medido dentro do próprio processo."""
+    codigo = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=app_dir, env=env,
+                           capture_output=True, text=True, timeout=120)
+    if saida.returncode != 0:
+        raise RuntimeError(f"A importação falhou:\n{saida.stderr[-2000:]}")
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def medir_cold_start(app_dir: str, env: dict) -> float:
+    """Tempo (s) desde o lançamento do uvicorn até à primeira resposta 200 em "/"."""
+    porta = _porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - inicio < 60:
+            if processo.poll() is not None:
+                raise RuntimeError("O servidor terminou durante o arranque.")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{porta}/", timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("O servidor não respondeu em 60 segundos.")
+    finally:
+        processo.terminate()
+        processo.wait(timeout=15)
+
+
+def _resumo(valores: list) -> dict:
+    return {
+        "median_ms": round(statistics.median(valores) * 1000, 1),
+        "min_ms": round(min(valores) * 1000, 1),
+        "max_ms": round(max(valores) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=RAIZ, help="Raiz do repositório a medir (padrão: este).")
+    parser.add_argument("--database-url", help="Base de dados a usar (padrão: um ficheiro SQLite temporário).")
+    parser.add_argument("--repeat", type=int, default=10, help="Repetições de cada medição (padrão: 10).")
+    parser.add_argument("--output", help="Ficheiro onde gravar o JSON (padrão: stdout).")
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        database_url = args.database_url or f"sqlite:///{os.path.join(pasta, 'startup.db')}"
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "SECRET_KEY": os.environ.get("SECRET_KEY", "bench-secret"),
+            "ALGORITHM": os.environ.get("ALGORITHM", "HS256"),
+            "ACCESS_TOKEN_EXPIRE_MINUTES": os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "60"),
+            "PYTHONDONTWRITEBYTECODE": "",
+        }
+        # O esquema é preparado uma vez antes das medições (como num deploy).
+        if os.path.exists(os.path.join(app_dir, "app", "db", "bootstrap.py")):
+            subprocess.run([sys.executable, "-m", "app.db.bootstrap"], cwd=app_dir, env=env,
+                           check=True, capture_output=True)
+        # Aquece a cache de bytecode (.pyc), para que a primeira repetição não seja penalizada.
+        medir_import(app_dir, env)
+
+        imports = [medir_import(app_dir, env) for _ in range(args.repeat)]
+        cold_starts = [medir_cold_start(app_dir, env) for _ in range(args.repeat)]
+
+        # A importação não deve depender de uma base de dados disponível.
+        sem_bd = {**env, "DATABASE_URL": "postgresql://bench@127.0.0.1:1/inexistente"}
+        try:
+            medir_import(app_dir, sem_bd)
+            import_sem_bd = True
+        except RuntimeError:
+            import_sem_bd = False
+
+    relatorio = {
+        "app_dir": app_dir,
+        "database": database_url.split(":", 1)[0],
+        "repeat": args.repeat,
+        "import": _resumo(imports),
+        "cold_start": _resumo(cold_starts),
+        "import_without_database": import_sem_bd,
+    }
+    texto = json.dumps(relatorio, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# Configuração comum dos testes: a aplicação é importada com uma base de dados SQLite
+# temporária, criada pelo bootstrap no arranque (DB_BOOTSTRAP_ON_STARTUP).
+import os
+import tempfile
+
+import pytest
+
+_PASTA = tempfile.mkdtemp(prefix="empresas-testes-")
+
+# As definições são lidas na importação de app.core.config, pelo que têm de existir antes dela.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_PASTA, 'testes.db')}"
+os.environ.setdefault("SECRET_KEY", "chave-dos-testes")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ["DB_BOOTSTRAP_ON_STARTUP"] = "true"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Cliente HTTP da aplicação, com o arranque e o encerramento do servidor (lifespan)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as cliente:
+        yield cliente
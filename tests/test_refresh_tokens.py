@@ -0,0 +1,49 @@
+# Testes da rotação de refresh tokens (POST /refresh) e da revogação da sessão quando um
+# refresh token já trocado é reutilizado.
+from uuid import uuid4
+
+
+def _login(client) -> dict:
+    """Regista um utilizador novo e devolve os tokens do seu login."""
+    credenciais = {"username": f"admin-{uuid4().hex[:8]}", "password": "senha123"}
+    assert client.post("/register", json=credenciais).status_code == 201
+    resposta = client.post("/login", data=credenciais)
+    assert resposta.status_code == 200
+    return resposta.json()
+
+
+def _autorizacao(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_refresh_roda_o_refresh_token(client):
+    tokens = _login(client)
+
+    resposta = client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert resposta.status_code == 200
+    novos = resposta.json()
+    assert novos["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/empresas/", headers=_autorizacao(novos)).status_code == 200
+
+
+def test_reutilizacao_revoga_a_sessao_inteira(client):
+    tokens = _login(client)
+    novos = client.post("/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+    # O refresh token original já foi trocado: reutilizá-lo é tratado como roubo.
+    assert client.post("/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+    # Toda a família de tokens fica revogada, incluindo os emitidos pela rotação.
+    assert client.post("/refresh", json={"refresh_token": novos["refresh_token"]}).status_code == 401
+    assert client.get("/empresas/", headers=_autorizacao(novos)).status_code == 401
+    assert client.get("/empresas/", headers=_autorizacao(tokens)).status_code == 401
+
+
+def test_reutilizacao_nao_afeta_outras_sessoes(client):
+    sessao = _login(client)
+    outra = _login(client)
+    client.post("/refresh", json={"refresh_token": sessao["refresh_token"]})
+    client.post("/refresh", json={"refresh_token": sessao["refresh_token"]})
+
+    assert client.get("/empresas/", headers=_autorizacao(outra)).status_code == 200